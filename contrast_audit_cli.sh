@@ -0,0 +1,3 @@
+#!/bin/sh
+cd "$(dirname "$0")" &&
+exec python3 -m oomox_gui.contrast_audit_cli "$@"
@@ -1,3 +1,5 @@
+from typing import IO
+
 from _typeshed import Incomplete
 
 # class cached_property:
@@ -7,7 +9,7 @@ from _typeshed import Incomplete
 
 class ColorThief:
     image: Incomplete
-    def __init__(self, file: str) -> None: ...
+    def __init__(self, file: str | IO[bytes]) -> None: ...
     def get_color(self, quality: int = ...) -> tuple[int, int, int]: ...
     def get_palette(self, color_count: int = ..., quality: int = ...) -> list[tuple[int, int, int]]: ...
 
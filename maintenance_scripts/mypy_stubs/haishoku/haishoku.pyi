@@ -1,4 +1,6 @@
 # from . import alg as alg, haillow as haillow
+from typing import IO
+
 from _typeshed import Incomplete
 
 class Haishoku:
@@ -14,5 +16,5 @@ class Haishoku:
     # def showDominant(image_path) -> None: ...
     # def getDominant(image_path: Incomplete | None = ...): ...
     @classmethod
-    def getPalette(cls, image_path: str) -> list[tuple[float, tuple[int, int, int]]]:
+    def getPalette(cls, image_path: str | IO[bytes]) -> list[tuple[float, tuple[int, int, int]]]:
         ...
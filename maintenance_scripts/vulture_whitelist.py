@@ -13,6 +13,8 @@ whitelist.typing.Final
 whitelist.typing.IOStream
 whitelist.typing.Iterable
 whitelist.typing.Iterable
+whitelist.typing.Iterator
+whitelist.typing.Hashable
 whitelist.typing.Literal
 whitelist.typing.Mapping
 whitelist.typing.ModuleType
@@ -26,18 +28,28 @@ whitelist.typing.TracebackType
 whitelist.typing.Tuple
 whitelist.typing.Type
 whitelist.typing_extensions.Self
+whitelist.multiprocessing.pool.AsyncResult
+whitelist.multiprocessing.sharedctypes.SynchronizedArray
 whitelist.color.HexColor
 whitelist.color.IntColor
+whitelist.color.AnyColor
 whitelist.theme_model.ThemeModel
 whitelist.theme_model.ThemeModelValue.filter
 whitelist.theme_model.ThemeModelValue.reload_theme
 whitelist.theme_model.ThemeModelValue.reload_options
 whitelist.theme_file.PresetFile.default
 whitelist.theme_file.ThemeT
+whitelist.terminal_smarty.SmartyPassT
+whitelist.terminal_smarty.SmartyCountSimilarT
+whitelist.terminal_smarty.SmartyBestOfCountsT
+whitelist.terminal_smarty.SmartyPatchCountsT
+whitelist.numpy.typing.NDArray
 
 whitelist.helpers.SortableT
 whitelist.helpers.DelayedPartialReturnT
 whitelist.helpers.DelayedPartialArgT
+whitelist.color_cache.MemoizedParamsP
+whitelist.color_cache.MemoizedResultT
 
 # stdlib
 whitelist.Thread.daemon
@@ -63,13 +75,14 @@ whitelist.OomoxPlugin.theme_model_options
 whitelist.OomoxPlugin.theme_model_icons
 whitelist.OomoxPlugin.theme_model_extra
 whitelist.ExportDialog.show_text
+whitelist.color.find_closest_color
 
 
 # to fix ?
 whitelist.preview_icons.IconsNames.HOME
 whitelist.preview_icons.IconsNames.DESKTOP
 whitelist.preview_icons.IconsNames.FILE_MANAGER
-whitelist.terminal.ProgressBar.message
+whitelist.terminal_smarty.ProgressBar.message
 whitelist.OomoxPlugin.haishoku
 whitelist.OomoxPlugin.colorthief
 
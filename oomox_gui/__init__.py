@@ -2,8 +2,6 @@
 import sys
 from typing import TYPE_CHECKING
 
-import gi
-
 if TYPE_CHECKING:
     from typing import Final
 
@@ -18,5 +16,12 @@ if (version := sys.version_info) < MIN_PYTHON_VERSION:
     )
     raise RuntimeError(OLD_PYTHON_ERROR)
 
-gi.require_version("Gdk", "3.0")
-gi.require_version("Gtk", "3.0")
+try:
+    import gi
+except ImportError:
+    # color functions and terminal palette generation are usable without GTK,
+    # like in CLI and in worker processes:
+    pass
+else:
+    gi.require_version("Gdk", "3.0")
+    gi.require_version("Gtk", "3.0")
@@ -1,12 +1,17 @@
+import math
 import operator
 from collections.abc import Sequence
-from typing import TYPE_CHECKING, Annotated
+from typing import TYPE_CHECKING, Annotated, NamedTuple, overload
 
-from gi.repository import Gdk
+from .color_cache import memoize_color_function
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
     from typing import Final
 
+    from gi.repository import Gdk
+    from typing_extensions import Self
+
 
 class RGB:
     length: "Final" = 3
@@ -35,7 +40,9 @@ def color_list_from_hex(color_text: "HexColor") -> "tuple[str, str, str]":
     return result
 
 
-def int_list_from_hex(color_text: "HexColor") -> "IntColor":
+def int_list_from_hex(color_text: "HexColor | PackedColor") -> "IntColor":
+    if isinstance(color_text, PackedColor):
+        return color_text.channels
     result = [hex_to_int(c) for c in color_list_from_hex(color_text)]
     if len(result) != RGB.length:
         raise TypeError(color_text)
@@ -46,31 +53,217 @@ def color_hex_from_list(color_list: "IntColor") -> "HexColor":
     return "".join([int_to_hex(i) for i in color_list])
 
 
+class PackedColor:
+    """
+    24-bit RGB color stored as a single int: parsed once, with the hex form computed once,
+    to be used instead of `HexColor` strings when the same colors are compared many times.
+    """
+
+    __slots__ = ("_hex", "value")
+
+    value: int
+    _hex: "HexColor | None"
+
+    def __init__(self, value: int) -> None:
+        if not 0 <= value <= 0xffffff:  # noqa: PLR2004
+            msg = f"Not a 24-bit color: {value!r}"
+            raise ValueError(msg)
+        self.value = value
+        self._hex = None
+
+    @classmethod
+    def from_channels(cls, color_list: "IntColor") -> "Self":
+        red, green, blue = color_list
+        return cls((red << 16) | (green << 8) | blue)
+
+    @classmethod
+    def from_hex(cls, color_text: "HexColor") -> "Self":
+        return cls.from_channels(int_list_from_hex(color_text))
+
+    @property
+    def red(self) -> int:
+        return self.value >> 16
+
+    @property
+    def green(self) -> int:
+        return (self.value >> 8) & 0xff
+
+    @property
+    def blue(self) -> int:
+        return self.value & 0xff
+
+    @property
+    def channels(self) -> tuple[int, int, int]:
+        value = self.value
+        return (value >> 16, (value >> 8) & 0xff, value & 0xff)
+
+    @property
+    def hex(self) -> "HexColor":
+        if self._hex is None:
+            self._hex = f"{self.value:06x}"
+        return self._hex
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PackedColor):
+            return NotImplemented
+        return self.value == other.value
+
+    def __hash__(self) -> int:
+        return hash(self.value)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.hex!r})"
+
+
+AnyColor = HexColor | PackedColor
+
+
+def _channels(color: "AnyColor") -> "IntColor":
+    if isinstance(color, PackedColor):
+        return color.channels
+    return int_list_from_hex(color)
+
+
+@overload
+def _from_channels(color_list: "IntColor", like: PackedColor) -> PackedColor:
+    ...
+
+
+@overload
+def _from_channels(color_list: "IntColor", like: "HexColor") -> "HexColor":
+    ...
+
+
+def _from_channels(color_list: "IntColor", like: "AnyColor") -> "AnyColor":
+    """The color of the same type as `like`."""
+    if isinstance(like, PackedColor):
+        return PackedColor.from_channels(color_list)
+    return color_hex_from_list(color_list)
+
+
 MIN_LIGHTNESS: "Final" = 0
 MAX_LIGHTNESS: "Final" = 1
 
 
-def hex_lightness(color_text: "HexColor") -> Annotated[float, MIN_LIGHTNESS, MAX_LIGHTNESS]:
-    # @TODO: use real lightness from HSV or Lab color model
-    return sum(
-        hex_to_int(channel_text)
-        for channel_text in color_list_from_hex(color_text)
-    ) / (RGB.hex_size * RGB.length)
+class LightnessModel:
+    # the fastest one, but treating all the channels as equally bright:
+    CHANNEL_SUM: "Final" = "sum"
+    # perceptual ones, L of OKLab and L* of CIELAB:
+    OKLAB: "Final" = "oklab"
+    CIELAB: "Final" = "cielab"
+
+
+def _srgb_channel_to_linear(channel: int) -> float:
+    value = channel / RGB.hex_size
+    if value <= 0.04045:  # noqa: PLR2004
+        return value / 12.92
+    return float(((value + 0.055) / 1.055) ** 2.4)
+
+
+# to not compute the gamma expansion of each channel again for each color:
+SRGB_TO_LINEAR: "Final" = tuple(
+    _srgb_channel_to_linear(channel) for channel in range(RGB.hex_size + 1)
+)
+
+# linear sRGB to LMS cone responses, and cube roots of them to L:
+OKLAB_LMS_MATRIX: "Final" = (
+    (0.4122214708, 0.5363325363, 0.0514459929),
+    (0.2119034982, 0.6806995451, 0.1073969566),
+    (0.0883024619, 0.2817188376, 0.6299787005),
+)
+OKLAB_LIGHTNESS_WEIGHTS: "Final" = (0.2104542553, 0.7936177850, -0.0040720468)
+# linear sRGB to relative luminance, and CIELAB L* of it:
+LUMINANCE_WEIGHTS: "Final" = (0.2126, 0.7152, 0.0722)
+CIELAB_EPSILON: "Final" = (6 / 29) ** 3
+CIELAB_KAPPA: "Final" = 3 * (6 / 29) ** 2
+
+
+def channel_sum_lightness(color_list: "IntColor") -> float:
+    return sum(color_list) / (RGB.hex_size * RGB.length)
 
 
-def is_dark(color_text: "HexColor") -> bool:
-    return hex_lightness(color_text) < (MAX_LIGHTNESS / 2)
+def oklab_lightness(color_list: "IntColor") -> float:
+    red, green, blue = (SRGB_TO_LINEAR[channel] for channel in color_list)
+    long_cone, medium_cone, short_cone = (
+        red_weight * red + green_weight * green + blue_weight * blue
+        for red_weight, green_weight, blue_weight in OKLAB_LMS_MATRIX
+    )
+    long_weight, medium_weight, short_weight = OKLAB_LIGHTNESS_WEIGHTS
+    lightness: float = (
+        long_weight * long_cone ** (1 / 3)
+        + medium_weight * medium_cone ** (1 / 3)
+        + short_weight * short_cone ** (1 / 3)
+    )
+    return min(max(lightness, MIN_LIGHTNESS), MAX_LIGHTNESS)
+
+
+def relative_luminance(color_list: "IntColor") -> float:
+    red, green, blue = (SRGB_TO_LINEAR[channel] for channel in color_list)
+    red_weight, green_weight, blue_weight = LUMINANCE_WEIGHTS
+    return red_weight * red + green_weight * green + blue_weight * blue
+
+
+def _cielab_cube_root(value: float) -> float:
+    result: float = (
+        value ** (1 / 3) if value > CIELAB_EPSILON
+        else value / CIELAB_KAPPA + 4 / 29
+    )
+    return result
 
 
+def cielab_lightness(color_list: "IntColor") -> float:
+    lightness = (116 * _cielab_cube_root(relative_luminance(color_list)) - 16) / 100
+    return min(max(lightness, MIN_LIGHTNESS), MAX_LIGHTNESS)
+
+
+LIGHTNESS_FUNCTIONS: "Final[dict[str, Callable[[IntColor], float]]]" = {
+    LightnessModel.CHANNEL_SUM: channel_sum_lightness,
+    LightnessModel.OKLAB: oklab_lightness,
+    LightnessModel.CIELAB: cielab_lightness,
+}
+
+
+def get_lightness_function(model: str) -> "Callable[[IntColor], float]":
+    """Lightness of RGB channels in `MIN_LIGHTNESS` .. `MAX_LIGHTNESS` range."""
+    if model not in LIGHTNESS_FUNCTIONS:
+        unknown_model = f"Unknown lightness model {model!r}"
+        raise ValueError(unknown_model)
+    return LIGHTNESS_FUNCTIONS[model]
+
+
+def hex_lightness(
+        color_text: "HexColor",
+        model: str = LightnessModel.CHANNEL_SUM,
+) -> Annotated[float, MIN_LIGHTNESS, MAX_LIGHTNESS]:
+    if model == LightnessModel.CHANNEL_SUM:
+        return sum(
+            hex_to_int(channel_text)
+            for channel_text in color_list_from_hex(color_text)
+        ) / (RGB.hex_size * RGB.length)
+    return get_lightness_function(model)(int_list_from_hex(color_text))
+
+
+def is_dark(color_text: "HexColor", model: str = LightnessModel.CHANNEL_SUM) -> bool:
+    return hex_lightness(color_text, model) < (MAX_LIGHTNESS / 2)
+
+
+@overload
+def hex_darker(color_text: PackedColor, darken_amount: int = 10) -> PackedColor:
+    ...
+
+
+@overload
 def hex_darker(color_text: "HexColor", darken_amount: int = 10) -> "HexColor":
-    # @TODO: use real lightness from HSV or Lab color model?
-    return color_hex_from_list([
-        max(min(hex_to_int(channel_text) - darken_amount, RGB.hex_size), 0)
-        for channel_text in color_list_from_hex(color_text)
-    ])
+    ...
 
 
-RGB_CHANNELS: "Final[list[str]]" = ["r", "g", "b"]
+@memoize_color_function
+def hex_darker(color_text: "AnyColor", darken_amount: int = 10) -> "AnyColor":
+    # @TODO: use real lightness from HSV or Lab color model?
+    return _from_channels([
+        max(min(channel - darken_amount, RGB.hex_size), 0)
+        for channel in _channels(color_text)
+    ], like=color_text)
 
 
 class ColorDiff:
@@ -98,67 +291,304 @@ class ColorDiff:
     def __repr__(self) -> str:
         return str(self.abs_sum)
 
-    def __init__(self, theme_color_1: "HexColor", theme_color_2: "HexColor") -> None:
-        color_list_1 = color_list_from_hex(theme_color_1)
-        color_list_2 = color_list_from_hex(theme_color_2)
-        for channel_index, channel_1_text in enumerate(color_list_1):
-            channel_1 = hex_to_int(channel_1_text)
-            channel_2 = hex_to_int(color_list_2[channel_index])
-            setattr(self, RGB_CHANNELS[channel_index], channel_1 - channel_2)
+    @classmethod
+    def from_channels(cls, color_list_1: "IntColor", color_list_2: "IntColor") -> "Self":
+        diff = cls.__new__(cls)
+        diff.set_channels(color_list_1, color_list_2)
+        return diff
+
+    def __init__(self, theme_color_1: "AnyColor", theme_color_2: "AnyColor") -> None:
+        self.set_channels(_channels(theme_color_1), _channels(theme_color_2))
+
+    def set_channels(self, color_list_1: "IntColor", color_list_2: "IntColor") -> None:
+        # pylint: disable=invalid-name
+        self.r = color_list_1[RGB.RED] - color_list_2[RGB.RED]
+        self.g = color_list_1[RGB.GREEN] - color_list_2[RGB.GREEN]
+        self.b = color_list_1[RGB.BLUE] - color_list_2[RGB.BLUE]
+
+    @overload
+    def apply_to(self, color_text: PackedColor) -> PackedColor:
+        ...
 
+    @overload
     def apply_to(self, color_text: "HexColor") -> "HexColor":
-        color_list = color_list_from_hex(color_text)
-        result = ""
-        for channel_index, channel_text in enumerate(color_list):
-            channel = hex_to_int(channel_text)
-            int_result = channel - getattr(self, RGB_CHANNELS[channel_index])
-            int_result = max(int_result, 0)
-            int_result = min(int_result, RGB.hex_size)
-            result += int_to_hex(int_result)
-        return result
+        ...
+
+    def apply_to(self, color_text: "AnyColor") -> "AnyColor":
+        return _from_channels([
+            min(max(channel - diff, 0), RGB.hex_size)
+            for channel, diff in zip(_channels(color_text), (self.r, self.g, self.b), strict=True)
+        ], like=color_text)
 
 
 SMALLEST_DIFF: "Final" = ColorDiff("000000", "ffffff")
 
 
+@overload
+def find_closest_color(
+        color_hex: "AnyColor",
+        colors_hex: "Sequence[PackedColor]",
+        min_lightness: int = MIN_LIGHTNESS,
+        max_lightness: int = RGB.hex_size * RGB.length,
+) -> "tuple[None, None] | tuple[PackedColor, ColorDiff]":
+    ...
+
+
+@overload
 def find_closest_color(
-        color_hex: "HexColor",
+        color_hex: "AnyColor",
         colors_hex: "Sequence[HexColor]",
         min_lightness: int = MIN_LIGHTNESS,
         max_lightness: int = RGB.hex_size * RGB.length,
 ) -> "tuple[None, None] | tuple[HexColor, ColorDiff]":
-    smallest_diff = SMALLEST_DIFF
-    closest_color = None
-    if not colors_hex:
-        return None, None
-    if len(colors_hex) == 1:
-        return colors_hex[0], ColorDiff(colors_hex[0], color_hex)
-    for preset_color in colors_hex:
-        diff = ColorDiff(preset_color, color_hex)
-        # @TODO: use real lightness from HSV or Lab color model
-        lightness = (sum(int_list_from_hex(preset_color)))
-        if (diff.abs_sum < smallest_diff.abs_sum) and (max_lightness >= lightness >= min_lightness):
-            smallest_diff = diff
-            closest_color = preset_color
-    if not closest_color:
-        return find_closest_color(color_hex, colors_hex, min_lightness // 2, max_lightness * 2)
-    return closest_color, smallest_diff
-
-
-def convert_theme_color_to_gdk(theme_color: "HexColor") -> Gdk.RGBA:
+    ...
+
+
+def find_closest_color(
+        color_hex: "AnyColor",
+        colors_hex: "Sequence[AnyColor]",
+        min_lightness: int = MIN_LIGHTNESS,
+        max_lightness: int = RGB.hex_size * RGB.length,
+) -> "tuple[None, None] | tuple[AnyColor, ColorDiff]":
+    """
+    For the lookups of many colors in the same palette
+    use `color_index.ColorLightnessIndex` directly, to not index the palette each time.
+    """
+    from .color_index import ColorLightnessIndex  # pylint: disable=import-outside-toplevel
+    return ColorLightnessIndex(colors_hex).closest_many(  # type: ignore[type-var]
+        [color_hex], min_lightness, max_lightness,
+    )[0]
+
+
+class ColorDistanceMetric:
+    # sum of channel differences, the same as `ColorDiff.abs_sum`:
+    RGB: "Final" = "rgb"
+    # euclidean distance in OKLab:
+    OKLAB: "Final" = "oklab"
+    # CIE Delta E 2000 in CIELAB:
+    CIEDE2000: "Final" = "ciede2000"
+
+
+# cube roots of LMS cone responses (see `OKLAB_LMS_MATRIX`) to a and b of OKLab:
+OKLAB_AB_WEIGHTS: "Final" = (
+    (1.9779984951, -2.4285922050, 0.4505937099),
+    (0.0259040371, 0.7827717662, -0.8086757660),
+)
+# linear sRGB to CIE XYZ, with D65 white point being the sum of each row:
+XYZ_MATRIX: "Final" = (
+    (0.4124, 0.3576, 0.1805),
+    LUMINANCE_WEIGHTS,
+    (0.0193, 0.1192, 0.9505),
+)
+XYZ_WHITE_POINT: "Final" = tuple(sum(weights) for weights in XYZ_MATRIX)
+CIEDE2000_CHROMA_WEIGHT: "Final" = 25 ** 7
+
+
+def rgb_coordinates(color_list: "IntColor") -> tuple[float, ...]:
+    return tuple(color_list)
+
+
+def oklab_coordinates(color_list: "IntColor") -> tuple[float, ...]:
+    red, green, blue = (SRGB_TO_LINEAR[channel] for channel in color_list)
+    cone_roots = [
+        (red_weight * red + green_weight * green + blue_weight * blue) ** (1 / 3)
+        for red_weight, green_weight, blue_weight in OKLAB_LMS_MATRIX
+    ]
+    return tuple(
+        long_weight * cone_roots[0] + medium_weight * cone_roots[1] + short_weight * cone_roots[2]
+        for long_weight, medium_weight, short_weight in (
+            OKLAB_LIGHTNESS_WEIGHTS, *OKLAB_AB_WEIGHTS,
+        )
+    )
+
+
+def cielab_coordinates(color_list: "IntColor") -> tuple[float, ...]:
+    red, green, blue = (SRGB_TO_LINEAR[channel] for channel in color_list)
+    x_root, y_root, z_root = (
+        _cielab_cube_root(
+            (red_weight * red + green_weight * green + blue_weight * blue) / white,
+        )
+        for (red_weight, green_weight, blue_weight), white in zip(
+            XYZ_MATRIX, XYZ_WHITE_POINT, strict=True,
+        )
+    )
+    return (116 * y_root - 16, 500 * (x_root - y_root), 200 * (y_root - z_root))
+
+
+def rgb_distance(color_list_1: "Sequence[float]", color_list_2: "Sequence[float]") -> float:
+    return sum(
+        abs(channel_1 - channel_2)
+        for channel_1, channel_2 in zip(color_list_1, color_list_2, strict=True)
+    )
+
+
+def ciede2000_distance(  # pylint: disable=too-many-locals
+        lab_1: "Sequence[float]", lab_2: "Sequence[float]",
+) -> float:
+    """By "The CIEDE2000 Color-Difference Formula" of G. Sharma, W. Wu and E. N. Dalal."""
+    lightness_1, a_1, b_1 = lab_1
+    lightness_2, a_2, b_2 = lab_2
+    chroma_mean_7 = ((math.hypot(a_1, b_1) + math.hypot(a_2, b_2)) / 2) ** 7
+    a_scale = 1 + (1 - math.sqrt(chroma_mean_7 / (chroma_mean_7 + CIEDE2000_CHROMA_WEIGHT))) / 2
+    chroma_1 = math.hypot(a_1 * a_scale, b_1)
+    chroma_2 = math.hypot(a_2 * a_scale, b_2)
+    hue_1 = math.degrees(math.atan2(b_1, a_1 * a_scale)) % 360
+    hue_2 = math.degrees(math.atan2(b_2, a_2 * a_scale)) % 360
+
+    hue_delta = hue_2 - hue_1
+    hue_mean = hue_1 + hue_2
+    if chroma_1 * chroma_2 == 0:
+        hue_delta = 0
+    elif abs(hue_delta) <= 180:  # noqa: PLR2004
+        hue_mean /= 2
+    else:
+        hue_delta += -360 if hue_delta > 0 else 360
+        hue_mean = (hue_mean + (360 if hue_mean < 360 else -360)) / 2  # noqa: PLR2004
+
+    lightness_delta = lightness_2 - lightness_1
+    chroma_delta = chroma_2 - chroma_1
+    hue_delta_scaled = 2 * math.sqrt(chroma_1 * chroma_2) * math.sin(math.radians(hue_delta / 2))
+
+    lightness_mean_50_2 = ((lightness_1 + lightness_2) / 2 - 50) ** 2
+    chroma_mean = (chroma_1 + chroma_2) / 2
+    hue_weight = (
+        1
+        - 0.17 * math.cos(math.radians(hue_mean - 30))
+        + 0.24 * math.cos(math.radians(2 * hue_mean))
+        + 0.32 * math.cos(math.radians(3 * hue_mean + 6))
+        - 0.20 * math.cos(math.radians(4 * hue_mean - 63))
+    )
+    rotation = -math.sin(math.radians(
+        60 * math.exp(-(((hue_mean - 275) / 25) ** 2)),
+    )) * 2 * math.sqrt(chroma_mean ** 7 / (chroma_mean ** 7 + CIEDE2000_CHROMA_WEIGHT))
+
+    lightness_term = lightness_delta / (
+        1 + 0.015 * lightness_mean_50_2 / math.sqrt(20 + lightness_mean_50_2)
+    )
+    chroma_term = chroma_delta / (1 + 0.045 * chroma_mean)
+    hue_term = hue_delta_scaled / (1 + 0.015 * chroma_mean * hue_weight)
+    return math.sqrt(max(
+        lightness_term ** 2 + chroma_term ** 2 + hue_term ** 2
+        + rotation * chroma_term * hue_term,
+        0,
+    ))
+
+
+class ColorDistance(NamedTuple):
+    """Colors are converted to `coordinates` once, to compute `distance` between many of them."""
+
+    coordinates: "Callable[[IntColor], tuple[float, ...]]"
+    distance: "Callable[[Sequence[float], Sequence[float]], float]"
+
+
+COLOR_DISTANCES: "Final[dict[str, ColorDistance]]" = {
+    ColorDistanceMetric.RGB: ColorDistance(rgb_coordinates, rgb_distance),
+    ColorDistanceMetric.OKLAB: ColorDistance(oklab_coordinates, math.dist),
+    ColorDistanceMetric.CIEDE2000: ColorDistance(cielab_coordinates, ciede2000_distance),
+}
+
+
+def get_color_distance(metric: str) -> ColorDistance:
+    if metric not in COLOR_DISTANCES:
+        unknown_metric = f"Unknown color distance metric {metric!r}"
+        raise ValueError(unknown_metric)
+    return COLOR_DISTANCES[metric]
+
+
+class ContrastMethod:
+    # WCAG 2 contrast ratio, from 1 to 21, the same for swapped colors:
+    WCAG: "Final" = "wcag"
+    # APCA lightness contrast (Lc), about -108 to 106, negative for light text on dark background:
+    APCA: "Final" = "apca"
+
+
+WCAG_LUMINANCE_OFFSET: "Final" = 0.05
+# APCA 0.0.98G-4g constants:
+APCA_TRC_EXPONENT: "Final" = 2.4
+APCA_LUMINANCE_WEIGHTS: "Final" = (0.2126729, 0.7151522, 0.0721750)
+APCA_NORMAL_EXPONENTS: "Final" = (0.57, 0.56)  # text, background
+APCA_REVERSE_EXPONENTS: "Final" = (0.62, 0.65)  # text, background
+APCA_BLACK_THRESHOLD: "Final" = 0.022
+APCA_BLACK_CLAMP: "Final" = 1.414
+APCA_SCALE: "Final" = 1.14
+APCA_OFFSET: "Final" = 0.027
+APCA_MIN_LUMINANCE_DELTA: "Final" = 0.0005
+APCA_LOW_CLIP: "Final" = 0.1
+
+# simple (not piece-wise) gamma of each channel value, as APCA uses:
+APCA_CHANNEL_TO_LINEAR: "Final" = tuple(
+    (channel / RGB.hex_size) ** APCA_TRC_EXPONENT for channel in range(RGB.hex_size + 1)
+)
+
+
+def wcag_contrast(foreground: "IntColor", background: "IntColor") -> float:
+    luminances = sorted((relative_luminance(foreground), relative_luminance(background)))
+    return (luminances[1] + WCAG_LUMINANCE_OFFSET) / (luminances[0] + WCAG_LUMINANCE_OFFSET)
+
+
+def _apca_luminance(color_list: "IntColor") -> float:
+    red, green, blue = (APCA_CHANNEL_TO_LINEAR[channel] for channel in color_list)
+    red_weight, green_weight, blue_weight = APCA_LUMINANCE_WEIGHTS
+    luminance: float = red_weight * red + green_weight * green + blue_weight * blue
+    if luminance > APCA_BLACK_THRESHOLD:
+        return luminance
+    clamped_luminance: float = luminance + (APCA_BLACK_THRESHOLD - luminance) ** APCA_BLACK_CLAMP
+    return clamped_luminance
+
+
+def apca_contrast(foreground: "IntColor", background: "IntColor") -> float:
+    text_luminance = _apca_luminance(foreground)
+    background_luminance = _apca_luminance(background)
+    if abs(background_luminance - text_luminance) < APCA_MIN_LUMINANCE_DELTA:
+        return 0
+    if background_luminance > text_luminance:
+        text_exponent, background_exponent = APCA_NORMAL_EXPONENTS
+    else:
+        text_exponent, background_exponent = APCA_REVERSE_EXPONENTS
+    contrast: float = (
+        background_luminance ** background_exponent - text_luminance ** text_exponent
+    ) * APCA_SCALE
+    if abs(contrast) < APCA_LOW_CLIP:
+        return 0
+    return (contrast - math.copysign(APCA_OFFSET, contrast)) * 100
+
+
+CONTRAST_FUNCTIONS: "Final[dict[str, Callable[[IntColor, IntColor], float]]]" = {
+    ContrastMethod.WCAG: wcag_contrast,
+    ContrastMethod.APCA: apca_contrast,
+}
+
+
+def get_contrast_function(method: str) -> "Callable[[IntColor, IntColor], float]":
+    """Contrast of the foreground (text) color on the background one."""
+    if method not in CONTRAST_FUNCTIONS:
+        unknown_method = f"Unknown contrast method {method!r}"
+        raise ValueError(unknown_method)
+    return CONTRAST_FUNCTIONS[method]
+
+
+# Gdk is imported only when needed, so color functions could be used without GTK
+# (in CLI and worker processes):
+
+
+def convert_theme_color_to_gdk(theme_color: "HexColor") -> "Gdk.RGBA":
+    from gi.repository import Gdk  # pylint: disable=import-outside-toplevel
+
     gdk_color = Gdk.RGBA()
     gdk_color.parse("#" + theme_color)
     return gdk_color
 
 
-def convert_gdk_to_theme_color(gdk_color: Gdk.RGBA) -> "HexColor":
+def convert_gdk_to_theme_color(gdk_color: "Gdk.RGBA") -> "HexColor":
     return "".join([
         int_to_hex(n * RGB.hex_size)
         for n in (gdk_color.red, gdk_color.green, gdk_color.blue)
     ])
 
 
-def mix_gdk_colors(gdk_color_1: Gdk.RGBA, gdk_color_2: Gdk.RGBA, ratio: float) -> Gdk.RGBA:
+def mix_gdk_colors(gdk_color_1: "Gdk.RGBA", gdk_color_2: "Gdk.RGBA", ratio: float) -> "Gdk.RGBA":
+    from gi.repository import Gdk  # pylint: disable=import-outside-toplevel
+
     result_gdk_color = Gdk.RGBA()
     for attr in ("red", "green", "blue", "alpha"):
         setattr(
@@ -170,13 +600,18 @@ def mix_gdk_colors(gdk_color_1: Gdk.RGBA, gdk_color_2: Gdk.RGBA, ratio: float) -
     return result_gdk_color
 
 
+@memoize_color_function
 def mix_theme_colors(
         theme_color_1: "HexColor", theme_color_2: "HexColor", ratio: float,
 ) -> "HexColor":
-    return convert_gdk_to_theme_color(
-        mix_gdk_colors(
-            convert_theme_color_to_gdk(theme_color_1),
-            convert_theme_color_to_gdk(theme_color_2),
-            ratio=ratio,
-        ),
-    )
+    # the same result as of mixing them as Gdk.RGBA:
+    # its channels are parsed as `value * 257 / 65535` which is exactly the same float as `value / 255`,
+    # and converted back with `convert_gdk_to_theme_color()` rounding
+    return color_hex_from_list([
+        int((
+            channel_1 / RGB.hex_size * ratio + channel_2 / RGB.hex_size * (1 - ratio)
+        ) * RGB.hex_size)
+        for channel_1, channel_2 in zip(
+            int_list_from_hex(theme_color_1), int_list_from_hex(theme_color_2), strict=True,
+        )
+    ])
@@ -0,0 +1,197 @@
+"""
+Color operations of `color` module applied to the whole lists of colors at once.
+
+The results are exactly the same as of the corresponding single-color functions:
+with NumPy (if it's installed and the list is long enough to be worth it) they're vectorized,
+otherwise (or if some of the colors are not plain 6-digit ones) they're computed one by one.
+"""
+import functools
+import importlib.util
+import itertools
+from typing import TYPE_CHECKING
+
+from .color import (
+    ColorDiff,
+    ColorDistanceMetric,
+    LightnessModel,
+    color_hex_from_list,
+    get_color_distance,
+    get_contrast_function,
+    get_lightness_function,
+    hex_darker,
+    int_list_from_hex,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from typing import Final
+
+    from .color import HexColor, IntColor
+
+
+# for the shorter lists NumPy overhead is bigger than the gain:
+COLOR_BATCH_NUMPY_MIN_SIZE: "Final" = 64
+
+
+# same as `terminal_smarty.SmartyEngine`:
+ENGINE_PYTHON: "Final" = "python"
+ENGINE_NUMPY: "Final" = "numpy"
+
+
+@functools.cache
+def _is_numpy_available() -> bool:
+    return importlib.util.find_spec("numpy") is not None
+
+
+def _use_numpy(size: int, engine: str | None) -> bool:
+    """Without explicit `engine` NumPy is used only for the long enough lists."""
+    if engine is None:
+        return (size >= COLOR_BATCH_NUMPY_MIN_SIZE) and _is_numpy_available()
+    if engine not in {ENGINE_NUMPY, ENGINE_PYTHON}:
+        unknown_engine = f"Unknown engine {engine!r}"
+        raise ValueError(unknown_engine)
+    return engine == ENGINE_NUMPY
+
+
+def _broadcast(value: "float | Sequence[float]", size: int) -> "Sequence[float]":
+    if isinstance(value, int | float):
+        return [value] * size
+    if len(value) != size:
+        msg = f"Expected {size} values, got {len(value)}"
+        raise ValueError(msg)
+    return value
+
+
+def darken_colors(
+        colors: "Sequence[HexColor]",
+        darken_amount: "int | Sequence[int]" = 10,
+        *,
+        engine: str | None = None,
+) -> "list[HexColor]":
+    """`hex_darker()` of each color, by the same amount or by the amount for each of them."""
+    amounts: Sequence[int] = _broadcast(darken_amount, len(colors))  # type: ignore[assignment]
+    if _use_numpy(len(colors), engine):
+        from .color_batch_numpy import darken_colors_numpy  # pylint: disable=import-outside-toplevel
+        if (result := darken_colors_numpy(colors, amounts)) is not None:
+            return result
+    return list(itertools.starmap(hex_darker, zip(colors, amounts, strict=True)))
+
+
+def apply_color_diff(
+        diff: ColorDiff,
+        colors: "Sequence[HexColor]",
+        *,
+        engine: str | None = None,
+) -> "list[HexColor]":
+    """`diff.apply_to()` each of the colors."""
+    if _use_numpy(len(colors), engine):
+        from .color_batch_numpy import darken_colors_numpy  # pylint: disable=import-outside-toplevel
+        if (result := darken_colors_numpy(colors, [diff.color_list] * len(colors))) is not None:
+            return result
+    return [diff.apply_to(color) for color in colors]
+
+
+def get_saturation(color_list: "IntColor") -> int:
+    # @TODO: use real saturation from HSV model?
+    red, green, blue = color_list
+    return (
+        abs(red - green) + abs(red - blue)
+        + abs(green - red) + abs(green - blue)
+        + abs(blue - green) + abs(blue - red)
+    )
+
+
+def get_grayest_colors(
+        colors: "Sequence[HexColor]",
+        *,
+        engine: str | None = None,
+) -> "list[HexColor]":
+    """The least saturated third of the colors, from the darkest one."""
+    if _use_numpy(len(colors), engine):
+        from .color_batch_numpy import (  # pylint: disable=import-outside-toplevel
+            get_grayest_colors_numpy,
+        )
+        if (result := get_grayest_colors_numpy(colors)) is not None:
+            return result
+    saturation_list = sorted(
+        (int_list_from_hex(color) for color in colors),
+        key=get_saturation,
+    )
+    gray_color_values = saturation_list[:(len(saturation_list) // 3)]
+    gray_color_values.sort(key=sum)
+    return [color_hex_from_list(c) for c in gray_color_values]
+
+
+def get_lightnesses(
+        colors: "Sequence[HexColor]",
+        model: str = LightnessModel.CHANNEL_SUM,
+        *,
+        engine: str | None = None,
+) -> list[float]:
+    """
+    `hex_lightness()` of each of the colors.
+
+    With NumPy the perceptual ones could differ in the last bit,
+    as its cube root is not always rounded the same as Python's one.
+    """
+    lightness_function = get_lightness_function(model)
+    if _use_numpy(len(colors), engine):
+        from .color_batch_numpy import get_lightnesses_numpy  # pylint: disable=import-outside-toplevel
+        if (result := get_lightnesses_numpy(colors, model)) is not None:
+            return result
+    return [lightness_function(int_list_from_hex(color)) for color in colors]
+
+
+def get_distance_matrix(
+        colors_1: "Sequence[HexColor]",
+        colors_2: "Sequence[HexColor]",
+        metric: str = ColorDistanceMetric.RGB,
+        *,
+        engine: str | None = None,
+) -> list[list[float]]:
+    """
+    Distances from each of `colors_1` (rows) to each of `colors_2` (columns).
+
+    With NumPy the perceptual ones could differ in the last bits, like `get_lightnesses()`.
+    """
+    color_distance = get_color_distance(metric)
+    if _use_numpy(len(colors_1) * len(colors_2), engine):
+        from .color_batch_numpy import get_distance_matrix_numpy  # pylint: disable=import-outside-toplevel
+        if (result := get_distance_matrix_numpy(colors_1, colors_2, metric)) is not None:
+            return result
+    coordinates_2 = [color_distance.coordinates(int_list_from_hex(color)) for color in colors_2]
+    return [
+        [
+            color_distance.distance(coordinates_1, other_coordinates)
+            for other_coordinates in coordinates_2
+        ]
+        for coordinates_1 in (
+            color_distance.coordinates(int_list_from_hex(color)) for color in colors_1
+        )
+    ]
+
+
+def get_contrasts(
+        foregrounds: "Sequence[HexColor]",
+        backgrounds: "Sequence[HexColor]",
+        method: str,
+        *,
+        engine: str | None = None,
+) -> list[float]:
+    """
+    Contrast of each of the foreground colors on the corresponding background one.
+
+    With NumPy APCA could differ in the last bits, like `get_lightnesses()`.
+    """
+    if len(foregrounds) != len(backgrounds):
+        msg = f"Got {len(foregrounds)} foreground colors for {len(backgrounds)} background ones"
+        raise ValueError(msg)
+    contrast_function = get_contrast_function(method)
+    if _use_numpy(len(foregrounds), engine):
+        from .color_batch_numpy import get_contrasts_numpy  # pylint: disable=import-outside-toplevel
+        if (result := get_contrasts_numpy(foregrounds, backgrounds, method)) is not None:
+            return result
+    return [
+        contrast_function(int_list_from_hex(foreground), int_list_from_hex(background))
+        for foreground, background in zip(foregrounds, backgrounds, strict=True)
+    ]
@@ -0,0 +1,310 @@
+"""
+NumPy implementations of `color_batch` operations.
+
+Each of them returns `None` if some of the colors are not plain 6-digit hex ones,
+so they would be handled (or rejected) the same way as by the single-color functions.
+"""
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from .color import (
+    APCA_BLACK_CLAMP,
+    APCA_BLACK_THRESHOLD,
+    APCA_CHANNEL_TO_LINEAR,
+    APCA_LOW_CLIP,
+    APCA_LUMINANCE_WEIGHTS,
+    APCA_MIN_LUMINANCE_DELTA,
+    APCA_NORMAL_EXPONENTS,
+    APCA_OFFSET,
+    APCA_REVERSE_EXPONENTS,
+    APCA_SCALE,
+    CIEDE2000_CHROMA_WEIGHT,
+    CIELAB_EPSILON,
+    CIELAB_KAPPA,
+    LUMINANCE_WEIGHTS,
+    MAX_LIGHTNESS,
+    MIN_LIGHTNESS,
+    OKLAB_AB_WEIGHTS,
+    OKLAB_LIGHTNESS_WEIGHTS,
+    OKLAB_LMS_MATRIX,
+    RGB,
+    SRGB_TO_LINEAR,
+    WCAG_LUMINANCE_OFFSET,
+    XYZ_MATRIX,
+    XYZ_WHITE_POINT,
+    ColorDistanceMetric,
+    ContrastMethod,
+    LightnessModel,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from typing import Final
+
+    from numpy.typing import NDArray
+
+    from .color import HexColor, IntColor
+
+
+HEX_COLOR_LENGTH: "Final" = 6
+
+
+def _get_hex_digit_values() -> "NDArray[np.int64]":
+    """Value of each of ASCII characters as a hex digit, -1 if it's not one."""
+    values = np.full(256, -1, dtype=np.int64)
+    for digit in "0123456789abcdef":
+        values[ord(digit)] = values[ord(digit.upper())] = int(digit, 16)
+    return values
+
+
+_HEX_DIGIT_VALUES: "Final" = _get_hex_digit_values()
+_SRGB_TO_LINEAR: "Final" = np.array(SRGB_TO_LINEAR, dtype=np.float64)
+_APCA_CHANNEL_TO_LINEAR: "Final" = np.array(APCA_CHANNEL_TO_LINEAR, dtype=np.float64)
+
+
+def _parse_colors(colors: "Sequence[HexColor]") -> "NDArray[np.int64] | None":
+    """Channels of each of the colors, shape: (colors, 3)."""
+    if any(len(color) != HEX_COLOR_LENGTH for color in colors):
+        return None
+    joined = "".join(colors)
+    if not joined.isascii():
+        return None
+    digits = _HEX_DIGIT_VALUES[
+        np.frombuffer(joined.encode("ascii"), dtype=np.uint8)
+    ].reshape(len(colors), RGB.length, 2)
+    if (digits < 0).any():
+        return None
+    result: NDArray[np.int64] = digits[..., 0] * 16 + digits[..., 1]
+    return result
+
+
+def _format_colors(colors: "NDArray[np.int64]") -> "list[HexColor]":
+    packed_colors = (colors[:, 0] << 16) | (colors[:, 1] << 8) | colors[:, 2]
+    return [f"{color:06x}" for color in packed_colors.tolist()]
+
+
+def darken_colors_numpy(
+        colors: "Sequence[HexColor]",
+        amounts: "Sequence[int] | Sequence[IntColor]",
+) -> "list[HexColor] | None":
+    """Each of `amounts` is either for all the channels or for each of them."""
+    if not colors:
+        return []
+    color_lists = _parse_colors(colors)
+    if color_lists is None:
+        return None
+    amounts_array = np.asarray(amounts, dtype=np.int64).reshape(len(colors), -1)
+    return _format_colors(np.clip(color_lists - amounts_array, 0, RGB.hex_size))
+
+
+def get_grayest_colors_numpy(colors: "Sequence[HexColor]") -> "list[HexColor] | None":
+    color_lists = _parse_colors(colors)
+    if color_lists is None:
+        return None
+    red, green, blue = color_lists[:, 0], color_lists[:, 1], color_lists[:, 2]
+    saturations = 2 * (np.abs(red - green) + np.abs(red - blue) + np.abs(green - blue))
+    # stable sorts, to keep the order of equally saturated and equally light ones:
+    least_saturated = color_lists[
+        np.argsort(saturations, kind="stable")[:(len(colors) // 3)]
+    ]
+    return _format_colors(
+        least_saturated[np.argsort(least_saturated.sum(axis=1), kind="stable")],
+    )
+
+
+def _weighted_sum(
+        weights: "Sequence[float]", values: "Sequence[NDArray[np.float64]]",
+) -> "NDArray[np.float64]":
+    # the same order of operations as in `color` module, to get the same rounding:
+    result: NDArray[np.float64] = (
+        weights[0] * values[0] + weights[1] * values[1] + weights[2] * values[2]
+    )
+    return result
+
+
+def _linear_channels(color_lists: "NDArray[np.int64]") -> "list[NDArray[np.float64]]":
+    linear = _SRGB_TO_LINEAR[color_lists]
+    return [linear[..., 0], linear[..., 1], linear[..., 2]]
+
+
+def _oklab_cone_roots(channels: "Sequence[NDArray[np.float64]]") -> "list[NDArray[np.float64]]":
+    return [
+        np.power(_weighted_sum(weights, channels), 1 / 3)
+        for weights in OKLAB_LMS_MATRIX
+    ]
+
+
+def _cielab_cube_root(values: "NDArray[np.float64]") -> "NDArray[np.float64]":
+    return np.where(
+        values > CIELAB_EPSILON,
+        np.power(values, 1 / 3),
+        values / CIELAB_KAPPA + 4 / 29,
+    )
+
+
+def get_lightnesses_numpy(colors: "Sequence[HexColor]", model: str) -> "list[float] | None":
+    color_lists = _parse_colors(colors)
+    if color_lists is None:
+        return None
+    if model == LightnessModel.CHANNEL_SUM:
+        return (color_lists.sum(axis=1) / (RGB.hex_size * RGB.length)).tolist()  # type: ignore[no-any-return]
+    channels = _linear_channels(color_lists)
+    if model == LightnessModel.OKLAB:
+        lightness = _weighted_sum(OKLAB_LIGHTNESS_WEIGHTS, _oklab_cone_roots(channels))
+    else:
+        luminance = _weighted_sum(LUMINANCE_WEIGHTS, channels)
+        lightness = (116 * _cielab_cube_root(luminance) - 16) / 100
+    return np.clip(lightness, MIN_LIGHTNESS, MAX_LIGHTNESS).tolist()  # type: ignore[no-any-return]
+
+
+def _oklab_coordinates(color_lists: "NDArray[np.int64]") -> "NDArray[np.float64]":
+    cone_roots = _oklab_cone_roots(_linear_channels(color_lists))
+    return np.stack([
+        _weighted_sum(weights, cone_roots)
+        for weights in (OKLAB_LIGHTNESS_WEIGHTS, *OKLAB_AB_WEIGHTS)
+    ], axis=-1)
+
+
+def _cielab_coordinates(color_lists: "NDArray[np.int64]") -> "NDArray[np.float64]":
+    channels = _linear_channels(color_lists)
+    x_root, y_root, z_root = (
+        _cielab_cube_root(_weighted_sum(weights, channels) / white)
+        for weights, white in zip(XYZ_MATRIX, XYZ_WHITE_POINT, strict=True)
+    )
+    return np.stack(
+        [116 * y_root - 16, 500 * (x_root - y_root), 200 * (y_root - z_root)], axis=-1,
+    )
+
+
+def _ciede2000_distances(  # pylint: disable=too-many-locals
+        lab_1: "NDArray[np.float64]", lab_2: "NDArray[np.float64]",
+) -> "NDArray[np.float64]":
+    """The same as `color.ciede2000_distance()` for each pair of the broadcast colors."""
+    lightness_1, a_1, b_1 = lab_1[..., 0], lab_1[..., 1], lab_1[..., 2]
+    lightness_2, a_2, b_2 = lab_2[..., 0], lab_2[..., 1], lab_2[..., 2]
+    chroma_mean_7 = ((np.hypot(a_1, b_1) + np.hypot(a_2, b_2)) / 2) ** 7
+    a_scale = 1 + (1 - np.sqrt(chroma_mean_7 / (chroma_mean_7 + CIEDE2000_CHROMA_WEIGHT))) / 2
+    chroma_1 = np.hypot(a_1 * a_scale, b_1)
+    chroma_2 = np.hypot(a_2 * a_scale, b_2)
+    hue_1 = np.degrees(np.arctan2(b_1, a_1 * a_scale)) % 360
+    hue_2 = np.degrees(np.arctan2(b_2, a_2 * a_scale)) % 360
+
+    hue_delta = hue_2 - hue_1
+    hue_sum = hue_1 + hue_2
+    no_hue = (chroma_1 * chroma_2) == 0
+    hue_wraps = np.abs(hue_delta) > 180  # noqa: PLR2004
+    hue_delta = np.where(
+        no_hue, 0, np.where(hue_wraps, hue_delta + np.where(hue_delta > 0, -360, 360), hue_delta),
+    )
+    hue_mean = np.where(
+        no_hue,
+        hue_sum,
+        np.where(
+            hue_wraps,
+            (hue_sum + np.where(hue_sum < 360, 360, -360)) / 2,  # noqa: PLR2004
+            hue_sum / 2,
+        ),
+    )
+
+    lightness_delta = lightness_2 - lightness_1
+    chroma_delta = chroma_2 - chroma_1
+    hue_delta_scaled = 2 * np.sqrt(chroma_1 * chroma_2) * np.sin(np.radians(hue_delta / 2))
+
+    lightness_mean_50_2 = ((lightness_1 + lightness_2) / 2 - 50) ** 2
+    chroma_mean = (chroma_1 + chroma_2) / 2
+    hue_weight = (
+        1
+        - 0.17 * np.cos(np.radians(hue_mean - 30))
+        + 0.24 * np.cos(np.radians(2 * hue_mean))
+        + 0.32 * np.cos(np.radians(3 * hue_mean + 6))
+        - 0.20 * np.cos(np.radians(4 * hue_mean - 63))
+    )
+    rotation = -np.sin(np.radians(
+        60 * np.exp(-(((hue_mean - 275) / 25) ** 2)),
+    )) * 2 * np.sqrt(chroma_mean ** 7 / (chroma_mean ** 7 + CIEDE2000_CHROMA_WEIGHT))
+
+    lightness_term = lightness_delta / (
+        1 + 0.015 * lightness_mean_50_2 / np.sqrt(20 + lightness_mean_50_2)
+    )
+    chroma_term = chroma_delta / (1 + 0.045 * chroma_mean)
+    hue_term = hue_delta_scaled / (1 + 0.015 * chroma_mean * hue_weight)
+    result: NDArray[np.float64] = np.sqrt(np.maximum(
+        lightness_term ** 2 + chroma_term ** 2 + hue_term ** 2
+        + rotation * chroma_term * hue_term,
+        0,
+    ))
+    return result
+
+
+def get_distance_matrix_numpy(
+        colors_1: "Sequence[HexColor]",
+        colors_2: "Sequence[HexColor]",
+        metric: str,
+) -> "list[list[float]] | None":
+    color_lists_1 = _parse_colors(colors_1)
+    color_lists_2 = _parse_colors(colors_2)
+    if (color_lists_1 is None) or (color_lists_2 is None):
+        return None
+    distances: NDArray[np.float64] | NDArray[np.int64]
+    if metric == ColorDistanceMetric.RGB:
+        distances = np.abs(color_lists_1[:, None, :] - color_lists_2[None, :, :]).sum(axis=2)
+    elif metric == ColorDistanceMetric.OKLAB:
+        oklab_1, oklab_2 = _oklab_coordinates(color_lists_1), _oklab_coordinates(color_lists_2)
+        distances = np.sqrt(((oklab_1[:, None, :] - oklab_2[None, :, :]) ** 2).sum(axis=2))
+    else:
+        distances = _ciede2000_distances(
+            _cielab_coordinates(color_lists_1)[:, None, :],
+            _cielab_coordinates(color_lists_2)[None, :, :],
+        )
+    return distances.tolist()  # type: ignore[no-any-return]
+
+
+def _apca_luminances(color_lists: "NDArray[np.int64]") -> "NDArray[np.float64]":
+    linear = _APCA_CHANNEL_TO_LINEAR[color_lists]
+    luminances = _weighted_sum(
+        APCA_LUMINANCE_WEIGHTS, [linear[:, 0], linear[:, 1], linear[:, 2]],
+    )
+    return np.where(
+        luminances > APCA_BLACK_THRESHOLD,
+        luminances,
+        luminances + np.power(np.maximum(APCA_BLACK_THRESHOLD - luminances, 0), APCA_BLACK_CLAMP),
+    )
+
+
+def get_contrasts_numpy(
+        foregrounds: "Sequence[HexColor]",
+        backgrounds: "Sequence[HexColor]",
+        method: str,
+) -> "list[float] | None":
+    foreground_lists = _parse_colors(foregrounds)
+    background_lists = _parse_colors(backgrounds)
+    if (foreground_lists is None) or (background_lists is None):
+        return None
+    if method == ContrastMethod.WCAG:
+        luminances = np.stack([
+            _weighted_sum(LUMINANCE_WEIGHTS, _linear_channels(foreground_lists)),
+            _weighted_sum(LUMINANCE_WEIGHTS, _linear_channels(background_lists)),
+        ])
+        return (  # type: ignore[no-any-return]
+            (luminances.max(axis=0) + WCAG_LUMINANCE_OFFSET)
+            / (luminances.min(axis=0) + WCAG_LUMINANCE_OFFSET)
+        ).tolist()
+    text_luminances = _apca_luminances(foreground_lists)
+    background_luminances = _apca_luminances(background_lists)
+    is_normal = background_luminances > text_luminances
+    text_exponents = np.where(is_normal, APCA_NORMAL_EXPONENTS[0], APCA_REVERSE_EXPONENTS[0])
+    background_exponents = np.where(
+        is_normal, APCA_NORMAL_EXPONENTS[1], APCA_REVERSE_EXPONENTS[1],
+    )
+    contrasts = (
+        np.power(background_luminances, background_exponents)
+        - np.power(text_luminances, text_exponents)
+    ) * APCA_SCALE
+    contrasts = np.where(
+        (np.abs(contrasts) < APCA_LOW_CLIP)
+        | (np.abs(background_luminances - text_luminances) < APCA_MIN_LUMINANCE_DELTA),
+        0,
+        (contrasts - np.copysign(APCA_OFFSET, contrasts)) * 100,
+    )
+    return contrasts.tolist()  # type: ignore[no-any-return]
@@ -0,0 +1,110 @@
+"""
+Memoization of the pure color functions, as the same theme colors are mixed and darkened
+again on each change of the theme and for each of the plugins.
+
+The results are kept per function up to the capacity, dropping the least recently used ones.
+"""
+import functools
+from collections import OrderedDict
+from threading import Lock
+from typing import TYPE_CHECKING, ClassVar, NamedTuple
+
+from .config import COLOR_CACHE_CAPACITY
+from .helpers import log_debug
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Hashable
+    from typing import Any, ParamSpec, TypeVar
+
+    MemoizedParamsP = ParamSpec("MemoizedParamsP")
+    MemoizedResultT = TypeVar("MemoizedResultT")
+
+
+class ColorCacheStats(NamedTuple):
+    hits: int
+    misses: int
+    size: int
+    capacity: int
+
+
+class ColorCache:
+
+    capacity: ClassVar[int] = COLOR_CACHE_CAPACITY
+    _results: ClassVar["dict[str, OrderedDict[Hashable, Any]]"] = {}
+    _hits: ClassVar[dict[str, int]] = {}
+    _misses: ClassVar[dict[str, int]] = {}
+    _lock: ClassVar[Lock] = Lock()
+
+    @classmethod
+    def register(cls, name: str) -> None:
+        with cls._lock:
+            cls._results.setdefault(name, OrderedDict())
+            cls._hits.setdefault(name, 0)
+            cls._misses.setdefault(name, 0)
+
+    @classmethod
+    def get(cls, name: str, key: "Hashable") -> "tuple[bool, Any]":
+        """(True, result) if it's cached."""
+        with cls._lock:
+            results = cls._results[name]
+            if key in results:
+                cls._hits[name] += 1
+                results.move_to_end(key)
+                return True, results[key]
+            cls._misses[name] += 1
+            return False, None
+
+    @classmethod
+    def put(cls, name: str, key: "Hashable", result: "Any") -> None:
+        with cls._lock:
+            results = cls._results[name]
+            results[key] = result
+            while len(results) > cls.capacity:
+                results.popitem(last=False)
+
+    @classmethod
+    def get_stats(cls) -> dict[str, ColorCacheStats]:
+        with cls._lock:
+            return {
+                name: ColorCacheStats(
+                    hits=cls._hits[name],
+                    misses=cls._misses[name],
+                    size=len(results),
+                    capacity=cls.capacity,
+                )
+                for name, results in cls._results.items()
+            }
+
+    @classmethod
+    def log_stats(cls) -> None:
+        """Only with `OOMOX_DEBUG` env var set, see `log_debug()`."""
+        for name, stats in cls.get_stats().items():
+            calls = stats.hits + stats.misses
+            log_debug(
+                f"Color cache of {name}: {stats.hits} hits, {stats.misses} misses"
+                f" ({stats.hits / calls if calls else 0:.1%} hit rate),"
+                f" {stats.size}/{stats.capacity} results",
+            )
+
+
+def memoize_color_function(
+        function: "Callable[MemoizedParamsP, MemoizedResultT]",
+) -> "Callable[MemoizedParamsP, MemoizedResultT]":
+    """Only for the functions of hashable (color, amount, ratio...) arguments."""
+    name = function.__name__
+    ColorCache.register(name)
+
+    @functools.wraps(function)
+    def wrapper(
+            *args: "MemoizedParamsP.args", **kwargs: "MemoizedParamsP.kwargs",
+    ) -> "MemoizedResultT":
+        if ColorCache.capacity == 0:
+            return function(*args, **kwargs)
+        key = (args, tuple(kwargs.items())) if kwargs else args
+        is_cached, result = ColorCache.get(name, key)
+        if not is_cached:
+            result = function(*args, **kwargs)
+            ColorCache.put(name, key, result)
+        return result  # type: ignore[no-any-return]
+
+    return wrapper
@@ -0,0 +1,317 @@
+"""Bucket grid of RGB colors for L1-distance neighbourhood queries."""
+import bisect
+import functools
+import operator
+from typing import TYPE_CHECKING, Generic, TypeVar
+
+from .color import (
+    MIN_LIGHTNESS,
+    RGB,
+    SMALLEST_DIFF,
+    ColorDiff,
+    ColorDistanceMetric,
+    PackedColor,
+    color_hex_from_list,
+    get_color_distance,
+    int_list_from_hex,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator, Sequence
+    from typing import Final
+
+    from .color import AnyColor, HexColor, IntColor
+
+
+MAX_CHANNEL_VALUE: "Final" = 0xff
+DEFAULT_CELL_SIZE: "Final" = 32
+
+
+@functools.cache
+def _get_axis_cells(cell_size: int) -> "list[list[tuple[int, int, int]]]":
+    """
+    For each channel value: (cell, min_distance, max_distance) of every cell of the axis,
+    ordered by min_distance, so the callers could stop at the first one out of range.
+    """
+    num_cells = MAX_CHANNEL_VALUE // cell_size + 1
+    result = []
+    for value in range(MAX_CHANNEL_VALUE + 1):
+        cells = []
+        for cell in range(num_cells):
+            cell_start = cell * cell_size
+            cell_end = cell_start + cell_size - 1
+            cells.append((
+                cell,
+                max(0, cell_start - value, value - cell_end),
+                max(value - cell_start, cell_end - value),
+            ))
+        cells.sort(key=operator.itemgetter(1))
+        result.append(cells)
+    return result
+
+
+class ColorGrid:
+    """
+    Answers "how many (or which) of the colors lie within L1 radius"
+    by checking only the grid cells which intersect with the radius,
+    and counting the cells which are completely inside of it without checking each color.
+
+    Radius is exclusive, like `abs_diff < COLOR_DIFF_MARGIN` in terminal palette generator.
+    """
+
+    cell_size: int
+    _cells: dict[tuple[int, int, int], list[tuple[int, int, int, int]]]
+    _red_green_cells: set[tuple[int, int]]
+    _axis_cells: list[list[tuple[int, int, int]]]
+    _length: int
+
+    def __init__(self, colors: "Iterable[IntColor]", cell_size: int = DEFAULT_CELL_SIZE) -> None:
+        self.cell_size = cell_size
+        self._axis_cells = _get_axis_cells(cell_size)
+        self._cells = {}
+        self._red_green_cells = set()
+        self._length = 0
+        for index, (red, green, blue) in enumerate(colors):
+            red_cell, green_cell = red // cell_size, green // cell_size
+            self._cells.setdefault(
+                (red_cell, green_cell, blue // cell_size), [],
+            ).append((index, red, green, blue))
+            self._red_green_cells.add((red_cell, green_cell))
+            self._length += 1
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _iter_cells(
+            self, color: "IntColor", radius: int,
+    ) -> "Iterator[tuple[list[tuple[int, int, int, int]], bool]]":
+        """
+        Non-empty cells which intersect with the radius,
+        and whether they're completely inside of it.
+        """
+        red, green, blue = color
+        axis_cells = self._axis_cells
+        for red_cell, red_min, red_max in axis_cells[red]:
+            if red_min >= radius:
+                break
+            for green_cell, green_min, green_max in axis_cells[green]:
+                red_green_min = red_min + green_min
+                if red_green_min >= radius:
+                    break
+                if (red_cell, green_cell) not in self._red_green_cells:
+                    continue
+                red_green_max = red_max + green_max
+                for blue_cell, blue_min, blue_max in axis_cells[blue]:
+                    if red_green_min + blue_min >= radius:
+                        break
+                    cell = self._cells.get((red_cell, green_cell, blue_cell))
+                    if cell:
+                        yield cell, (red_green_max + blue_max < radius)
+
+    def count_within(self, color: "IntColor", radius: int) -> int:
+        red, green, blue = color
+        count = 0
+        for cell, is_inside in self._iter_cells(color, radius):
+            if is_inside:
+                count += len(cell)
+                continue
+            for _index, other_red, other_green, other_blue in cell:
+                if (
+                        abs(red - other_red) + abs(green - other_green) + abs(blue - other_blue)
+                ) < radius:
+                    count += 1
+        return count
+
+    def iter_within(self, color: "IntColor", radius: int) -> "Iterator[tuple[int, int]]":
+        """(index, distance) of each of the colors within the radius, in no particular order."""
+        red, green, blue = color
+        for cell, _is_inside in self._iter_cells(color, radius):
+            for index, other_red, other_green, other_blue in cell:
+                distance = (
+                    abs(red - other_red) + abs(green - other_green) + abs(blue - other_blue)
+                )
+                if distance < radius:
+                    yield index, distance
+
+    def nearest(self, color: "IntColor") -> int | None:
+        """
+        Index of the closest color, the first one of the equally close,
+        or `None` if the grid is empty.
+        """
+        if not self._length:
+            return None
+        radius = self.cell_size
+        while True:
+            found = min(
+                self.iter_within(color, radius),
+                key=operator.itemgetter(1, 0),
+                default=None,
+            )
+            if found is not None:
+                return found[0]
+            # nothing closer than radius, so the whole palette is further:
+            radius *= 2
+
+
+ColorT = TypeVar("ColorT", str, PackedColor)
+
+
+def _can_widen_lightness_band(min_lightness: int, max_lightness: int) -> bool:
+    """If halving the lower bound and doubling the upper one could include more colors."""
+    return (min_lightness > 0) or (0 < max_lightness < RGB.hex_size * RGB.length)
+
+
+class ColorLightnessIndex(Generic[ColorT]):
+    """
+    Closest of the palette colors within the lightness (channel sum) band,
+    parsing and indexing the palette once for all the queries.
+
+    It's the first one of the equally close ones, closer than `SMALLEST_DIFF`,
+    and if there is none - the lower bound of the band is halved and the upper one is doubled
+    until there is.
+
+    With perceptual `metric` the distances from all the queried colors to all the palette ones
+    are computed at once, and they're not limited by `SMALLEST_DIFF`.
+    """
+
+    metric: str
+    _colors: list[ColorT]
+    _color_lists: "list[IntColor]"
+    _lightnesses: list[int]
+    _sorted_lightnesses: list[int]
+    _grid: ColorGrid
+
+    def __init__(
+            self,
+            colors: "Sequence[ColorT]",
+            metric: str = ColorDistanceMetric.RGB,
+    ) -> None:
+        get_color_distance(metric)
+        self.metric = metric
+        self._colors = list(colors)
+        self._color_lists = [int_list_from_hex(color) for color in self._colors]
+        self._lightnesses = [sum(color_list) for color_list in self._color_lists]
+        self._sorted_lightnesses = sorted(self._lightnesses)
+        self._grid = ColorGrid(self._color_lists)
+
+    def __len__(self) -> int:
+        return len(self._colors)
+
+    def _has_lightness_within(self, min_lightness: int, max_lightness: int) -> bool:
+        idx = bisect.bisect_left(self._sorted_lightnesses, min_lightness)
+        return (idx < len(self._sorted_lightnesses)) and (
+            self._sorted_lightnesses[idx] <= max_lightness
+        )
+
+    def _get_distances(
+            self, color_lists: "Sequence[IntColor]",
+    ) -> "Sequence[Sequence[float] | None]":
+        """Distances to each of the palette colors, `None` if they're searched in the grid."""
+        if self.metric == ColorDistanceMetric.RGB:
+            return [None] * len(color_lists)
+        from .color_batch import get_distance_matrix  # pylint: disable=import-outside-toplevel
+        hex_colors: list[HexColor] = [color_hex_from_list(color_list) for color_list in color_lists]
+        return get_distance_matrix(
+            hex_colors,
+            [color_hex_from_list(color_list) for color_list in self._color_lists],
+            self.metric,
+        )
+
+    def _closest_index(
+            self,
+            color_list: "IntColor",
+            min_lightness: int,
+            max_lightness: int,
+            distances: "Sequence[float] | None",
+    ) -> int | None:
+        if not self._has_lightness_within(min_lightness, max_lightness):
+            return None
+        lightnesses = self._lightnesses
+        if distances is not None:
+            return min(
+                (
+                    (distance, index)
+                    for index, distance in enumerate(distances)
+                    if max_lightness >= lightnesses[index] >= min_lightness
+                ),
+                default=(None, None),
+            )[1]
+        max_radius = SMALLEST_DIFF.abs_sum
+        radius = self._grid.cell_size
+        while True:
+            radius = min(radius, max_radius)
+            found = min(
+                (
+                    (distance, index)
+                    for index, distance in self._grid.iter_within(color_list, radius)
+                    if max_lightness >= lightnesses[index] >= min_lightness
+                ),
+                default=None,
+            )
+            if found is not None:
+                return found[1]
+            if radius == max_radius:
+                return None
+            # nothing closer than radius within the band, so the rest of it is further:
+            radius *= 2
+
+    def _closest(
+            self,
+            color_list: "IntColor",
+            min_lightness: int,
+            max_lightness: int,
+            distances: "Sequence[float] | None",
+    ) -> "tuple[None, None] | tuple[ColorT, ColorDiff]":
+        if len(self._colors) == 1:
+            return self._colors[0], ColorDiff.from_channels(self._color_lists[0], color_list)
+        while (closest_index := self._closest_index(
+                color_list, min_lightness, max_lightness, distances,
+        )) is None:
+            if not _can_widen_lightness_band(min_lightness, max_lightness):
+                return None, None
+            min_lightness //= 2
+            max_lightness *= 2
+        return self._colors[closest_index], ColorDiff.from_channels(
+            self._color_lists[closest_index], color_list,
+        )
+
+    def closest_many(
+            self,
+            colors: "Sequence[AnyColor]",
+            min_lightness: int = MIN_LIGHTNESS,
+            max_lightness: int = RGB.hex_size * RGB.length,
+    ) -> "list[tuple[None, None] | tuple[ColorT, ColorDiff]]":
+        """
+        The closest color for each of the colors, and the difference to it.
+
+        The only color of one-color palette is returned regardless of the band,
+        `None` if the palette is empty, or if widening the band can't find any color.
+        """
+        if not self._colors:
+            return [(None, None) for _color in colors]
+        color_lists = [int_list_from_hex(color) for color in colors]
+        return [
+            self._closest(color_list, min_lightness, max_lightness, distances)
+            for color_list, distances in zip(
+                color_lists, self._get_distances(color_lists), strict=True,
+            )
+        ]
+
+    def nearest_many(self, colors: "Sequence[AnyColor]") -> "list[ColorT | None]":
+        """
+        The closest color for each of the colors regardless of lightness and `SMALLEST_DIFF`,
+        `None` if the palette is empty.
+        """
+        if not self._colors:
+            return [None for _color in colors]
+        color_lists = [int_list_from_hex(color) for color in colors]
+        result = []
+        for color_list, distances in zip(
+                color_lists, self._get_distances(color_lists), strict=True,
+        ):
+            closest_index = (
+                self._grid.nearest(color_list) if distances is None
+                else min(range(len(distances)), key=distances.__getitem__)
+            )
+            result.append(None if closest_index is None else self._colors[closest_index])
+        return result
@@ -22,6 +22,10 @@ PLUGINS_DIR: "Final" = os.path.join(
 TERMINAL_TEMPLATE_DIR: "Final" = os.path.join(
     OOMOX_ROOT_DIR, "terminal_templates/",
 )
+# generated by `make terminal_palettes`:
+TERMINAL_PALETTES_BUNDLE_PATH: "Final" = os.path.join(
+    OOMOX_ROOT_DIR, "terminal_palettes.json.gz",
+)
 
 
 USER_CONFIG_DIR: "Final" = os.path.abspath(os.path.join(
@@ -49,3 +53,22 @@ USER_EXPORT_CONFIG_DIR: "Final" = os.path.join(
 BUILTIN_EXPORT_CONFIG_DIR: "Final" = os.path.join(
     OOMOX_ROOT_DIR, "export_config_examples/",
 )
+
+
+USER_CACHE_DIR: "Final" = os.path.abspath(os.path.join(
+    os.environ.get(
+        "XDG_CACHE_HOME",
+        os.path.join(
+            os.environ.get("HOME", os.path.expanduser("~")),
+            ".cache/",
+        ),
+    ),
+    "oomox/",
+))
+
+
+# print debug info (like smarty search stats) to stderr:
+DEBUG: "Final" = os.environ.get("OOMOX_DEBUG", "") not in {"", "0"}
+
+# max number of results kept for each of memoized color functions, 0 to not memoize them:
+COLOR_CACHE_CAPACITY: "Final" = int(os.environ.get("OOMOX_COLOR_CACHE_CAPACITY", "4096"))
@@ -0,0 +1,341 @@
+"""
+Audit contrast of foreground/background color pairs of the theme presets.
+
+Presets are loaded (with the fallback values resolved and the terminal palette generated)
+by a pool of worker processes, then WCAG and APCA contrasts of the pairs of all of them
+are computed at once, and reported from the least readable ones.
+"""
+import argparse
+import contextlib
+import fnmatch
+import json
+import string
+import sys
+from multiprocessing.pool import Pool
+from pathlib import Path
+from time import time
+from typing import TYPE_CHECKING, NamedTuple
+
+from oomox_gui.color import ContrastMethod
+from oomox_gui.color_batch import get_contrasts
+from oomox_gui.config import DEFAULT_ENCODING
+from oomox_gui.terminal import generate_terminal_colors_for_oomox
+from oomox_gui.theme_file import get_presets
+from oomox_gui.theme_file_parser import read_colorscheme_from_path
+from oomox_gui.theme_model import warm_up_plugins
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator, Sequence
+    from typing import Final
+
+    from .color import HexColor
+    from .theme_file import PresetFile, ThemeT
+
+
+CONTRAST_AUDIT_PAIRS: "Final" = (
+    # foreground key, background key
+    ("FG", "BG"),
+    ("TXT_FG", "TXT_BG"),
+    ("SEL_FG", "SEL_BG"),
+    ("HDR_FG", "HDR_BG"),
+    ("BTN_FG", "BTN_BG"),
+    ("HDR_BTN_FG", "HDR_BTN_BG"),
+    ("MENU_FG", "MENU_BG"),
+    ("TERMINAL_FOREGROUND", "TERMINAL_BACKGROUND"),
+    *((f"TERMINAL_COLOR{i}", "TERMINAL_BACKGROUND") for i in range(16)),
+)
+# WCAG AA for normal text:
+DEFAULT_MIN_WCAG_CONTRAST: "Final" = 4.5
+# APCA Lc (of either polarity) for the content text:
+DEFAULT_MIN_APCA_CONTRAST: "Final" = 60.0
+CONTRAST_AUDIT_SORT_KEYS: "Final" = ("wcag", "apca", "preset")
+CONTRAST_AUDIT_FORMATS: "Final" = ("tsv", "jsonl")
+HEX_COLOR_LENGTH: "Final" = 6
+
+
+class ContrastPair(NamedTuple):
+    preset: str
+    foreground_key: str
+    background_key: str
+    foreground: "HexColor"
+    background: "HexColor"
+
+
+class ContrastAuditResult(NamedTuple):
+    preset: str
+    foreground_key: str
+    background_key: str
+    foreground: "HexColor"
+    background: "HexColor"
+    wcag: float
+    apca: float
+    # contrast methods by which the pair is below the threshold:
+    failed: tuple[str, ...]
+
+
+class PresetPairs(NamedTuple):
+    preset: str
+    pairs: list[ContrastPair]
+    error: str | None
+
+
+def _is_hex_color(value: object) -> bool:
+    return isinstance(value, str) and (len(value) == HEX_COLOR_LENGTH) and all(
+        char in string.hexdigits for char in value
+    )
+
+
+def _read_preset_colorscheme(preset: "PresetFile") -> "ThemeT":
+    themes: list[ThemeT] = []
+    read_colorscheme_from_path(preset.path, callback=themes.append)
+    if not themes:
+        msg = f"can't read theme from {preset.path}"
+        raise RuntimeError(msg)
+    results: list[ThemeT] = []
+    # jobs themselves are already spread over the processes, so using only one per preset:
+    generate_terminal_colors_for_oomox(
+        colorscheme=themes[0],
+        processes=1,
+        result_callback=results.append,
+    )
+    if not results:
+        msg = "terminal palette wasn't generated"
+        raise RuntimeError(msg)
+    return results[-1]
+
+
+def read_preset_pairs(preset: "PresetFile") -> PresetPairs:
+    """Color pairs of the preset which are defined in it (or resolved from fallbacks)."""
+    try:
+        colorscheme = _read_preset_colorscheme(preset)
+    except Exception as exc:
+        # one broken preset shouldn't stop the whole audit:
+        return PresetPairs(
+            preset=preset.name, pairs=[], error=f"{exc.__class__.__name__}: {exc}",
+        )
+    return PresetPairs(
+        preset=preset.name,
+        pairs=[
+            ContrastPair(
+                preset=preset.name,
+                foreground_key=foreground_key,
+                background_key=background_key,
+                foreground=colorscheme[foreground_key],  # type: ignore[arg-type]
+                background=colorscheme[background_key],  # type: ignore[arg-type]
+            )
+            for foreground_key, background_key in CONTRAST_AUDIT_PAIRS
+            if _is_hex_color(colorscheme.get(foreground_key))
+            and _is_hex_color(colorscheme.get(background_key))
+        ],
+        error=None,
+    )
+
+
+def get_preset_files(patterns: "Sequence[str]" = ()) -> "list[PresetFile]":
+    """All the presets (built-in, user and of import plugins), or the ones matching the patterns."""
+    return [
+        preset
+        for preset_dirs in get_presets().values()
+        for presets in preset_dirs.values()
+        for preset in presets
+        if (not patterns) or any(fnmatch.fnmatch(preset.name, pattern) for pattern in patterns)
+    ]
+
+
+def read_all_preset_pairs(
+        presets: "Sequence[PresetFile]",
+        processes: int | None = None,
+) -> "Iterator[PresetPairs]":
+    warm_up_plugins()
+    if processes == 1:
+        yield from map(read_preset_pairs, presets)
+        return
+    # workers are inheriting already warmed-up modules when forked,
+    # and initializer is for the platforms where they're spawned:
+    with Pool(processes=processes, initializer=warm_up_plugins) as pool:
+        yield from pool.imap_unordered(read_preset_pairs, presets)
+
+
+def audit_contrast(
+        pairs: "Sequence[ContrastPair]",
+        min_wcag_contrast: float = DEFAULT_MIN_WCAG_CONTRAST,
+        min_apca_contrast: float = DEFAULT_MIN_APCA_CONTRAST,
+) -> list[ContrastAuditResult]:
+    foregrounds = [pair.foreground for pair in pairs]
+    backgrounds = [pair.background for pair in pairs]
+    wcag_contrasts = get_contrasts(foregrounds, backgrounds, ContrastMethod.WCAG)
+    apca_contrasts = get_contrasts(foregrounds, backgrounds, ContrastMethod.APCA)
+    return [
+        ContrastAuditResult(
+            *pair,
+            wcag=wcag_contrast,
+            apca=apca_contrast,
+            failed=tuple(
+                method for method, is_failed in (
+                    (ContrastMethod.WCAG, wcag_contrast < min_wcag_contrast),
+                    (ContrastMethod.APCA, abs(apca_contrast) < min_apca_contrast),
+                ) if is_failed
+            ),
+        )
+        for pair, wcag_contrast, apca_contrast in zip(
+            pairs, wcag_contrasts, apca_contrasts, strict=True,
+        )
+    ]
+
+
+def get_sort_key(sort_by: str) -> "Callable[[ContrastAuditResult], tuple[str | float, ...]]":
+    """From the least readable pair, or by preset name."""
+    if sort_by == "wcag":
+        return lambda result: (result.wcag, result.preset, result.foreground_key)
+    if sort_by == "apca":
+        return lambda result: (abs(result.apca), result.preset, result.foreground_key)
+    if sort_by == "preset":
+        return lambda result: (result.preset, result.wcag)
+    msg = f"Unknown sort key {sort_by!r}"
+    raise ValueError(msg)
+
+
+def format_report(
+        results: "Iterable[ContrastAuditResult]", output_format: str,
+) -> "Iterator[str]":
+    if output_format == "jsonl":
+        for result in results:
+            yield json.dumps(result._asdict())
+        return
+    yield "\t".join(ContrastAuditResult._fields)
+    for result in results:
+        yield "\t".join((
+            *result[:5],
+            f"{result.wcag:.2f}",
+            f"{result.apca:.1f}",
+            ",".join(result.failed),
+        ))
+
+
+def main() -> None:
+    my_name = Path(sys.argv[0]).name
+    parser = argparse.ArgumentParser(
+        description="Themix Contrast Audit CLI",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=f"""
+------------------------
+
+Audited pairs (if they're defined in the preset or resolved from the fallbacks):
+
+    {", ".join(f"{foreground}/{background}" for foreground, background in CONTRAST_AUDIT_PAIRS[:8])},
+    TERMINAL_COLOR0..15/TERMINAL_BACKGROUND
+
+Report columns: {", ".join(ContrastAuditResult._fields)}.
+`wcag` is WCAG 2 contrast ratio (1..21), `apca` is APCA lightness contrast
+(negative for the light text on the dark background),
+`failed` are the methods by which the pair is below the threshold.
+
+Exit status is 1 if some of the pairs are below the thresholds, or some presets failed to load.
+
+------------------------
+
+Examples:
+
+Audit all the presets, from the least readable pairs:
+
+    $ {my_name} > contrast.tsv
+
+Only the failing pairs of Featured presets by APCA, as JSON Lines:
+
+    $ {my_name} 'Featured/*' --sort apca --format jsonl --failed-only
+
+""",
+    )
+    parser.add_argument(
+        "presets",
+        nargs="*",
+        help="glob patterns of preset names, like 'Featured/*' (default: all the presets)",
+    )
+    parser.add_argument(
+        "-o", "--output",
+        default=None,
+        help="path to the report (default: stdout)",
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=None,
+        help="number of worker processes (default: all CPU cores)",
+    )
+    parser.add_argument(
+        "--sort",
+        choices=CONTRAST_AUDIT_SORT_KEYS,
+        default=CONTRAST_AUDIT_SORT_KEYS[0],
+        help="sort the report by (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=CONTRAST_AUDIT_FORMATS,
+        default=CONTRAST_AUDIT_FORMATS[0],
+        help="report format (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--min-wcag",
+        type=float,
+        default=DEFAULT_MIN_WCAG_CONTRAST,
+        help="minimal WCAG contrast ratio (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--min-apca",
+        type=float,
+        default=DEFAULT_MIN_APCA_CONTRAST,
+        help="minimal absolute APCA lightness contrast (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--failed-only",
+        action="store_true",
+        help="report only the pairs below the thresholds",
+    )
+    args = parser.parse_args()
+
+    # plugins are reporting to stdout when they're loaded, which is used for the report:
+    warm_up_plugins()
+    presets = get_preset_files(args.presets)
+    if not presets:
+        print(f":: no presets matching {args.presets}", file=sys.stderr)
+        sys.exit(1)
+    start_time = time()
+    all_pairs: list[ContrastPair] = []
+    num_errors = 0
+    for preset_pairs in read_all_preset_pairs(presets, processes=args.jobs):
+        if preset_pairs.error:
+            num_errors += 1
+            print(f":: {preset_pairs.preset}: {preset_pairs.error}", file=sys.stderr)
+        all_pairs += preset_pairs.pairs
+    read_time = time() - start_time
+
+    start_time = time()
+    results = audit_contrast(all_pairs, args.min_wcag, args.min_apca)
+    print(
+        f"{len(presets)} presets read in {read_time:.8f}s,"
+        f" contrast of {len(results)} pairs computed in {time() - start_time:.8f}s",
+        file=sys.stderr,
+    )
+    num_failed = sum(bool(result.failed) for result in results)
+    if args.failed_only:
+        results = [result for result in results if result.failed]
+    results.sort(key=get_sort_key(args.sort))
+
+    with contextlib.ExitStack() as stack:
+        output_file = (
+            stack.enter_context(Path(args.output).open("w", encoding=DEFAULT_ENCODING))
+            if args.output else
+            sys.stdout
+        )
+        for line in format_report(results, args.format):
+            output_file.write(line + "\n")
+    if num_errors:
+        print(f":: {num_errors} preset(s) failed to load", file=sys.stderr)
+    if num_failed:
+        print(f":: {num_failed} pair(s) below the contrast thresholds", file=sys.stderr)
+    if num_errors or num_failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from .config import DEFAULT_ENCODING, USER_CACHE_DIR
+from .helpers import log_error, mkdir_p
+
+if TYPE_CHECKING:
+    from typing import Any, Final
+
+
+CACHE_FILE_EXTENSION: "Final" = ".json"
+FILE_DIGEST_CHUNK_SIZE: "Final" = 1024 * 1024
+
+
+def stable_digest(data: "Any") -> str:
+    """
+    Digest which stays the same between runs and Python versions
+    for the same JSON-like data, unlike `hash()` or `str()` of it.
+    """
+    return hashlib.sha256(
+        json.dumps(
+            data, sort_keys=True, separators=(",", ":"), default=str,
+        ).encode(DEFAULT_ENCODING),
+    ).hexdigest()
+
+
+def file_digest(path: str) -> str:
+    """Digest of the file content, read by chunks to not load the whole big file at once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file_object:
+        while chunk := file_object.read(FILE_DIGEST_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """
+    JSON key-value cache stored as one file per entry under XDG cache dir,
+    with least-recently-used eviction both in memory and on disk.
+    """
+
+    name: str
+    cache_dir: str
+    max_entries: int
+    memory_max_entries: int
+    _memory: "OrderedDict[str, Any]"
+
+    def __init__(
+            self,
+            name: str,
+            max_entries: int = 1000,
+            memory_max_entries: int = 100,
+            cache_dir: str | None = None,
+    ) -> None:
+        self.name = name
+        self.cache_dir = cache_dir or os.path.join(USER_CACHE_DIR, name)
+        self.max_entries = max_entries
+        self.memory_max_entries = memory_max_entries
+        self._memory = OrderedDict()
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + CACHE_FILE_EXTENSION)
+
+    def _remember(self, key: str, value: "Any") -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> "Any | None":
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        path = self._get_path(key)
+        try:
+            with open(path, encoding=DEFAULT_ENCODING) as file_object:
+                value = json.load(file_object)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            log_error(f"Error loading {self.name} cache entry {path}: {exc}")
+            self.remove(key)
+            return None
+        self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: "Any") -> None:
+        self._remember(key, value)
+        try:
+            mkdir_p(self.cache_dir)
+            file_descriptor, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(file_descriptor, "w", encoding=DEFAULT_ENCODING) as file_object:
+                json.dump(value, file_object)
+            os.replace(tmp_path, self._get_path(key))
+        except OSError as exc:
+            log_error(f"Can't write {self.name} cache entry: {exc}")
+            return
+        self.evict()
+
+    def remove(self, key: str) -> None:
+        self._memory.pop(key, None)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._get_path(key))
+
+    def evict(self) -> None:
+        try:
+            entries = [
+                entry for entry in os.scandir(self.cache_dir)
+                if entry.name.endswith(CACHE_FILE_EXTENSION)
+            ]
+        except FileNotFoundError:
+            return
+        if len(entries) <= self.max_entries:
+            return
+
+        def get_mtime(entry: os.DirEntry[str]) -> float:
+            try:
+                return entry.stat().st_mtime
+            except FileNotFoundError:
+                return 0
+
+        entries.sort(key=get_mtime)
+        for entry in entries[:len(entries) - self.max_entries]:
+            self.remove(entry.name.removesuffix(CACHE_FILE_EXTENSION))
@@ -1,3 +1,4 @@
+import functools
 import importlib
 import os
 import re
@@ -6,6 +7,8 @@ import warnings
 from types import TracebackType
 from typing import TYPE_CHECKING
 
+from .config import DEBUG
+
 if TYPE_CHECKING:
     from collections.abc import Callable, Iterable
     from types import ModuleType
@@ -39,6 +42,12 @@ def get_plugin_module(name: str, path: str, submodule: str | None = None) -> "Mo
     return module  # type: ignore[no-any-return]
 
 
+@functools.cache
+def get_cached_plugin_module(name: str, path: str, submodule: str | None = None) -> "ModuleType":
+    """`get_plugin_module()` loaded only once per process, like for the long-lived pool workers."""
+    return get_plugin_module(name, path, submodule)
+
+
 def natural_sort(list_to_sort: "list[SortableT]") -> "Iterable[SortableT]":
     def convert(text: str) -> str | int:
         return int(text) if text.isdigit() else text.lower()
@@ -80,6 +89,12 @@ def log_error(info: "Any") -> None:
     sys.stderr.write(f"{info!s}\n")
 
 
+def log_debug(info: "Any") -> None:
+    """Only with `OOMOX_DEBUG` env var set."""
+    if DEBUG:
+        log_error(info)
+
+
 class SuppressWarningsFilter:
 
     warn_list: list[warnings.WarningMessage]
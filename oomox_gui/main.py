@@ -10,6 +10,7 @@ from typing import TYPE_CHECKING
 from gi.repository import Gdk, Gio, GLib, Gtk
 
 from .about import show_about
+from .color_cache import ColorCache
 from .colors_list import ThemeColorsList
 from .config import USER_COLORS_DIR
 from .gtk_helpers import (
@@ -53,6 +54,7 @@ if TYPE_CHECKING:
         OomoxImportPlugin,
         OomoxThemePlugin,
     )
+    from .terminal_ranking import TemplateScore
     from .theme_file import ThemeT
 
 
@@ -152,6 +154,8 @@ class OomoxApplicationWindow(WindowWithActions):  # pylint: disable=too-many-ins
     #
     plugin_theme: "OomoxThemePlugin | None" = None
     plugin_icons: "OomoxIconsPlugin | None" = None
+    # with "Pick the Best Matching Theme Style" option, from the best one:
+    terminal_templates_ranking: "Sequence[TemplateScore]" = ()
     #
     # actions:
     action_save: Gio.SimpleAction
@@ -367,6 +371,10 @@ class OomoxApplicationWindow(WindowWithActions):  # pylint: disable=too-many-ins
             print()
         else:
             self.preview.show()
+        if self.preview.terminal_preview:
+            self.preview.terminal_preview.update_templates_ranking(
+                self.terminal_templates_ranking,
+            )
         for theme_value in self.colorscheme.values():
             if not isinstance(theme_value, Exception):
                 continue
@@ -379,6 +387,13 @@ class OomoxApplicationWindow(WindowWithActions):  # pylint: disable=too-many-ins
     def schedule_task(task: "Callable[..., None]", *args: "Any") -> None:
         Gdk.threads_add_idle(GLib.PRIORITY_LOW, task, *args)
 
+    @staticmethod
+    def show_error(error: Exception) -> None:
+        warn_once(
+            text=str(error),
+            buttons=Gtk.ButtonsType.CLOSE,
+        )
+
     def on_preset_selected(
             self,
             selected_preset_name: str,
@@ -408,6 +423,8 @@ class OomoxApplicationWindow(WindowWithActions):  # pylint: disable=too-many-ins
             self.colorscheme.update(colors)
             callback()
 
+        self.terminal_templates_ranking = ()
+
         generate_terminal_colors_for_oomox(
             self.colorscheme,
             window=self,
@@ -976,6 +993,7 @@ def main() -> None:
     signal.signal(signal.SIGINT, handle_sig_int)
     signal.signal(signal.SIGTERM, handle_sig_term)
     app.run(sys.argv)
+    ColorCache.log_stats()
 
 
 if __name__ == "__main__":
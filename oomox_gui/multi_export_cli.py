@@ -92,9 +92,10 @@ def do_multi_export(args: argparse.Namespace) -> None:
     app = OomoxGtkApplication(show_window=False)
 
     def callback1(theme: "ThemeT") -> None:
+        # without window to get only the final terminal palette, not the intermediate ones:
         generate_terminal_colors_for_oomox(
             colorscheme=theme,
-            window=app.window,
+            processes=args.jobs,
             result_callback=callback2,
         )
 
@@ -168,6 +169,15 @@ or use in the scripts etc:
             ", strip extra metadata from export layout config, for uploading it or using in manual scripts"
         ),
     )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=None,
+        help=(
+            "number of processes to use for generating Advanced (smarty) terminal palette"
+            f" (default: 1, all CPU cores: {os.cpu_count()})"
+        ),
+    )
     args = parser.parse_args()
 
     if args.strip:
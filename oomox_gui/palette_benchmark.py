@@ -0,0 +1,226 @@
+"""
+Benchmark of the image palette quantizers of Import Colors From Image plugin.
+
+Extracts the palette of each image with `ima` (the reference) and with each of NumPy quantizers,
+recording wall time of each and the similarity of the palette to the reference one.
+All of them are getting the image decoded already reduced, like the plugin does,
+so the decoding time is the same for each of them.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING, NamedTuple
+
+from oomox_gui.color import ColorDistanceMetric
+from oomox_gui.color_batch import get_distance_matrix
+from oomox_gui.config import DEFAULT_ENCODING, PLUGINS_DIR
+from oomox_gui.helpers import get_plugin_module
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+    from types import ModuleType
+    from typing import Final
+
+    from .color import HexColor
+
+
+IMAGE_PLUGIN_DIR: "Final" = os.path.join(PLUGINS_DIR, "import_from_image")
+REFERENCE_METHOD: "Final" = "ima"
+# same as `_PIL_PALETTE_QUALITY` options of the plugin:
+BENCHMARK_QUALITY_LEVELS: "Final" = (100, 200, 400)
+BENCHMARK_METRICS: "Final" = (
+    ColorDistanceMetric.CIEDE2000, ColorDistanceMetric.OKLAB, ColorDistanceMetric.RGB,
+)
+
+
+class PaletteBenchmarkResult(NamedTuple):
+    image: str
+    method: str
+    quality: int
+    # the best of the repeats (s):
+    time: float
+    num_colors: int
+    # mean distance from each color to the nearest one of the other palette, both ways
+    # (`None` for the reference itself):
+    distance: float | None = None
+
+
+def _get_quantizer_function(
+        quantizer: "ModuleType", preprocessor: "ModuleType", method: str,
+) -> "Callable[[str, int], list[HexColor]]":
+    def get_palette(image_path: str, quality: int) -> "list[HexColor]":
+        return quantizer.get_hex_palette(  # type: ignore[no-any-return]
+            preprocessor.load_image(image_path, quality), method=method,
+        )
+    return get_palette
+
+
+def get_palette_functions() -> "dict[str, Callable[[str, int], list[HexColor]]]":
+    image_analyzer = get_plugin_module("ima", os.path.join(IMAGE_PLUGIN_DIR, "ima.py"))
+    quantizer = get_plugin_module("quantize", os.path.join(IMAGE_PLUGIN_DIR, "quantize.py"))
+    preprocessor = get_plugin_module(
+        "preprocess", os.path.join(IMAGE_PLUGIN_DIR, "preprocess.py"),
+    )
+    return {
+        REFERENCE_METHOD: lambda image_path, quality: image_analyzer.get_hex_palette_from_image(
+            preprocessor.load_image(image_path, quality), quality=quality,
+        ),
+        **{
+            method: _get_quantizer_function(quantizer, preprocessor, method)
+            for method in (quantizer.QuantizeMethod.MEDIAN_CUT, quantizer.QuantizeMethod.KMEANS)
+        },
+    }
+
+
+def get_palette_distance(
+        palette_1: "Sequence[HexColor]",
+        palette_2: "Sequence[HexColor]",
+        metric: str = ColorDistanceMetric.CIEDE2000,
+) -> float:
+    """Symmetric mean of the distances to the nearest color of the other palette."""
+    distances = get_distance_matrix(palette_1, palette_2, metric)
+    nearest_distances: list[float] = [
+        *(min(row) for row in distances),
+        *(min(column) for column in zip(*distances, strict=True)),
+    ]
+    return statistics.mean(nearest_distances)
+
+
+def _measure(
+        palette_function: "Callable[[str, int], list[HexColor]]",
+        image_path: str,
+        quality: int,
+        repeat: int,
+) -> "tuple[float, list[HexColor]]":
+    best_time = float("inf")
+    palette: list[HexColor] = []
+    for _repeat in range(repeat):
+        start_time = perf_counter()
+        palette = palette_function(image_path, quality)
+        best_time = min(best_time, perf_counter() - start_time)
+    return best_time, palette
+
+
+def run_benchmark(
+        image_paths: "Sequence[str]",
+        methods: "Sequence[str]",
+        quality_levels: "Sequence[int]",
+        repeat: int = 1,
+        metric: str = ColorDistanceMetric.CIEDE2000,
+) -> list[PaletteBenchmarkResult]:
+    palette_functions = get_palette_functions()
+    results = []
+    for image_path in image_paths:
+        for quality in quality_levels:
+            reference_time, reference_palette = _measure(
+                palette_functions[REFERENCE_METHOD], image_path, quality, repeat,
+            )
+            reference_result = PaletteBenchmarkResult(
+                image=image_path, method=REFERENCE_METHOD, quality=quality,
+                time=reference_time, num_colors=len(reference_palette),
+            )
+            results.append(reference_result)
+            print(
+                f":: {image_path} quality={quality}"
+                f" {REFERENCE_METHOD}: {reference_time:.8f}s,"
+                f" {reference_result.num_colors} colors",
+            )
+            for method in methods:
+                time, palette = _measure(palette_functions[method], image_path, quality, repeat)
+                result = PaletteBenchmarkResult(
+                    image=image_path, method=method, quality=quality,
+                    time=time, num_colors=len(palette),
+                    distance=get_palette_distance(reference_palette, palette, metric),
+                )
+                results.append(result)
+                print(
+                    f"   {method}: {time:.8f}s ({reference_time / time:.1f}x),"
+                    f" {result.num_colors} colors, {metric} distance to {REFERENCE_METHOD}"
+                    f" {result.distance:.2f}",
+                )
+    return results
+
+
+def main() -> None:
+    my_name = Path(sys.argv[0]).name
+    methods = [method for method in get_palette_functions() if method != REFERENCE_METHOD]
+    parser = argparse.ArgumentParser(
+        description="Themix Image Palette Quantizers Benchmark",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=f"""
+------------------------
+
+`distance` is the mean distance from each color of the palette
+to the nearest color of `{REFERENCE_METHOD}` one and vice versa
+(with CIEDE2000 metric below 1 is about not noticeable, below 5 is close).
+
+------------------------
+
+Examples:
+
+Compare all the quantizers on the wallpapers with the plugin quality levels:
+
+    $ {my_name} ~/Pictures/Wallpapers/*.jpg -o palette_benchmark.json
+
+Only k-means at high quality, the best of 5 runs:
+
+    $ {my_name} wallpaper.png --methods kmeans --quality 400 --repeat 5
+
+""",
+    )
+    parser.add_argument(
+        "images",
+        nargs="+",
+        help="paths to the images",
+    )
+    parser.add_argument(
+        "-o", "--output",
+        default=None,
+        help="path to JSON report (default: only print the results)",
+    )
+    parser.add_argument(
+        "--methods",
+        nargs="+",
+        choices=methods,
+        default=methods,
+        help="quantizers to compare with `ima` (default: all)",
+    )
+    parser.add_argument(
+        "--quality",
+        nargs="+",
+        type=int,
+        default=list(BENCHMARK_QUALITY_LEVELS),
+        help="image widths to quantize (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="measure the best time of that many runs (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--metric",
+        choices=BENCHMARK_METRICS,
+        default=BENCHMARK_METRICS[0],
+        help="color distance metric for palette similarity (default: %(default)s)",
+    )
+    args = parser.parse_args()
+
+    results = run_benchmark(
+        args.images, args.methods, args.quality, repeat=args.repeat, metric=args.metric,
+    )
+    if args.output:
+        with Path(args.output).open("w", encoding=DEFAULT_ENCODING) as fobj:
+            json.dump({
+                "metric": args.metric,
+                "results": [result._asdict() for result in results],
+            }, fobj, indent=2)
+        print(f":: report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
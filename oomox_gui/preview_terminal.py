@@ -7,8 +7,10 @@ from .i18n import translate
 from .terminal import generate_xrdb_theme_from_oomox
 
 if TYPE_CHECKING:
+    from collections.abc import Sequence
     from typing import Final
 
+    from .terminal_ranking import TemplateScore
     from .theme_file import ThemeT
 
 
@@ -94,3 +96,17 @@ class TerminalThemePreview(Gtk.Box):
             self.terminal_widgets[key2].override_background_color(
                 Gtk.StateType.NORMAL, converted[key2],  # type: ignore[arg-type]
             )
+
+    def update_templates_ranking(self, ranking: "Sequence[TemplateScore]") -> None:
+        if not ranking:
+            self.set_tooltip_text(None)
+            return
+        self.set_tooltip_text("\n".join([
+            translate("Best Matching Theme Styles:"),
+            *(
+                f"{template_score.template_name}: " + (
+                    f"{template_score.score:.1f}" if template_score.score is not None else "-"
+                )
+                for template_score in ranking
+            ),
+        ]))
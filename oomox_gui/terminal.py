@@ -1,26 +1,57 @@
-import operator
+import contextlib
+import gzip
+import json
 import os
-import shutil
 import sys
-from pathlib import Path
-from typing import TYPE_CHECKING, ClassVar
+from multiprocessing.pool import Pool
+from time import time
+from typing import TYPE_CHECKING, ClassVar, NamedTuple
 
 from .color import (
     SMALLEST_DIFF,
     ColorDiff,
+    ColorDistanceMetric,
+    LightnessModel,
+    PackedColor,
     color_hex_from_list,
     color_list_from_hex,
-    hex_darker,
+    hex_lightness,
     hex_to_int,
     int_list_from_hex,
     is_dark,
 )
-from .config import DEFAULT_ENCODING, TERMINAL_TEMPLATE_DIR
-from .i18n import translate
+from .color_batch import (
+    apply_color_diff,
+    darken_colors,
+    get_distance_matrix,
+    get_grayest_colors,
+)
+from .config import DEFAULT_ENCODING, TERMINAL_PALETTES_BUNDLE_PATH, TERMINAL_TEMPLATE_DIR
+from .disk_cache import DiskCache, stable_digest
+from .helpers import log_debug, log_error
+from .terminal_optimizer import SmartyOptimizer, pattern_smarty_search
+from .terminal_ranking import TERMINAL_TEMPLATE_RANKING_TOP, TemplateScore, rank_smarty_searches
+from .terminal_smarty import (
+    SmartyEngine,
+    SmartySearch,
+    SmartySearchControl,
+    SmartySearchWorker,
+    SmartyStats,
+    get_default_smarty_engine,
+    get_smarty_engine,
+    smarty_search,
+)
+from .terminal_template import (
+    HIGHLIGHT_COLOR_KEYS,
+    PACKED_COLOR_LENGTH,
+    TemplateColors,
+    TerminalTemplate,
+    TerminalTemplateRegistry,
+)
 from .theme_model import get_theme_model
 
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    from collections.abc import Callable, Mapping, Sequence
     from typing import (
         Any,
         Final,
@@ -33,11 +64,10 @@ if TYPE_CHECKING:
 RED: "Final" = 0
 GREEN: "Final" = 1
 BLUE: "Final" = 2
-VALID_COLOR_CHARS: "Final" = [
-    chr(i) for i in range(ord("a"), ord("f") + 1)
-] + [
-    str(i) for i in range(10)
-]
+
+
+# how long to wait for terminal palette in GUI before showing the best one found so far (s):
+SMARTY_INTERACTIVE_TIME_BUDGET: "Final" = 0.5
 
 
 TerminalThemeT = dict[str, str]
@@ -45,25 +75,27 @@ TerminalThemeT = dict[str, str]
 
 def find_closest_color_key(
         color_hex: str,
-        colors_hex: TerminalThemeT,
+        colors_hex: "Mapping[str, str]",
         *,
         highlight: bool = True,
+        metric: str = ColorDistanceMetric.RGB,
 ) -> tuple[str | None, ColorDiff]:
+    """With perceptual `metric` the distances to all the colors are computed at once."""
     smallest_diff = SMALLEST_DIFF
     smallest_key = None
-    highlight_keys = [f"color{i}" for i in range(8, 15 + 1)]
-    for preset_key, preset_color in colors_hex.items():
-        if (
-            (
-                highlight
-            ) and (
-                "color" not in preset_key
-            )
-        ) or (
-            preset_key not in highlight_keys
-        ):
-            continue
-        diff = ColorDiff(preset_color, color_hex)
+    color = PackedColor.from_hex(color_hex)
+    preset_keys = [
+        preset_key for preset_key in colors_hex
+        if (preset_key in HIGHLIGHT_COLOR_KEYS) and not (highlight and ("color" not in preset_key))
+    ]
+    if (metric != ColorDistanceMetric.RGB) and preset_keys:
+        distances = get_distance_matrix(
+            [color.hex], [colors_hex[preset_key] for preset_key in preset_keys], metric,
+        )[0]
+        smallest_key = preset_keys[min(range(len(preset_keys)), key=distances.__getitem__)]
+        return smallest_key, ColorDiff(colors_hex[smallest_key], color)
+    for preset_key in preset_keys:
+        diff = ColorDiff(colors_hex[preset_key], color)
         # if diff.minabs < smallest_diff.minabs:
         if diff.abs_sum < smallest_diff.abs_sum:
             smallest_diff = diff
@@ -71,26 +103,27 @@ def find_closest_color_key(
     return smallest_key, smallest_diff
 
 
-def import_xcolors(path: str) -> dict[str, str]:
-    hex_colors = {}
-    text = Path(
-        os.path.expanduser(path),
-    ).read_text(encoding=DEFAULT_ENCODING)
-    for line in text.split("\n"):
-        if line.strip().startswith("!"):
-            continue
-        pair = [s.strip() for s in line.split(":")]
-        if len(pair) < 2:  # noqa: PLR2004
-            continue
-        key, value = pair
-        key = key.replace("*", "")
-        value = value.replace("#", "").lower()
-        for char in value:
-            if char not in VALID_COLOR_CHARS:
-                break
-        else:
-            hex_colors[key] = value
-    return hex_colors
+def import_xcolors(path: str) -> TemplateColors:
+    return TerminalTemplateRegistry.get(path).get_colors()
+
+
+class TerminalHint(NamedTuple):
+    theme_color: str
+    theme_bg: str
+    theme_fg: str
+    theme_hint: str | None = None
+
+
+def _swap_hint_bg_fg_like_in_template(
+        reference_colors: "Mapping[str, str]",
+        hint: TerminalHint,
+        lightness_model: str = LightnessModel.CHANNEL_SUM,
+) -> TerminalHint:
+    if is_dark(hint.theme_bg, lightness_model) != is_dark(
+            reference_colors["background"], lightness_model,
+    ):
+        return hint._replace(theme_bg=hint.theme_fg, theme_fg=hint.theme_bg)
+    return hint
 
 
 def generate_theme_from_hint(
@@ -101,12 +134,61 @@ def generate_theme_from_hint(
         theme_hint: str | None = None,
         *,
         auto_swap_colors: bool = True,
+        color_distance: str = ColorDistanceMetric.RGB,
 ) -> TerminalThemeT:
-    hex_colors = import_xcolors(template_path)
-    if auto_swap_colors and (
-            is_dark(theme_bg) != is_dark(hex_colors["background"])
+    # only reading from it, so no need for a copy:
+    return _generate_theme_from_hint(
+        TerminalTemplateRegistry.get(template_path).hex_colors,
+        TerminalHint(theme_color, theme_bg, theme_fg, theme_hint),
+        auto_swap_colors=auto_swap_colors,
+        color_distance=color_distance,
+    )
+
+
+def generate_themes_from_hints(
+        template_path: str,
+        hints: "Sequence[TerminalHint]",
+        *,
+        auto_swap_colors: bool = True,
+        engine: str | None = None,
+        color_distance: str = ColorDistanceMetric.RGB,
+) -> list[TerminalThemeT]:
+    """
+    The same as `generate_theme_from_hint()` for each of the hints (e.g. accent color variants),
+    but with the template parsed once and, with NumPy engine, all the palettes computed at once.
+    """
+    template = TerminalTemplateRegistry.get(template_path)
+    if auto_swap_colors:
+        hints = [_swap_hint_bg_fg_like_in_template(template.hex_colors, hint) for hint in hints]
+    engine = engine or get_default_smarty_engine()
+    if (engine == SmartyEngine.NUMPY) and (color_distance == ColorDistanceMetric.RGB) and (
+            len(template.packed_keys) == len(template.hex_colors)
     ):
-        theme_bg, theme_fg = theme_fg, theme_bg
+        from .terminal_numpy import (  # pylint: disable=import-outside-toplevel
+            generate_themes_from_hints_numpy,
+        )
+        return generate_themes_from_hints_numpy(template, hints)
+    if engine not in {SmartyEngine.NUMPY, SmartyEngine.PYTHON}:
+        unknown_engine = f"Unknown engine {engine!r}"
+        raise ValueError(unknown_engine)
+    return [
+        _generate_theme_from_hint(
+            template.hex_colors, hint, auto_swap_colors=False, color_distance=color_distance,
+        )
+        for hint in hints
+    ]
+
+
+def _generate_theme_from_hint(
+        hex_colors: "Mapping[str, str]",
+        hint: TerminalHint,
+        *,
+        auto_swap_colors: bool = True,
+        color_distance: str = ColorDistanceMetric.RGB,
+) -> TerminalThemeT:
+    if auto_swap_colors:
+        hint = _swap_hint_bg_fg_like_in_template(hex_colors, hint)
+    theme_color, theme_bg, theme_fg, theme_hint = hint
     _closest_key: str | None
     diff: ColorDiff
     if theme_hint:
@@ -114,12 +196,11 @@ def generate_theme_from_hint(
         diff = ColorDiff(hex_colors[theme_hint], theme_color)
     else:
         _closest_key, diff = find_closest_color_key(
-            theme_color, hex_colors, highlight=False,
+            theme_color, hex_colors, highlight=False, metric=color_distance,
         )
-    modified_colors = {
-        key: diff.apply_to(value)
-        for key, value in hex_colors.items()
-    }
+    modified_colors = dict(zip(
+        hex_colors, apply_color_diff(diff, list(hex_colors.values())), strict=True,
+    ))
     modified_colors["background"] = theme_bg
     modified_colors["foreground"] = theme_fg
     for source, destinations in {
@@ -153,89 +234,49 @@ def get_all_colors_from_oomox_colorscheme(palette: "ThemeT") -> list[str]:
     return all_colors
 
 
-class ContinueNext(Exception):  # noqa: N818
-    pass
+def get_lightness(theme_color: str, model: str = LightnessModel.CHANNEL_SUM) -> float:
+    """In 0 .. 255*3 range, like the lightness bounds of smarty search."""
+    if model == LightnessModel.CHANNEL_SUM:
+        return sum(int_list_from_hex(theme_color))
+    return hex_lightness(theme_color, model) * 255 * 3
 
 
-# @TODO:
-# get_term_width() and ProgressBar() are temporary until progressbar API won't be implemented in UI:
-def get_term_width() -> int:
-    return shutil.get_terminal_size((80, 80)).columns
+def get_smarty_accuracy(terminal_theme_accuracy: int) -> int:
+    """Grid step of smarty search for `TERMINAL_THEME_ACCURACY` theme option."""
+    return 255 + 8 - terminal_theme_accuracy
 
 
-class ProgressBar:
-
-    message: str
-    print_ratio: float
-    index = 0
-    progress = 0
-
-    LEFT_DECORATION = "["
-    RIGHT_DECORATION = "]"
-
-    def __init__(self, length: int, message: str | None = None) -> None:
-        message = message or str(length)
-        self.message = message
-        width = (
-            get_term_width() - len(message) -
-            len(self.LEFT_DECORATION) - len(self.RIGHT_DECORATION)
-        )
-        self.print_ratio = length / width
-
-    def update(self) -> None:
-        self.index += 1
-        if self.index / self.print_ratio > self.progress:
-            self.progress += 1
-
-    def __enter__(self) -> "Callable[[], None]":
-        return self.update
-
-
-def sort_by_saturation(c: list[int]) -> int:
-    # pylint: disable=invalid-name
-    return abs(c[0] - c[1]) + abs(c[0] - c[2]) + \
-        abs(c[1] - c[0]) + abs(c[1] - c[2]) + \
-        abs(c[2] - c[1]) + abs(c[2] - c[0])
-
-
-def get_grayest_colors(palette: list[str]) -> list[str]:
-    list_of_colors = [[hex_to_int(s) for s in color_list_from_hex(c)] for c in palette]
-    saturation_list = sorted(
-        list_of_colors,
-        key=sort_by_saturation,
+def swap_bg_fg_like_in_template(
+        reference_colors: "Mapping[str, str]",
+        theme_bg: str,
+        theme_fg: str,
+        *,
+        lightness_model: str = LightnessModel.CHANNEL_SUM,
+) -> tuple[str, str]:
+    need_light_bg = (
+        get_lightness(reference_colors["background"], lightness_model) >
+        get_lightness(reference_colors["foreground"], lightness_model)
     )
-    gray_color_values = saturation_list[:(len(saturation_list) // 3)]
-    gray_color_values.sort(key=sum)
-    return [color_hex_from_list(c) for c in gray_color_values]
-
-
-def get_lightness(theme_color: str) -> int:
-    return sum(int_list_from_hex(theme_color))
-
-
-# how far should be the colors to be counted as similar (0 .. 255*3)
-# COLOR_DIFF_MARGIN = 30
-COLOR_DIFF_MARGIN: "Final" = 60
-# 1 means similarity to template the same important as mathing color palette
-# COLOR_SIMILARITY_IMPORTANCE = 2
-COLOR_SIMILARITY_IMPORTANCE: "Final" = 2.5
+    have_light_bg = (
+        get_lightness(theme_bg, lightness_model) >
+        get_lightness(theme_fg, lightness_model)
+    )
+    if (
+            have_light_bg and not need_light_bg
+    ) or (
+        not have_light_bg and need_light_bg
+    ):
+        return theme_fg, theme_bg
+    return theme_bg, theme_fg
 
 
-def _generate_theme_from_full_palette(  # pylint: disable=too-many-nested-blocks,too-many-locals,too-many-statements,too-many-branches  # noqa: E501,RUF100
-        result_callback: "Callable[[TerminalThemeT], None]",
-        reference_colors: dict[str, str],
+def _prepare_smarty_search(
+        template: TerminalTemplate,
         all_colors: list[str],
         theme_bg: str,
-        accuracy: int | None = None,
         *,
         extend_palette: bool = False,
-) -> None:
-    hex_colors = reference_colors
-    # @TODO: refactor it some day :3
-
-    color_start = [-0xff, -0xff, -0xff]
-    color_end = [0xff, 0xff, 0xff]
-
+) -> SmartySearch:
     # criterias to recognize bright colors (0 .. 255*3)
     is_dark_bg = is_dark(theme_bg)
 
@@ -250,16 +291,13 @@ def _generate_theme_from_full_palette(  # pylint: disable=too-many-nested-blocks
     else:
         max_lightness = max_possible_lightness - lightness_delta
 
-    accuracy = accuracy or 0x20
-    hex_colors_as_color_lists = {
-        key: [
-            hex_to_int(s) for s in color_list_from_hex(value)
-        ] for key, value in hex_colors.items()
-    }
+    hex_colors_as_color_lists = list(template.iter_int_colors("color"))
     if extend_palette:
-        for color in all_colors.copy():
-            for i in (20, 40, 60):
-                all_colors.extend((hex_darker(color, i), hex_darker(color, -i)))
+        darken_amounts = [amount for i in (20, 40, 60) for amount in (i, -i)]
+        all_colors.extend(darken_colors(
+            [color for color in all_colors for _amount in darken_amounts],
+            darken_amounts * len(all_colors),
+        ))
 
     grayest_colors = get_grayest_colors(all_colors)
     bright_colors_set = set(all_colors)
@@ -271,119 +309,197 @@ def _generate_theme_from_full_palette(  # pylint: disable=too-many-nested-blocks
             hex_to_int(s) for s in color_list_from_hex(value)
         ] for value in bright_colors
     ]
+    return SmartySearch(
+        template_colors=hex_colors_as_color_lists,
+        bright_colors=bright_colors_as_color_lists,
+        min_lightness=min_lightness,
+        max_lightness=max_lightness,
+    )
 
-    best_diff_color_values = [0, 0, 0]
-    biggest_number_of_similar: float | None = None
-    prev_biggest_number_of_similar: float | None = None
-    best_result = None
-
-    # debug_iteration_counter = 0
 
-    while accuracy > 0:
-        # debug_iteration_counter += 1
-        # print()
-        # print(('ITERATION', _debug_iteration_counter))
-        progress = ProgressBar(
-            length=((int(abs(color_start[0] - color_end[0]) / accuracy) + 2) ** 3),
-        )
-        red = color_start[RED]
-        while red < color_end[RED] + accuracy:
-            green = color_start[GREEN]
-            while green < color_end[GREEN] + accuracy:
-                blue = color_start[BLUE]
-                while blue < color_end[BLUE] + accuracy:
-                    try:
-
-                        color_list = [red, green, blue]
-                        modified_colors = {}
-                        for key, value in hex_colors_as_color_lists.items():
-                            if not key.startswith("color"):
-                                continue
-                            new_value = value[:]
-                            for i in range(3):
-                                new_value[i] = min(
-                                    255,
-                                    max(
-                                        0,
-                                        new_value[i] + (red, green, blue)[i],
-                                    ),
-                                )
-                            if (
-                                    (key not in {"color0", "color7", "color8", "color15"})
-                                    and (not min_lightness <= sum(new_value) <= max_lightness)
-                            ):
-                                raise ContinueNext  # noqa: TRY301
-                            modified_colors[key] = new_value
-
-                        num_of_similar = 0.0
-                        for modified_color in modified_colors.values():
-                            for bright_color in bright_colors_as_color_lists:
-                                abs_diff = 0
-                                for i in range(3):
-                                    abs_diff += abs(modified_color[i] - bright_color[i])
-                                if abs_diff < COLOR_DIFF_MARGIN:
-                                    num_of_similar += 1
-
-                        similarity_to_reference = (
-                            255 * 3 - sum(abs(c) for c in color_list) * COLOR_SIMILARITY_IMPORTANCE
-                        ) / (255 * 3)
-                        num_of_similar *= similarity_to_reference
-
-                        if (
-                                biggest_number_of_similar is None
-                        ) or (
-                            num_of_similar > biggest_number_of_similar
-                        ):
-                            biggest_number_of_similar = num_of_similar
-                            best_result = modified_colors
-                            best_diff_color_values[RED] = red
-                            best_diff_color_values[GREEN] = green
-                            best_diff_color_values[BLUE] = blue
-
-                    except ContinueNext:
-                        pass
-                    progress.update()
-                    blue += accuracy
-                green += accuracy
-            red += accuracy
-
-        if biggest_number_of_similar == prev_biggest_number_of_similar:
-            # print('good enough')
-            break
-        prev_biggest_number_of_similar = biggest_number_of_similar
-        for i in range(3):
-            color_start[i] = max(best_diff_color_values[i] - accuracy, -255)
-            color_end[i] = min(best_diff_color_values[i] + accuracy, 255)
-        accuracy = round(accuracy / 2)
-        # print(('DEEPER!', accuracy))
-
-    # from fabulous.color import bg256
-    # for bright_color in bright_colors:
-    #     print(bg256(bright_color, bright_color))
+def _generate_theme_from_full_palette(
+        result_callback: "Callable[[TerminalThemeT], None]",
+        template: TerminalTemplate,
+        all_colors: list[str],
+        theme_bg: str,
+        accuracy: int | None = None,
+        *,
+        extend_palette: bool = False,
+        engine: str | None = None,
+        processes: int | None = None,
+        control: SmartySearchControl | None = None,
+        stats: SmartyStats | None = None,
+        optimizer: str | None = None,
+) -> None:
+    search = _prepare_smarty_search(
+        template, all_colors, theme_bg, extend_palette=extend_palette,
+    )
+    start_time = time()
+    if stats is None:
+        stats = SmartyStats()
+    if optimizer == SmartyOptimizer.PATTERN:
+        best_result = pattern_smarty_search(search, accuracy, stats=stats, control=control)
+    elif optimizer in {None, SmartyOptimizer.GRID}:
+        smarty_engine = get_smarty_engine(engine)
+        with contextlib.ExitStack() as exit_stack:
+            pool = (
+                exit_stack.enter_context(Pool(processes))
+                if (processes is not None) and (processes > 1) else
+                None
+            )
+            best_result = smarty_search(
+                search, smarty_engine, accuracy,
+                pool=pool, processes=processes or 1, stats=stats, control=control,
+            )
+    else:
+        unknown_optimizer = f"Unknown smarty optimizer {optimizer!r}"
+        raise ValueError(unknown_optimizer)
+    log_debug(
+        f"Smarty terminal palette: {stats}, took {time() - start_time:.8f}s"
+        + (" (out of time budget)" if control and control.stopped_early else ""),
+    )
 
     if not best_result:
         t_t = "Everything went wrong 🥲"
         raise RuntimeError(t_t)
 
-    result_colors = {
+    # return result_colors
+    result_callback(hex_colors_from_lists(best_result))
+
+
+def hex_colors_from_lists(colors: dict[str, list[int]]) -> TerminalThemeT:
+    return {
         key: color_hex_from_list(c)
-        for key, c in best_result.items()
+        for key, c in colors.items()
     }
-    # return result_colors
-    result_callback(result_colors)
+
+
+# bump it when smarty search results are changing for the same input:
+FULL_PALETTE_CACHE_VERSION: "Final" = 1
+FULL_PALETTE_CACHE_MAX_ENTRIES: "Final" = 2000
 
 
 class FullPaletteCache:
+    """
+    Smarty palettes generated before: either precomputed for the shipped presets
+    (see `terminal_palettes_bundle` module), or cached on disk.
+    """
 
-    _cache: ClassVar[dict[str, dict[str, str]]] = {}
+    _cache: ClassVar[DiskCache] = DiskCache(
+        "terminal_palettes", max_entries=FULL_PALETTE_CACHE_MAX_ENTRIES,
+    )
+    # cache key: (index of the color keys in `_bundle_key_sets`, their colors concatenated)
+    _bundle: ClassVar[dict[str, tuple[int, str]] | None] = None
+    _bundle_key_sets: ClassVar[list[list[str]]] = []
+
+    @classmethod
+    def _load_bundle(cls) -> dict[str, tuple[int, str]]:
+        bundle: dict[str, tuple[int, str]] = {}
+        try:
+            with gzip.open(TERMINAL_PALETTES_BUNDLE_PATH, "rt", encoding=DEFAULT_ENCODING) as fobj:
+                data = json.load(fobj)
+            # bundle made for the other version of smarty search is useless:
+            if data["version"] == FULL_PALETTE_CACHE_VERSION:
+                bundle = data["palettes"]
+                cls._bundle_key_sets = data["key_sets"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            log_error(f"Can't load terminal palettes bundle {TERMINAL_PALETTES_BUNDLE_PATH}: {exc}")
+        return bundle
+
+    @classmethod
+    def get_bundled(cls, key: str) -> dict[str, str] | None:
+        bundle = cls._bundle
+        if bundle is None:
+            bundle = cls._bundle = cls._load_bundle()
+        if key not in bundle:
+            return None
+        key_set_idx, packed_colors = bundle[key]
+        return {
+            color_key: packed_colors[
+                idx * PACKED_COLOR_LENGTH:(idx + 1) * PACKED_COLOR_LENGTH
+            ]
+            for idx, color_key in enumerate(cls._bundle_key_sets[key_set_idx])
+        }
+
+    @staticmethod
+    def get_id(
+            reference_colors: dict[str, str],
+            all_colors: list[str],
+            theme_bg: str,
+            accuracy: int | None,
+            *,
+            extend_palette: bool,
+            optimizer: str | None = None,
+            **kwargs: "Any",
+    ) -> str:
+        key_data = {
+            "version": FULL_PALETTE_CACHE_VERSION,
+            "template": sorted(reference_colors.items()),
+            "palette": sorted(all_colors),
+            "bg": theme_bg,
+            "accuracy": accuracy,
+            "extend_palette": extend_palette,
+            "kwargs": kwargs,
+        }
+        # to keep the keys of already cached grid search results:
+        if optimizer not in {None, SmartyOptimizer.GRID}:
+            key_data["optimizer"] = optimizer
+        return stable_digest(key_data)
 
     @classmethod
     def get(cls, key: str) -> dict[str, str] | None:
-        return cls._cache.get(key)
+        bundled_value = cls.get_bundled(key)
+        if bundled_value:
+            return bundled_value
+        value = cls._cache.get(key)
+        if not isinstance(value, dict):
+            return None
+        return value
 
     @classmethod
     def put(cls, key: str, value: dict[str, str]) -> None:
-        cls._cache[key] = value
+        cls._cache.put(key, value)
+
+
+class FullPaletteInputs(NamedTuple):
+    template: TerminalTemplate
+    all_colors: list[str]
+    theme_bg: str
+    theme_fg: str
+    cache_id: str
+
+
+def prepare_full_palette_inputs(
+        palette: "ThemeT",
+        theme_bg: str,
+        theme_fg: str,
+        template_path: str,
+        *,
+        auto_swap_colors: bool = True,
+        accuracy: int | None = None,
+        extend_palette: bool = False,
+        optimizer: str | None = None,
+        **kwargs: "Any",
+) -> FullPaletteInputs:
+    template = TerminalTemplateRegistry.get(template_path)
+    if auto_swap_colors:
+        theme_bg, theme_fg = swap_bg_fg_like_in_template(template.hex_colors, theme_bg, theme_fg)
+    all_colors = sorted(get_all_colors_from_oomox_colorscheme(palette))
+    cache_id = FullPaletteCache.get_id(
+        template.hex_colors, all_colors, theme_bg, accuracy,
+        extend_palette=extend_palette,
+        optimizer=optimizer,
+        **kwargs,
+    )
+    return FullPaletteInputs(
+        template=template,
+        all_colors=all_colors,
+        theme_bg=theme_bg,
+        theme_fg=theme_fg,
+        cache_id=cache_id,
+    )
 
 
 def generate_theme_from_full_palette(  # pylint: disable=too-many-arguments,too-many-locals
@@ -396,93 +512,201 @@ def generate_theme_from_full_palette(  # pylint: disable=too-many-arguments,too-
         auto_swap_colors: bool = True,
         accuracy: int | None = None,
         extend_palette: bool = False,
+        engine: str | None = None,
+        processes: int | None = None,
+        time_budget: float | None = None,
+        optimizer: str | None = None,
         window: "OomoxApplicationWindow | None" = None,
         **kwargs: "Any",
 ) -> None:
-
-    reference_colors = import_xcolors(template_path)
-
-    if auto_swap_colors:
-        need_light_bg = (
-            get_lightness(reference_colors["background"]) >
-            get_lightness(reference_colors["foreground"])
-        )
-        have_light_bg = (
-            get_lightness(theme_bg) >
-            get_lightness(theme_fg)
+    """
+    With `window` the search is running in the background thread,
+    cancelling the previous one, and the result callback is called from GUI main loop:
+    first with the best palette found during `time_budget`
+    (`SMARTY_INTERACTIVE_TIME_BUDGET` by default), and then with the final one.
+
+    Without `window` the search stops after `time_budget`, if it's given.
+
+    `optimizer` is either coarse-to-fine grid search (`SmartyOptimizer.GRID`, default),
+    or pattern search (`SmartyOptimizer.PATTERN`) which needs much less evaluations
+    for high accuracy, but could end up in local maximum.
+    """
+    template, all_colors, theme_bg, theme_fg, cache_id = prepare_full_palette_inputs(
+        palette, theme_bg, theme_fg, template_path,
+        auto_swap_colors=auto_swap_colors,
+        accuracy=accuracy,
+        extend_palette=extend_palette,
+        optimizer=optimizer,
+        **kwargs,
+    )
+    cached_palette = FullPaletteCache.get(cache_id)
+    if cached_palette:
+        _generate_theme_from_full_palette_callback(
+            cached_palette, theme_bg, theme_fg, result_callback,
         )
-        if (
-                have_light_bg and not need_light_bg
-        ) or (
-            not have_light_bg and need_light_bg
-        ):
-            theme_bg, theme_fg = theme_fg, theme_bg
-
-    all_colors = sorted(get_all_colors_from_oomox_colorscheme(palette))
-    cache_id = str(
-        [
-            kwargs[name] for name in sorted(kwargs, key=operator.itemgetter(0))
-        ] + all_colors,
-    ) + template_path + theme_bg + str(accuracy) + str(extend_palette)
+    elif window:
+        def _partial_callback(generated_colors: TerminalThemeT) -> None:
+            if not control.is_cancelled:
+                _generate_theme_from_full_palette_callback(
+                    generated_colors, theme_bg, theme_fg, result_callback,
+                )
 
-    if FullPaletteCache.get(cache_id):
-        _generate_theme_from_full_palette_callback(
-            cache_id, theme_bg, theme_fg, result_callback,
+        def _callback(generated_colors: TerminalThemeT) -> None:
+            if not control.is_cancelled:
+                FullPaletteCache.put(cache_id, generated_colors)
+                _generate_theme_from_full_palette_callback(
+                    generated_colors, theme_bg, theme_fg, result_callback,
+                )
+
+        control = SmartySearchControl(
+            SMARTY_INTERACTIVE_TIME_BUDGET if time_budget is None else time_budget,
+            on_out_of_time=lambda colors: window.schedule_task(
+                _partial_callback, hex_colors_from_lists(colors),
+            ),
         )
+        SmartySearchWorker.start(control, lambda: _generate_theme_from_full_palette(
+            lambda colors: window.schedule_task(_callback, colors),
+            template,
+            all_colors,
+            theme_bg,
+            accuracy,
+            extend_palette=extend_palette,
+            engine=engine,
+            processes=processes,
+            optimizer=optimizer,
+            control=control,
+        ), on_error=lambda exc: window.schedule_task(window.show_error, exc))
     else:
-        def _callback(generated_colors: TerminalThemeT) -> None:
-            FullPaletteCache.put(cache_id, generated_colors)
+        headless_control = (
+            SmartySearchControl(time_budget) if time_budget is not None else None
+        )
+
+        def _headless_callback(generated_colors: TerminalThemeT) -> None:
+            if not (headless_control and headless_control.stopped_early):
+                FullPaletteCache.put(cache_id, generated_colors)
             _generate_theme_from_full_palette_callback(
-                cache_id, theme_bg, theme_fg, result_callback,
+                generated_colors, theme_bg, theme_fg, result_callback,
             )
-        # from time import time
-        # before = time()
-        if window:
-            window.disable(translate("Generating terminal palette…"))
-            window.schedule_task(
-                lambda: _generate_theme_from_full_palette(
-                    _callback,
-                    reference_colors,
-                    all_colors,
-                    theme_bg,
-                    accuracy,
-                    extend_palette=extend_palette,
-                ),
-            )
-            window.enable()
-        else:
-            _generate_theme_from_full_palette(
-                _callback,
-                reference_colors,
-                all_colors,
-                theme_bg,
-                accuracy,
-                extend_palette=extend_palette,
-            )
-        # print(time() - before)
+
+        _generate_theme_from_full_palette(
+            _headless_callback,
+            template,
+            all_colors,
+            theme_bg,
+            accuracy,
+            extend_palette=extend_palette,
+            engine=engine,
+            processes=processes,
+            optimizer=optimizer,
+            control=headless_control,
+        )
 
 
 def _generate_theme_from_full_palette_callback(
-        cache_id: str,
+        generated_colors: TerminalThemeT,
         theme_bg: str,
         theme_fg: str,
         result_callback: "Callable[[TerminalThemeT], None]",
 ) -> None:
-    cached_palette = FullPaletteCache.get(cache_id)
-    if not cached_palette:
-        cant_open_palette = f"No cached palette with {cache_id=}"
-        raise RuntimeError(cant_open_palette)
     modified_colors = {}
-    modified_colors.update(cached_palette)
+    modified_colors.update(generated_colors)
     modified_colors["background"] = theme_bg
     modified_colors["foreground"] = theme_fg
     result_callback(modified_colors)
 
 
+def generate_theme_from_best_template(  # pylint: disable=too-many-arguments,too-many-locals
+        palette: "ThemeT",
+        theme_bg: str,
+        theme_fg: str,
+        result_callback: "Callable[[TerminalThemeT], None]",
+        *,
+        auto_swap_colors: bool = True,
+        accuracy: int | None = None,
+        extend_palette: bool = False,
+        engine: str | None = None,
+        processes: int | None = None,
+        top: int = TERMINAL_TEMPLATE_RANKING_TOP,
+        ranking_callback: "Callable[[list[TemplateScore]], None] | None" = None,
+        window: "OomoxApplicationWindow | None" = None,
+) -> None:
+    """
+    Run smarty search for each of the templates and use the one with the best score.
+
+    `ranking_callback` is called before `result_callback` with the scores of all the templates,
+    from the best one, with only the `top` of them guaranteed to be complete.
+    """
+    all_inputs: dict[str, FullPaletteInputs] = {}
+    searches: dict[str, SmartySearch] = {}
+    for template_name in sorted(os.listdir(TERMINAL_TEMPLATE_DIR)):
+        inputs = all_inputs[template_name] = prepare_full_palette_inputs(
+            palette, theme_bg, theme_fg, os.path.join(TERMINAL_TEMPLATE_DIR, template_name),
+            auto_swap_colors=auto_swap_colors,
+            accuracy=accuracy,
+            extend_palette=extend_palette,
+        )
+        searches[template_name] = _prepare_smarty_search(
+            inputs.template, inputs.all_colors, inputs.theme_bg, extend_palette=extend_palette,
+        )
+
+    def _callback(ranking: list[TemplateScore]) -> None:
+        if ranking_callback:
+            ranking_callback(ranking)
+        best_template_score = ranking[0]
+        if not best_template_score.colors:
+            t_t = "Everything went wrong 🥲"
+            raise RuntimeError(t_t)
+        inputs = all_inputs[best_template_score.template_name]
+        generated_colors = hex_colors_from_lists(best_template_score.colors)
+        # it's the same as of smarty search for that template alone:
+        FullPaletteCache.put(inputs.cache_id, generated_colors)
+        _generate_theme_from_full_palette_callback(
+            generated_colors, inputs.theme_bg, inputs.theme_fg, result_callback,
+        )
+
+    if window:
+        control = SmartySearchControl()
+
+        def _window_callback(ranking: list[TemplateScore]) -> None:
+            if not control.is_cancelled:
+                _callback(ranking)
+
+        SmartySearchWorker.start(control, lambda: window.schedule_task(
+            _window_callback,
+            rank_smarty_searches(
+                searches, accuracy,
+                engine=engine, processes=processes, top=top, control=control,
+            ),
+        ), on_error=lambda exc: window.schedule_task(window.show_error, exc))
+    else:
+        _callback(rank_smarty_searches(
+            searches, accuracy, engine=engine, processes=processes, top=top,
+        ))
+
+
+def get_full_palette_options(colorscheme: "ThemeT") -> dict[str, "Any"]:
+    """
+    Arguments of `generate_theme_from_full_palette()` (besides template)
+    and `generate_theme_from_best_template()` for "smarty" terminal theme mode.
+    """
+    terminal_theme_accuracy: int = (
+        colorscheme["TERMINAL_THEME_ACCURACY"]  # type: ignore[assignment]
+    )
+    return {
+        "palette": colorscheme,
+        "theme_bg": colorscheme["TERMINAL_BACKGROUND"],
+        "theme_fg": colorscheme["TERMINAL_FOREGROUND"],
+        "auto_swap_colors": colorscheme["TERMINAL_THEME_AUTO_BGFG"],
+        "extend_palette": colorscheme["TERMINAL_THEME_EXTEND_PALETTE"],
+        "accuracy": get_smarty_accuracy(terminal_theme_accuracy),
+    }
+
+
 def _generate_themes_from_oomox(
         original_colorscheme: "ThemeT",
         result_callback: "Callable[[ThemeT], None]",
         window: "OomoxApplicationWindow | None" = None,
+        processes: int | None = None,
 ) -> None:
     colorscheme = {}
     colorscheme.update(original_colorscheme)
@@ -499,29 +723,39 @@ def _generate_themes_from_oomox(
             colorscheme["TERMINAL_FOREGROUND"] = colorscheme["FG"]
 
     terminal_base_template: str = colorscheme["TERMINAL_BASE_TEMPLATE"]  # type: ignore[assignment]
-    terminal_theme_accuracy: int = (
-        colorscheme["TERMINAL_THEME_ACCURACY"]  # type: ignore[assignment]
-    )
-    terminal_theme_extend_palette: bool = (
-        colorscheme["TERMINAL_THEME_EXTEND_PALETTE"]  # type: ignore[assignment]
-    )
     terminal_theme_auto_bgfg: bool = (
         colorscheme["TERMINAL_THEME_AUTO_BGFG"]  # type: ignore[assignment]
     )
     terminal_background: str = colorscheme["TERMINAL_BACKGROUND"]  # type: ignore[assignment]
     terminal_foreground: str = colorscheme["TERMINAL_FOREGROUND"]  # type: ignore[assignment]
     terminal_accent_color: str = colorscheme["TERMINAL_ACCENT_COLOR"]  # type: ignore[assignment]
+    terminal_theme_color_distance: str = (
+        colorscheme["TERMINAL_THEME_COLOR_DISTANCE"]  # type: ignore[assignment]
+    )
+    if window:
+        # newer colorscheme is being loaded, so the result of the previous search is not needed:
+        SmartySearchWorker.cancel_running()
+    if (colorscheme["TERMINAL_THEME_MODE"] == "smarty") and colorscheme.get(
+            "TERMINAL_THEME_AUTO_TEMPLATE",
+    ):
+        def _ranking_callback(ranking: "list[TemplateScore]") -> None:
+            colorscheme["TERMINAL_BASE_TEMPLATE"] = ranking[0].template_name
+            if window:
+                window.terminal_templates_ranking = ranking[:TERMINAL_TEMPLATE_RANKING_TOP]
+
+        generate_theme_from_best_template(
+            **get_full_palette_options(colorscheme),
+            processes=processes,
+            window=window,
+            ranking_callback=_ranking_callback,
+            result_callback=_callback,
+        )
+        return
     if colorscheme["TERMINAL_THEME_MODE"] == "smarty":
         generate_theme_from_full_palette(
-            template_path=os.path.join(
-                TERMINAL_TEMPLATE_DIR, terminal_base_template,
-            ),
-            palette=colorscheme,
-            theme_bg=terminal_background,
-            theme_fg=terminal_foreground,
-            auto_swap_colors=terminal_theme_auto_bgfg,
-            extend_palette=terminal_theme_extend_palette,
-            accuracy=255 + 8 - terminal_theme_accuracy,
+            **get_full_palette_options(colorscheme),
+            template_path=os.path.join(TERMINAL_TEMPLATE_DIR, terminal_base_template),
+            processes=processes,
             window=window,
             result_callback=_callback,
         )
@@ -536,6 +770,7 @@ def _generate_themes_from_oomox(
             theme_fg=terminal_foreground,
             theme_hint=None,
             auto_swap_colors=terminal_theme_auto_bgfg,
+            color_distance=terminal_theme_color_distance,
         )
     else:
         term_colorscheme = convert_oomox_theme_to_xrdb(colorscheme)
@@ -578,10 +813,12 @@ def generate_terminal_colors_for_oomox(
         colorscheme: "ThemeT",
         result_callback: "Callable[[ThemeT], None]",
         window: "OomoxApplicationWindow | None" = None,
+        processes: int | None = None,
 ) -> None:
     _generate_themes_from_oomox(
         colorscheme,
         window=window,
+        processes=processes,
         result_callback=result_callback,
     )
 
@@ -599,12 +836,12 @@ def cli() -> None:
     if len(args) < CLI_MIN_ARGS_NUM:
         print(
             f"Usage: {sys.argv[0]} "
-            "TEMPLATE_PATH ACCENT_COLOR BG FG "
+            "TEMPLATE_PATH ACCENT_COLOR[,ACCENT_COLOR...] BG FG "
             "[ACCENT_KEY_NAME] [AUTO_DETECT_FG_BG=YES]",
         )
         sys.exit(1)
     template_path = args[1]
-    theme_color = args[2]
+    theme_colors = args[2].split(",")
     theme_bg = args[3]
     theme_fg = args[4]
     theme_hint = args[CliArgs.THEME_HINT] if len(args) > CliArgs.THEME_HINT else None
@@ -613,15 +850,15 @@ def cli() -> None:
         if len(args) > CliArgs.AUTO_SWAP_COLORS else
         False
     )
-    term_colorscheme = generate_theme_from_hint(
-        template_path=template_path,
-        theme_color=theme_color,
-        theme_bg=theme_bg,
-        theme_fg=theme_fg,
-        theme_hint=theme_hint,
-        auto_swap_colors=auto_swap_colors,
-    )
-    print(term_colorscheme)
+    for term_colorscheme in generate_themes_from_hints(
+            template_path,
+            [
+                TerminalHint(theme_color, theme_bg, theme_fg, theme_hint)
+                for theme_color in theme_colors
+            ],
+            auto_swap_colors=auto_swap_colors,
+    ):
+        print(term_colorscheme)
 
 
 if __name__ == "__main__":
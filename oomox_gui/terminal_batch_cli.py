@@ -0,0 +1,247 @@
+"""
+Generate terminal palettes for many themes in one go.
+
+Jobs are read as JSON Lines and processed by a pool of worker processes,
+each of them keeping the theme model, the plugins and the parsed terminal templates
+loaded between the jobs, and results are streamed back as JSON Lines as soon as they're ready.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+from multiprocessing.pool import Pool
+from pathlib import Path
+from time import time
+from typing import TYPE_CHECKING, Any
+
+from oomox_gui.config import COLORS_DIR, DEFAULT_ENCODING, USER_COLORS_DIR
+from oomox_gui.terminal import convert_oomox_theme_to_xrdb, generate_terminal_colors_for_oomox
+from oomox_gui.theme_file_parser import read_colorscheme_from_path
+from oomox_gui.theme_model import get_theme_options_by_key, warm_up_plugins
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from typing import Final
+
+    from .theme_file import ThemeT
+
+
+TERMINAL_BATCH_JOB_KEYS: "Final" = {
+    # job key: theme key
+    "template": "TERMINAL_BASE_TEMPLATE",
+    "mode": "TERMINAL_THEME_MODE",
+    "accuracy": "TERMINAL_THEME_ACCURACY",
+    "extend_palette": "TERMINAL_THEME_EXTEND_PALETTE",
+    "auto_bgfg": "TERMINAL_THEME_AUTO_BGFG",
+    "auto_template": "TERMINAL_THEME_AUTO_TEMPLATE",
+    "color_distance": "TERMINAL_THEME_COLOR_DISTANCE",
+}
+
+
+class TerminalBatchJobError(Exception):
+    pass
+
+
+def resolve_theme_path(theme_path: str) -> str:
+    expanded_path = os.path.expanduser(theme_path)
+    if not os.path.exists(expanded_path):
+        for colors_dir in (USER_COLORS_DIR, COLORS_DIR):
+            if os.path.exists(os.path.join(colors_dir, theme_path)):
+                expanded_path = os.path.join(colors_dir, theme_path)
+                break
+    return os.path.realpath(expanded_path)
+
+
+def _check_option(key: str, value: Any) -> None:
+    theme_option = get_theme_options_by_key(key)[0]
+    if value not in [option["value"] for option in theme_option.get("options", [])]:
+        msg = f"unknown {key} value: {value!r}"
+        raise TerminalBatchJobError(msg)
+
+
+def _generate(job: dict[str, Any], timings: dict[str, float]) -> "ThemeT":
+    if not isinstance(job.get("theme"), str):
+        msg = "`theme` path is required"
+        raise TerminalBatchJobError(msg)
+    theme_path = resolve_theme_path(job["theme"])
+    if not os.path.exists(theme_path):
+        msg = f"{theme_path} not exists"
+        raise TerminalBatchJobError(msg)
+
+    start_time = time()
+    themes: list[ThemeT] = []
+    read_colorscheme_from_path(theme_path, callback=themes.append)
+    if not themes:
+        msg = f"can't read theme from {theme_path}"
+        raise TerminalBatchJobError(msg)
+    colorscheme = themes[0]
+    for job_key, theme_key in TERMINAL_BATCH_JOB_KEYS.items():
+        if job.get(job_key) is not None:
+            if theme_key in {
+                    "TERMINAL_BASE_TEMPLATE",
+                    "TERMINAL_THEME_MODE",
+                    "TERMINAL_THEME_COLOR_DISTANCE",
+            }:
+                _check_option(theme_key, job[job_key])
+            colorscheme[theme_key] = job[job_key]
+    timings["read_time"] = time() - start_time
+
+    start_time = time()
+    results: list[ThemeT] = []
+    # without window to get only the final terminal palette, not the intermediate ones;
+    # jobs themselves are already spread over the processes, so using only one per job:
+    generate_terminal_colors_for_oomox(
+        colorscheme=colorscheme,
+        processes=1,
+        result_callback=results.append,
+    )
+    if not results:
+        msg = "terminal palette wasn't generated"
+        raise TerminalBatchJobError(msg)
+    timings["generate_time"] = time() - start_time
+    return results[-1]
+
+
+def _run_terminal_batch_job(
+        line: str, result: dict[str, Any], timings: dict[str, float],
+) -> None:
+    job = json.loads(line)
+    if not isinstance(job, dict):
+        msg = "job should be a JSON object"
+        raise TerminalBatchJobError(msg)
+    result.update({
+        key: job[key]
+        for key in ("id", "theme", *TERMINAL_BATCH_JOB_KEYS)
+        if key in job
+    })
+    colorscheme = _generate(job, timings)
+    result["terminal"] = convert_oomox_theme_to_xrdb(colorscheme)
+
+
+def run_terminal_batch_job(numbered_line: tuple[int, str]) -> dict[str, Any]:
+    line_number, line = numbered_line
+    start_time = time()
+    result: dict[str, Any] = {"id": line_number}
+    timings: dict[str, float] = {}
+    try:
+        _run_terminal_batch_job(line, result, timings)
+    except Exception as exc:
+        # one broken job shouldn't stop the whole batch:
+        result["error"] = f"{exc.__class__.__name__}: {exc}"
+    result.setdefault("terminal", None)
+    result.setdefault("error", None)
+    result.update(timings)
+    result["total_time"] = time() - start_time
+    result["worker"] = os.getpid()
+    return result
+
+
+def _read_numbered_lines(input_lines: "Iterable[str]") -> "Iterator[tuple[int, str]]":
+    for line_number, line in enumerate(input_lines, start=1):
+        if line.strip():
+            yield line_number, line
+
+
+def run_terminal_batch(
+        input_lines: "Iterable[str]",
+        processes: int | None = None,
+        *,
+        keep_order: bool = False,
+) -> "Iterator[dict[str, Any]]":
+    warm_up_plugins()
+    jobs = _read_numbered_lines(input_lines)
+    if processes == 1:
+        yield from map(run_terminal_batch_job, jobs)
+        return
+    # workers are inheriting already warmed-up modules when forked,
+    # and initializer is for the platforms where they're spawned:
+    with Pool(processes=processes, initializer=warm_up_plugins) as pool:
+        yield from (pool.imap if keep_order else pool.imap_unordered)(
+            run_terminal_batch_job, jobs,
+        )
+
+
+def main() -> None:
+    my_name = Path(sys.argv[0]).name
+    parser = argparse.ArgumentParser(
+        description="Themix Terminal Palette Batch CLI",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=f"""
+------------------------
+
+Each input line is a JSON object describing one job:
+
+    {{"id": "optional job id", "theme": "path/to/theme", "template": "monovedek", \
+"mode": "smarty", "accuracy": 128, "extend_palette": true, "auto_bgfg": true, \
+"auto_template": false}}
+
+Only `theme` is required, the other keys are overriding the values from the theme file.
+Theme path could be also relative to `{COLORS_DIR}` or `{USER_COLORS_DIR}`.
+
+Each output line is a JSON object with the job keys, `terminal` palette (or `null`),
+`error` (or `null`), `read_time`, `generate_time`, `total_time` (s) and `worker` PID.
+Job id is the input line number if not given.
+
+------------------------
+
+Examples:
+
+Generate Advanced terminal palettes for all the featured themes:
+
+    $ for theme in ./colors/Featured/*; do \
+echo "{{\\"theme\\": \\"$theme\\", \\"mode\\": \\"smarty\\"}}"; done | {my_name} -
+
+""",
+    )
+    parser.add_argument(
+        "jobs_path",
+        help="path to JSON Lines file with the jobs, or `-` to read them from stdin",
+    )
+    parser.add_argument(
+        "-o", "--output",
+        default=None,
+        help="path to JSON Lines file for the results (default: stdout)",
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=None,
+        help=(
+            "number of worker processes"
+            f" (default: all CPU cores: {os.cpu_count()})"
+        ),
+    )
+    parser.add_argument(
+        "--keep-order",
+        action="store_true",
+        help="output the results in the same order as the jobs, instead of when they're ready",
+    )
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        input_file = (
+            sys.stdin
+            if args.jobs_path == "-" else
+            stack.enter_context(Path(args.jobs_path).open(encoding=DEFAULT_ENCODING))
+        )
+        output_file = (
+            stack.enter_context(Path(args.output).open("w", encoding=DEFAULT_ENCODING))
+            if args.output else
+            sys.stdout
+        )
+        num_failed = 0
+        for result in run_terminal_batch(
+                input_file, processes=args.jobs, keep_order=args.keep_order,
+        ):
+            if result["error"]:
+                num_failed += 1
+            output_file.write(json.dumps(result) + "\n")
+            output_file.flush()
+    if num_failed:
+        print(f":: {num_failed} job(s) failed", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,559 @@
+"""
+Benchmark of terminal palette generation.
+
+Runs all the terminal theme modes for the shipped terminal templates and color presets,
+recording wall time, smarty search candidates and peak memory of each case to JSON report,
+and compares two reports to catch the performance regressions.
+"""
+import argparse
+import fnmatch
+import itertools
+import json
+import os
+import platform
+import sys
+import tracemalloc
+from pathlib import Path
+from time import perf_counter, strftime
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from oomox_gui.color import LIGHTNESS_FUNCTIONS, LightnessModel, int_list_from_hex
+from oomox_gui.color_batch import get_lightnesses
+from oomox_gui.config import COLORS_DIR, DEFAULT_ENCODING, TERMINAL_TEMPLATE_DIR
+from oomox_gui.terminal import (
+    _generate_theme_from_full_palette,
+    generate_terminal_colors_for_oomox,
+    get_all_colors_from_oomox_colorscheme,
+    get_smarty_accuracy,
+    swap_bg_fg_like_in_template,
+)
+from oomox_gui.terminal_optimizer import SmartyOptimizer
+from oomox_gui.terminal_smarty import (
+    SmartyCountsCache,
+    SmartyEngine,
+    SmartyStats,
+    get_default_smarty_engine,
+)
+from oomox_gui.terminal_template import TerminalTemplateRegistry
+from oomox_gui.theme_file_parser import read_colorscheme_from_path
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+    from typing import Final
+
+    from .theme_file import ThemeT
+
+
+# bump it when the meaning of the measurements is changing:
+BENCHMARK_REPORT_VERSION: "Final" = 2
+BENCHMARK_MODES: "Final" = ("basic", "auto", "smarty", "manual")
+BENCHMARK_OPTIMIZERS: "Final" = (SmartyOptimizer.GRID, SmartyOptimizer.PATTERN)
+# `TERMINAL_THEME_ACCURACY` values, from the fastest to the default and the most accurate:
+BENCHMARK_ACCURACY_LEVELS: "Final" = (8, 128, 255)
+DEFAULT_REGRESSION_THRESHOLD: "Final" = 0.2
+# to not fail on the noise of the fastest cases (s):
+DEFAULT_MIN_TIME_DIFF: "Final" = 0.005
+# to not fail on the noise of the smallest allocations (bytes):
+DEFAULT_MIN_MEMORY_DIFF: "Final" = 1024 * 1024
+
+
+class BenchmarkCase(NamedTuple):
+    mode: str
+    preset: str
+    # `None` for the options not used by the mode:
+    template: str | None = None
+    accuracy: int | None = None
+    extend_palette: bool | None = None
+    optimizer: str | None = None
+
+    @property
+    def name(self) -> str:
+        return " ".join(
+            f"{key}={value}"
+            for key, value in zip(BenchmarkCase._fields, self, strict=True)
+            if value is not None
+        )
+
+
+class BenchmarkResult(NamedTuple):
+    time: float
+    evaluated: int = 0
+    pruned: int = 0
+    passes: int = 0
+    # to compare the quality of the optimizers:
+    score: float | None = None
+    peak_memory: int | None = None
+
+
+def iter_benchmark_cases(
+        presets: "list[str]",
+        templates: "list[str]",
+        modes: "list[str]",
+        accuracy_levels: "list[int]",
+        optimizers: "list[str]",
+) -> "Iterator[BenchmarkCase]":
+    for preset in presets:
+        for mode in modes:
+            if mode == "manual":
+                yield BenchmarkCase(mode=mode, preset=preset)
+                continue
+            for template in templates:
+                if mode != "smarty":
+                    yield BenchmarkCase(mode=mode, preset=preset, template=template)
+                    continue
+                for accuracy, extend_palette, optimizer in itertools.product(
+                        accuracy_levels, (False, True), optimizers,
+                ):
+                    yield BenchmarkCase(
+                        mode=mode, preset=preset, template=template,
+                        accuracy=accuracy, extend_palette=extend_palette, optimizer=optimizer,
+                    )
+
+
+def read_preset(preset: str) -> "ThemeT":
+    themes: list[ThemeT] = []
+    read_colorscheme_from_path(os.path.join(COLORS_DIR, preset), callback=themes.append)
+    return themes[0]
+
+
+def _generate(case: BenchmarkCase, colorscheme: "ThemeT", engine: str, stats: SmartyStats) -> None:
+    # each case should be measured from scratch, not patching the counts of the previous one:
+    SmartyCountsCache.clear()
+    colorscheme = dict(colorscheme)
+    colorscheme["TERMINAL_THEME_MODE"] = case.mode
+    if case.template:
+        colorscheme["TERMINAL_BASE_TEMPLATE"] = case.template
+    if case.mode != "smarty":
+        generate_terminal_colors_for_oomox(colorscheme, result_callback=lambda _theme: None)
+        return
+    # same as `generate_terminal_colors_for_oomox()` does, but bypassing the palette cache:
+    template = TerminalTemplateRegistry.get(
+        os.path.join(TERMINAL_TEMPLATE_DIR, case.template),  # type: ignore[arg-type]
+    )
+    theme_bg: str = colorscheme["TERMINAL_BACKGROUND"]  # type: ignore[assignment]
+    if colorscheme["TERMINAL_THEME_AUTO_BGFG"]:
+        theme_bg, _theme_fg = swap_bg_fg_like_in_template(
+            template.hex_colors, theme_bg, colorscheme["TERMINAL_FOREGROUND"],  # type: ignore[arg-type]
+        )
+    _generate_theme_from_full_palette(
+        lambda _colors: None,
+        template,
+        sorted(get_all_colors_from_oomox_colorscheme(colorscheme)),
+        theme_bg,
+        get_smarty_accuracy(case.accuracy),  # type: ignore[arg-type]
+        extend_palette=bool(case.extend_palette),
+        engine=engine,
+        processes=1,
+        stats=stats,
+        optimizer=case.optimizer,
+    )
+
+
+def run_benchmark_case(
+        case: BenchmarkCase,
+        colorscheme: "ThemeT",
+        engine: str,
+        *,
+        repeat: int = 1,
+        measure_memory: bool = True,
+) -> BenchmarkResult:
+    best_time = None
+    stats = SmartyStats()
+    for _i in range(repeat):
+        stats = SmartyStats()
+        start_time = perf_counter()
+        _generate(case, colorscheme, engine, stats)
+        case_time = perf_counter() - start_time
+        best_time = case_time if best_time is None else min(best_time, case_time)
+    peak_memory = None
+    if measure_memory:
+        # separate run, to not slow down the timed ones with tracing:
+        tracemalloc.start()
+        try:
+            _generate(case, colorscheme, engine, SmartyStats())
+            _current, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return BenchmarkResult(
+        time=best_time or 0.0,
+        evaluated=stats.evaluated,
+        pruned=stats.pruned,
+        passes=stats.passes,
+        score=stats.best_score,
+        peak_memory=peak_memory,
+    )
+
+
+def _filter_names(names: "list[str]", patterns: "list[str] | None") -> "list[str]":
+    if not patterns:
+        return names
+    return [
+        name for name in names
+        if any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+    ]
+
+
+def _get_presets_and_templates(args: argparse.Namespace) -> "tuple[list[str], list[str]]":
+    presets = _filter_names(sorted(
+        os.path.relpath(os.path.join(dir_path, file_name), COLORS_DIR)
+        for dir_path, _dir_names, file_names in os.walk(COLORS_DIR)
+        for file_name in file_names
+    ), args.presets)
+    templates = _filter_names(sorted(os.listdir(TERMINAL_TEMPLATE_DIR)), args.templates)
+    return presets, templates
+
+
+def run_benchmark(args: argparse.Namespace) -> dict[str, Any]:
+    presets, templates = _get_presets_and_templates(args)
+    cases = list(iter_benchmark_cases(
+        presets=presets, templates=templates, modes=args.modes, accuracy_levels=args.accuracy,
+        optimizers=args.optimizers,
+    ))
+    engine = args.engine or get_default_smarty_engine()
+    report: dict[str, Any] = {
+        "version": BENCHMARK_REPORT_VERSION,
+        "created": strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "engine": engine,
+        "repeat": args.repeat,
+        "cases": [],
+    }
+    colorschemes: dict[str, ThemeT] = {}
+    start_time = perf_counter()
+    for case_idx, case in enumerate(cases, start=1):
+        if case.preset not in colorschemes:
+            colorschemes[case.preset] = read_preset(case.preset)
+        result = run_benchmark_case(
+            case, colorschemes[case.preset], engine,
+            repeat=args.repeat, measure_memory=not args.no_memory,
+        )
+        report["cases"].append({**case._asdict(), **result._asdict()})
+        print(f"[{case_idx}/{len(cases)}] {case.name}: {result.time:.6f}s, {result.evaluated} candidates")
+    report["total_time"] = perf_counter() - start_time
+    print(f":: {len(cases)} cases took {report['total_time']:.3f}s")
+    print_optimizers_summary(report["cases"])
+    return report
+
+
+def print_optimizers_summary(cases: "list[dict[str, Any]]") -> None:
+    """Evaluations to converge and resulting score of each optimizer next to the grid search."""
+    grid_scores = {
+        _case_key({**case, "optimizer": None}): case["score"]
+        for case in cases
+        if case["optimizer"] == SmartyOptimizer.GRID
+    }
+    for optimizer in BENCHMARK_OPTIMIZERS:
+        optimizer_cases = [case for case in cases if case["optimizer"] == optimizer]
+        if not optimizer_cases:
+            continue
+        summary = (
+            f":: {optimizer}: {len(optimizer_cases)} cases,"
+            f" {sum(case['evaluated'] for case in optimizer_cases)} candidates evaluated,"
+            f" took {sum(case['time'] for case in optimizer_cases):.3f}s"
+        )
+        compared_scores = [
+            (case["score"] or 0, grid_scores[key] or 0)
+            for case in optimizer_cases
+            if (key := _case_key({**case, "optimizer": None})) in grid_scores
+        ]
+        if optimizer != SmartyOptimizer.GRID and compared_scores:
+            summary += (
+                f", score vs grid:"
+                f" {sum(score > grid_score for score, grid_score in compared_scores)} better,"
+                f" {sum(score == grid_score for score, grid_score in compared_scores)} same,"
+                f" {sum(score < grid_score for score, grid_score in compared_scores)} worse"
+            )
+        print(summary)
+
+
+def _best_time(function: "Callable[[], Any]", repeat: int) -> float:
+    best_time = None
+    for _i in range(repeat):
+        start_time = perf_counter()
+        function()
+        case_time = perf_counter() - start_time
+        best_time = case_time if best_time is None else min(best_time, case_time)
+    return best_time or 0.0
+
+
+def run_lightness_benchmark(args: argparse.Namespace) -> None:
+    """
+    Cost of each lightness model next to the channel sum, which smarty search is using
+    for the lightness bounds of each of the template colors for each of the candidates.
+    """
+    presets, templates = _get_presets_and_templates(args)
+    colors_set: set[str] = set()
+    for preset in presets:
+        colors_set.update(get_all_colors_from_oomox_colorscheme(read_preset(preset)))
+    template_colors_counts = []
+    for template_name in templates:
+        template = TerminalTemplateRegistry.get(os.path.join(TERMINAL_TEMPLATE_DIR, template_name))
+        colors_set.update(template.hex_colors.values())
+        template_colors_counts.append(len(list(template.iter_int_colors("color"))))
+    colors = sorted(colors_set)
+    print(f":: {len(colors)} colors, best of {args.repeat} runs")
+
+    # how much time smarty search spends per candidate offset, to compare with:
+    case = BenchmarkCase(
+        mode="smarty", preset=presets[0], template=templates[0],
+        accuracy=args.accuracy[0], extend_palette=False, optimizer=SmartyOptimizer.GRID,
+    )
+    smarty_result = run_benchmark_case(
+        case, read_preset(case.preset), get_default_smarty_engine(),
+        repeat=args.repeat, measure_memory=False,
+    )
+    smarty_candidate_time = smarty_result.time / max(
+        smarty_result.evaluated + smarty_result.pruned, 1,
+    )
+    colors_per_candidate = max(template_colors_counts) if template_colors_counts else 16
+    print(
+        f":: smarty search ({case.name}):"
+        f" {smarty_candidate_time * 1e9:.1f}ns per candidate,"
+        f" checking up to {colors_per_candidate} template colors each",
+    )
+
+    engines = sorted({SmartyEngine.PYTHON, get_default_smarty_engine()})
+    parsed_colors = [int_list_from_hex(color) for color in colors]
+    baseline_time = None
+    for model, lightness_function in LIGHTNESS_FUNCTIONS.items():
+        scalar_time = _best_time(
+            lambda function=lightness_function: [function(color) for color in parsed_colors],  # type: ignore[misc]
+            args.repeat,
+        ) / len(colors)
+        if model == LightnessModel.CHANNEL_SUM:
+            baseline_time = scalar_time
+        summary = (
+            f":: {model}: {scalar_time * 1e9:.1f}ns per color"
+            f" ({scalar_time / (baseline_time or scalar_time):.2f}x of {LightnessModel.CHANNEL_SUM}),"
+            f" {scalar_time * colors_per_candidate / smarty_candidate_time * 100:.1f}%"
+            " of smarty candidate time"
+        )
+        for engine in engines:
+            batch_time = _best_time(
+                lambda model=model, engine=engine: get_lightnesses(  # type: ignore[misc]
+                    colors, model, engine=engine,
+                ),
+                args.repeat,
+            ) / len(colors)
+            summary += f", {engine} batch: {batch_time * 1e9:.1f}ns per color"
+        print(summary)
+
+
+def _case_key(case: dict[str, Any]) -> tuple[Any, ...]:
+    return tuple(case.get(field) for field in BenchmarkCase._fields)
+
+
+def compare_benchmark_reports(  # pylint: disable=too-many-locals
+        baseline: dict[str, Any],
+        current: dict[str, Any],
+        threshold: float = DEFAULT_REGRESSION_THRESHOLD,
+        *,
+        min_time_diff: float = DEFAULT_MIN_TIME_DIFF,
+        min_memory_diff: int = DEFAULT_MIN_MEMORY_DIFF,
+) -> list[str]:
+    """Regressions of `current` report against `baseline` one, beyond `threshold` ratio."""
+    baseline_cases = {_case_key(case): case for case in baseline["cases"]}
+    regressions = []
+    baseline_total = current_total = 0.0
+    for current_case in current["cases"]:
+        baseline_case = baseline_cases.get(_case_key(current_case))
+        if not baseline_case:
+            continue
+        case_name = BenchmarkCase(*_case_key(current_case)).name
+        baseline_total += baseline_case["time"]
+        current_total += current_case["time"]
+        for metric, min_diff in (
+                ("time", min_time_diff),
+                ("evaluated", 0),
+                ("peak_memory", min_memory_diff),
+        ):
+            old_value, new_value = baseline_case.get(metric), current_case.get(metric)
+            if (old_value is None) or (new_value is None):
+                continue
+            if (new_value > old_value * (1 + threshold)) and (new_value - old_value > min_diff):
+                regressions.append(f"{case_name}: {metric} {old_value} -> {new_value}")
+        # the same inputs should give not worse palette:
+        old_score, new_score = baseline_case.get("score"), current_case.get("score")
+        if (old_score is not None) and ((new_score is None) or (new_score < old_score)):
+            regressions.append(f"{case_name}: score {old_score} -> {new_score}")
+    if baseline_total:
+        print(
+            f":: total time of {len(baseline_cases)} baseline cases:"
+            f" {baseline_total:.3f}s -> {current_total:.3f}s"
+            f" ({(current_total / baseline_total - 1) * 100:+.1f}%)",
+        )
+    if baseline_total and (current_total > baseline_total * (1 + threshold)):
+        regressions.append(f"total: time {baseline_total} -> {current_total}")
+    return regressions
+
+
+def _read_report(path: str) -> dict[str, Any]:
+    with Path(path).open(encoding=DEFAULT_ENCODING) as fobj:
+        report: dict[str, Any] = json.load(fobj)
+    if report.get("version") != BENCHMARK_REPORT_VERSION:
+        msg = f"{path}: unsupported benchmark report version {report.get('version')}"
+        raise RuntimeError(msg)
+    return report
+
+
+def _print_regressions(regressions: "list[str]") -> None:
+    if not regressions:
+        print(":: no regressions 👌")
+        return
+    print(f":: {len(regressions)} regression(s):")
+    for regression in regressions:
+        print(f"  {regression}")
+    sys.exit(1)
+
+
+def do_run(args: argparse.Namespace) -> None:
+    report = run_benchmark(args)
+    with Path(args.output).open("w", encoding=DEFAULT_ENCODING) as fobj:
+        json.dump(report, fobj, indent=2)
+    print(f":: report saved to {args.output}")
+    if args.compare:
+        _print_regressions(compare_benchmark_reports(
+            _read_report(args.compare), report, args.threshold,
+        ))
+
+
+def do_compare(args: argparse.Namespace) -> None:
+    _print_regressions(compare_benchmark_reports(
+        _read_report(args.baseline_path), _read_report(args.report_path), args.threshold,
+    ))
+
+
+def main() -> None:
+    my_name = Path(sys.argv[0]).name
+    parser = argparse.ArgumentParser(
+        description="Themix Terminal Palette Generation Benchmark",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=f"""
+------------------------
+
+Examples:
+
+Benchmark smarty mode for Featured presets with the default accuracy:
+
+    $ {my_name} run -o baseline.json --modes smarty --presets 'Featured/*' --accuracy 128
+
+Do the same after the changes and fail if anything got more than 10% slower:
+
+    $ {my_name} run -o current.json --modes smarty --presets 'Featured/*' --accuracy 128 \
+--compare baseline.json --threshold 0.1
+
+Stats of each smarty search are printed to stderr with `OOMOX_DEBUG=1` env var.
+
+""",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run the benchmark")
+    run_parser.set_defaults(func=do_run)
+    run_parser.add_argument(
+        "-o", "--output",
+        default="terminal_benchmark.json",
+        help="path to JSON report (default: %(default)s)",
+    )
+    run_parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=BENCHMARK_MODES,
+        default=list(BENCHMARK_MODES),
+        help="terminal theme modes (default: all)",
+    )
+    run_parser.add_argument(
+        "--templates",
+        nargs="+",
+        help=f"terminal template name patterns, inside `{TERMINAL_TEMPLATE_DIR}` (default: all)",
+    )
+    run_parser.add_argument(
+        "--presets",
+        nargs="+",
+        help=f"color preset path patterns, relative to `{COLORS_DIR}` (default: all)",
+    )
+    run_parser.add_argument(
+        "--accuracy",
+        nargs="+",
+        type=int,
+        default=list(BENCHMARK_ACCURACY_LEVELS),
+        help="`TERMINAL_THEME_ACCURACY` values for smarty mode (default: %(default)s)",
+    )
+    run_parser.add_argument(
+        "--optimizers",
+        nargs="+",
+        choices=BENCHMARK_OPTIMIZERS,
+        default=list(BENCHMARK_OPTIMIZERS),
+        help="smarty search optimizers (default: all)",
+    )
+    run_parser.add_argument(
+        "--engine",
+        default=None,
+        help=f"smarty search engine (default: {get_default_smarty_engine()})",
+    )
+    run_parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="run each case N times and record the fastest one (default: %(default)s)",
+    )
+    run_parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="don't measure peak memory, which takes one more run of each case",
+    )
+    run_parser.add_argument(
+        "--compare",
+        metavar="BASELINE_PATH",
+        help="compare with the baseline report after running",
+    )
+
+    lightness_parser = subparsers.add_parser(
+        "lightness", help="compare the cost of lightness models on the colors of presets and templates",
+    )
+    lightness_parser.set_defaults(func=run_lightness_benchmark)
+    lightness_parser.add_argument(
+        "--templates",
+        nargs="+",
+        help=f"terminal template name patterns, inside `{TERMINAL_TEMPLATE_DIR}` (default: all)",
+    )
+    lightness_parser.add_argument(
+        "--presets",
+        nargs="+",
+        help=f"color preset path patterns, relative to `{COLORS_DIR}` (default: all)",
+    )
+    lightness_parser.add_argument(
+        "--accuracy",
+        nargs=1,
+        type=int,
+        default=[BENCHMARK_ACCURACY_LEVELS[1]],
+        help="`TERMINAL_THEME_ACCURACY` of smarty search to compare with (default: %(default)s)",
+    )
+    lightness_parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="run each model N times and record the fastest one (default: %(default)s)",
+    )
+
+    compare_parser = subparsers.add_parser("compare", help="compare two reports")
+    compare_parser.set_defaults(func=do_compare)
+    compare_parser.add_argument("baseline_path")
+    compare_parser.add_argument("report_path")
+
+    for subparser in (run_parser, compare_parser):
+        subparser.add_argument(
+            "--threshold",
+            type=float,
+            default=DEFAULT_REGRESSION_THRESHOLD,
+            help="fail if time, candidates or memory grew more than this ratio (default: %(default)s)",
+        )
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
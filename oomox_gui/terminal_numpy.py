@@ -0,0 +1,272 @@
+"""NumPy implementations of the "smarty" terminal palette search pass and of the hint-based palettes."""
+from array import array
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from .color import int_list_from_hex
+from .terminal_smarty import (
+    COLOR_DIFF_MARGIN,
+    COLOR_SIMILARITY_IMPORTANCE,
+    SMARTY_LIGHTNESS_EXEMPT_KEYS,
+    SmartyPassResult,
+)
+from .terminal_template import HIGHLIGHT_COLOR_KEYS
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from typing import Final
+
+    from numpy.typing import NDArray
+
+    from .terminal import TerminalHint, TerminalThemeT
+    from .terminal_smarty import SmartySearch
+    from .terminal_template import TerminalTemplate
+
+
+MAX_LIGHTNESS: "Final" = 255 * 3
+
+
+def _channel_values(
+        template: "NDArray[np.int32]", axes: "Sequence[NDArray[np.int32]]",
+) -> "list[NDArray[np.int32]]":
+    # clamped value of each template color channel for each offset of that channel axis,
+    # shape: (template_colors, axis_len)
+    return [
+        np.clip(template[:, channel, None] + axis[None, :], 0, 255)
+        for channel, axis in enumerate(axes)
+    ]
+
+
+def _counts_array(counts: "NDArray[np.intc]") -> "array[int]":
+    result = array("i")
+    result.frombytes(counts.astype(np.intc).tobytes())
+    return result
+
+
+def _similarity_to_reference(
+        axes: "Sequence[NDArray[np.int32]]",
+) -> "NDArray[np.float64]":
+    # shape: (reds, greens, blues)
+    abs_offsets_sum = (
+        np.abs(axes[0])[:, None, None] + np.abs(axes[1])[None, :, None] + np.abs(axes[2])[None, None, :]
+    )
+    result: NDArray[np.float64] = (
+        MAX_LIGHTNESS - abs_offsets_sum * COLOR_SIMILARITY_IMPORTANCE
+    ) / MAX_LIGHTNESS
+    return result
+
+
+def smarty_pass_numpy(
+        search: "SmartySearch",
+        reds: "Sequence[int]",
+        greens: "Sequence[int]",
+        blues: "Sequence[int]",
+) -> SmartyPassResult:
+    """
+    Score the whole offset cube with array broadcasting.
+
+    Gives exactly the same result as `terminal._smarty_pass_python`:
+    the first (in red, green, blue loop order) offset with the biggest score.
+    Only offsets within lightness bounds are scored.
+    """
+    total = len(reds) * len(greens) * len(blues)
+    if not (total and search.template_colors):
+        return SmartyPassResult(score=None, pruned=total)
+    axes = [np.asarray(axis, dtype=np.int32) for axis in (reds, greens, blues)]
+    template = np.array([value for _key, value in search.template_colors], dtype=np.int32)
+    lightness_checked = np.array([
+        key not in SMARTY_LIGHTNESS_EXEMPT_KEYS
+        for key, _value in search.template_colors
+    ], dtype=bool)
+    bright = np.array(search.bright_colors, dtype=np.int32).reshape(-1, 3)
+
+    red_values, green_values, blue_values = _channel_values(template, axes)
+
+    # lightness of each checked template color for each (green, blue) offset:
+    green_blue_lightness = (
+        green_values[lightness_checked][:, :, None] + blue_values[lightness_checked][:, None, :]
+    )
+    checked_red_values = red_values[lightness_checked]
+
+    # L1 distances between modified template colors and bright colors, per channel:
+    # shape (template_colors, axis_len, bright_colors)
+    red_diffs = np.abs(red_values[:, :, None] - bright[None, None, :, 0]).astype(np.int16)
+    green_blue_diffs = (
+        np.abs(green_values[:, :, None, None] - bright[None, None, None, :, 1]).astype(np.int16)
+        + np.abs(blue_values[:, None, :, None] - bright[None, None, None, :, 2]).astype(np.int16)
+    )
+
+    abs_green_blue = np.abs(axes[1])[:, None] + np.abs(axes[2])[None, :]
+    counts = np.full((len(reds), len(greens), len(blues)), -1, dtype=np.intc)
+
+    best_score: float | None = None
+    best_offset = (0, 0, 0)
+    evaluated = 0
+    for red_idx, red in enumerate(reds):
+        lightness = green_blue_lightness + checked_red_values[:, red_idx, None, None]
+        feasible = np.all(
+            (lightness >= search.min_lightness) & (lightness <= search.max_lightness),
+            axis=0,
+        )
+        # C-order of indexes keeps (green, blue) loop order for tie-breaking:
+        green_idxs, blue_idxs = np.nonzero(feasible)
+        if not green_idxs.size:
+            continue
+        evaluated += green_idxs.size
+
+        num_of_similar = np.zeros(green_idxs.shape, dtype=np.int64)
+        for color_idx in range(len(template)):
+            red_diff = red_diffs[color_idx, red_idx]
+            # only bright colors which are not already too far by red channel:
+            close_by_red = np.nonzero(red_diff < COLOR_DIFF_MARGIN)[0]
+            if not close_by_red.size:
+                continue
+            num_of_similar += np.count_nonzero(
+                green_blue_diffs[color_idx][green_idxs, blue_idxs][:, close_by_red]
+                < (COLOR_DIFF_MARGIN - red_diff[close_by_red]),
+                axis=1,
+            )
+        counts[red_idx, green_idxs, blue_idxs] = num_of_similar
+
+        similarity_to_reference = (
+            MAX_LIGHTNESS
+            - (abs(red) + abs_green_blue[green_idxs, blue_idxs]) * COLOR_SIMILARITY_IMPORTANCE
+        ) / MAX_LIGHTNESS
+        scores = num_of_similar.astype(np.float64) * similarity_to_reference
+        best_idx = int(np.argmax(scores))
+        score = float(scores[best_idx])
+        if best_score is None or score > best_score:
+            best_score = score
+            best_offset = (
+                int(red), int(axes[1][green_idxs[best_idx]]), int(axes[2][blue_idxs[best_idx]]),
+            )
+    return SmartyPassResult(
+        score=best_score,
+        offset=best_offset,
+        evaluated=evaluated,
+        pruned=total - evaluated,
+        counts=_counts_array(counts),
+    )
+
+
+def count_similar_numpy(
+        search: "SmartySearch",
+        reds: "Sequence[int]",
+        greens: "Sequence[int]",
+        blues: "Sequence[int]",
+) -> "array[int]":
+    counts = smarty_pass_numpy(search, reds, greens, blues).counts
+    if counts is None:
+        return array("i", [0]) * (len(reds) * len(greens) * len(blues))
+    return counts
+
+
+def best_of_counts_numpy(
+        counts: "array[int]",
+        reds: "Sequence[int]",
+        greens: "Sequence[int]",
+        blues: "Sequence[int]",
+) -> SmartyPassResult:
+    """Same as `smarty_pass_numpy()` gives for the already known counts of similar colors."""
+    axes = [np.asarray(axis, dtype=np.int32) for axis in (reds, greens, blues)]
+    counts_grid = np.frombuffer(counts, dtype=np.intc).reshape(len(reds), len(greens), len(blues))
+    feasible = counts_grid >= 0
+    if not feasible.any():
+        return SmartyPassResult(score=None)
+    scores = counts_grid.astype(np.float64) * _similarity_to_reference(axes)
+    scores[~feasible] = -np.inf
+    # first of the biggest ones in (red, green, blue) loop order:
+    red_idx, green_idx, blue_idx = (
+        int(idx) for idx in np.unravel_index(int(np.argmax(scores)), scores.shape)
+    )
+    return SmartyPassResult(
+        score=float(scores[red_idx, green_idx, blue_idx]),
+        offset=(int(axes[0][red_idx]), int(axes[1][green_idx]), int(axes[2][blue_idx])),
+    )
+
+
+def patch_counts_numpy(
+        counts: "array[int]",
+        added_counts: "array[int] | None",
+        removed_counts: "array[int] | None",
+) -> "array[int]":
+    result = np.frombuffer(counts, dtype=np.intc).copy()
+    feasible = result >= 0
+    if added_counts is not None:
+        result[feasible] += np.maximum(np.frombuffer(added_counts, dtype=np.intc), 0)[feasible]
+    if removed_counts is not None:
+        result[feasible] -= np.maximum(np.frombuffer(removed_counts, dtype=np.intc), 0)[feasible]
+    return _counts_array(result)
+
+
+def _unpack_colors(packed_colors: "NDArray[np.int64]") -> "NDArray[np.int64]":
+    return np.stack(
+        [packed_colors >> 16, (packed_colors >> 8) & 0xff, packed_colors & 0xff], axis=-1,
+    )
+
+
+def _hex_colors(colors: "NDArray[np.int64]") -> list[list[str]]:
+    packed_colors = (colors[..., 0] << 16) | (colors[..., 1] << 8) | colors[..., 2]
+    return [[f"{color:06x}" for color in row] for row in packed_colors.tolist()]
+
+
+def generate_themes_from_hints_numpy(
+        template: "TerminalTemplate",
+        hints: "Sequence[TerminalHint]",
+) -> "list[TerminalThemeT]":
+    """
+    Gives exactly the same result as `terminal._generate_theme_from_hint()` for each of the hints
+    (with BG/FG already swapped if needed), when all the template colors are 6-digit ones.
+    """
+    if not hints:
+        return []
+    keys = template.packed_keys
+    key_indexes = {key: idx for idx, key in enumerate(keys)}
+    template_colors = _unpack_colors(np.array(template.packed_colors, dtype=np.int64))
+    theme_colors = np.array(
+        [int_list_from_hex(hint.theme_color) for hint in hints], dtype=np.int64,
+    )
+
+    # closest of the highlight colors, the first of the equally close ones,
+    # if none is closer than `color.SMALLEST_DIFF` - the diff is that one:
+    highlight_colors = template_colors[
+        [idx for idx, key in enumerate(keys) if key in HIGHLIGHT_COLOR_KEYS]
+    ]
+    reference_colors = theme_colors - 0xff
+    if len(highlight_colors):
+        abs_sums = np.abs(highlight_colors[None, :, :] - theme_colors[:, None, :]).sum(axis=2)
+        closest_idxs = np.argmin(abs_sums, axis=1)
+        found = abs_sums[np.arange(len(hints)), closest_idxs] < MAX_LIGHTNESS
+        reference_colors[found] = highlight_colors[closest_idxs[found]]
+    for hint_idx, hint in enumerate(hints):
+        if hint.theme_hint:
+            reference_colors[hint_idx] = template_colors[key_indexes[hint.theme_hint]]
+    diffs = reference_colors - theme_colors
+    modified_colors = np.clip(template_colors[None, :, :] - diffs[:, None, :], 0, 0xff)
+
+    # the same diff as between template background/foreground and its colors,
+    # applied to the theme ones:
+    for source, destinations in {
+            "background": ("color0", "color8"),
+            "foreground": ("color7", "color15"),
+    }.items():
+        theme_sources = np.array([
+            int_list_from_hex(hint.theme_bg if source == "background" else hint.theme_fg)
+            for hint in hints
+        ], dtype=np.int64)
+        for key in destinations:
+            modified_colors[:, key_indexes[key]] = np.clip(
+                theme_sources - (
+                    template_colors[key_indexes[source]] - template_colors[key_indexes[key]]
+                ),
+                0, 0xff,
+            )
+
+    results = []
+    for hint, hex_colors in zip(hints, _hex_colors(modified_colors), strict=True):
+        result = dict(zip(keys, hex_colors, strict=True))
+        result["background"] = hint.theme_bg
+        result["foreground"] = hint.theme_fg
+        results.append(result)
+    return results
@@ -0,0 +1,194 @@
+"""
+Derivative-free alternative to the coarse-to-fine grid of "smarty" search:
+compass (pattern) search of RGB offset, started from the best points of a coarse lattice.
+
+Instead of evaluating the whole cube of offsets around the best one on each pass,
+it's only polling the neighbours along each of the axes,
+moving to the best one while it's improving the score, and halving the step otherwise.
+"""
+from typing import TYPE_CHECKING
+
+from .color_index import ColorGrid
+from .terminal_smarty import (
+    COLOR_DIFF_MARGIN,
+    COLOR_SIMILARITY_IMPORTANCE,
+    SMARTY_LIGHTNESS_EXEMPT_KEYS,
+    SmartyPassResult,
+    SmartySearch,
+    SmartySearchControl,
+    SmartyStats,
+    apply_smarty_offset,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from typing import Final
+
+    OffsetT = tuple[int, int, int]
+
+
+class SmartyOptimizer:
+    GRID: "Final" = "grid"
+    PATTERN: "Final" = "pattern"
+
+
+# step of the lattice of the offsets to look for the starting points,
+# halved while there are no points within lightness bounds on it:
+PATTERN_SEARCH_LATTICE_STEP: "Final" = 128
+PATTERN_SEARCH_MIN_LATTICE_STEP: "Final" = 8
+# how many of the best lattice points to start from:
+PATTERN_SEARCH_STARTS: "Final" = 3
+PATTERN_SEARCH_INITIAL_STEP: "Final" = 64
+PATTERN_SEARCH_DIRECTIONS: "Final" = (
+    (1, 0, 0), (-1, 0, 0),
+    (0, 1, 0), (0, -1, 0),
+    (0, 0, 1), (0, 0, -1),
+)
+# the same meaning of accuracy as in grid search (the lower the more accurate),
+# it sets the final step of pattern search:
+PATTERN_SEARCH_ACCURACY_TO_STEP: "Final" = 64
+
+
+class SmartyOffsetScorer:
+    """
+    Score of a single offset, the same as smarty pass gives for it,
+    remembering the ones already evaluated.
+    """
+
+    evaluated: int
+    pruned: int
+    _search: SmartySearch
+    _checked_indexes: list[int]
+    _bright_colors_grid: ColorGrid
+    _scores: "dict[OffsetT, float | None]"
+
+    def __init__(self, search: SmartySearch) -> None:
+        self._search = search
+        self._checked_indexes = [
+            idx for idx, (key, _value) in enumerate(search.template_colors)
+            if key not in SMARTY_LIGHTNESS_EXEMPT_KEYS
+        ]
+        self._bright_colors_grid = ColorGrid(search.bright_colors)
+        self._scores = {}
+        self.evaluated = 0
+        self.pruned = 0
+
+    def score(self, offset: "OffsetT") -> float | None:
+        """`None` if the offset puts template colors outside of lightness bounds."""
+        if offset in self._scores:
+            return self._scores[offset]
+        modified_colors = [
+            [min(255, max(0, value[i] + offset[i])) for i in range(3)]
+            for _key, value in self._search.template_colors
+        ]
+        score: float | None = None
+        if all(
+                self._search.min_lightness <= sum(modified_colors[idx]) <= self._search.max_lightness
+                for idx in self._checked_indexes
+        ):
+            count = sum(
+                self._bright_colors_grid.count_within(modified_color, COLOR_DIFF_MARGIN)
+                for modified_color in modified_colors
+            )
+            similarity_to_reference = (
+                255 * 3 - sum(abs(c) for c in offset) * COLOR_SIMILARITY_IMPORTANCE
+            ) / (255 * 3)
+            score = float(count) * similarity_to_reference
+            self.evaluated += 1
+        else:
+            self.pruned += 1
+        self._scores[offset] = score
+        return score
+
+
+def _pattern_search(
+        scorer: SmartyOffsetScorer,
+        start: "OffsetT",
+        start_score: float,
+        min_step: int,
+        control: SmartySearchControl | None,
+) -> "tuple[OffsetT, float]":
+    offset, score = start, start_score
+    step = PATTERN_SEARCH_INITIAL_STEP
+    while step >= min_step:
+        if control:
+            control.check_cancelled()
+        best_neighbour: OffsetT | None = None
+        for direction in PATTERN_SEARCH_DIRECTIONS:
+            neighbour_offset: OffsetT = (
+                min(255, max(-255, offset[0] + direction[0] * step)),
+                min(255, max(-255, offset[1] + direction[1] * step)),
+                min(255, max(-255, offset[2] + direction[2] * step)),
+            )
+            neighbour_score = scorer.score(neighbour_offset)
+            if (neighbour_score is not None) and (neighbour_score > score):
+                best_neighbour, score = neighbour_offset, neighbour_score
+        if best_neighbour is not None:
+            offset = best_neighbour
+        else:
+            step //= 2
+    return offset, score
+
+
+def _get_start_points(scorer: SmartyOffsetScorer) -> "Sequence[tuple[OffsetT, float]]":
+    lattice_step = PATTERN_SEARCH_LATTICE_STEP
+    lattice_scores: list[tuple[OffsetT, float]] = []
+    while (not lattice_scores) and (lattice_step >= PATTERN_SEARCH_MIN_LATTICE_STEP):
+        lattice = sorted({
+            min(255, max(-255, value)) for value in range(-256, 256 + 1, lattice_step)
+        })
+        lattice_scores = [
+            (offset, score)
+            for offset in (
+                (red, green, blue)
+                for red in lattice
+                for green in lattice
+                for blue in lattice
+            )
+            if (score := scorer.score(offset)) is not None
+        ]
+        lattice_step //= 2
+    # stable, so the first of equally good ones would be used, like in grid search:
+    lattice_scores.sort(key=lambda offset_score: -offset_score[1])
+    return lattice_scores[:PATTERN_SEARCH_STARTS]
+
+
+def pattern_smarty_search(
+        search: SmartySearch,
+        accuracy: int | None = None,
+        *,
+        stats: SmartyStats | None = None,
+        control: SmartySearchControl | None = None,
+) -> dict[str, list[int]] | None:
+    min_step = max(1, (accuracy or 0) // PATTERN_SEARCH_ACCURACY_TO_STEP)
+    scorer = SmartyOffsetScorer(search)
+    start_points = _get_start_points(scorer)
+    if stats is not None:
+        stats.add(SmartyPassResult(
+            score=start_points[0][1] if start_points else None,
+            offset=start_points[0][0] if start_points else (0, 0, 0),
+            evaluated=scorer.evaluated,
+            pruned=scorer.pruned,
+        ))
+
+    if not start_points:
+        return None
+    # pattern search is only moving to the better points, so it's not worse than the start:
+    best_offset, best_score = start_points[0]
+    for start, start_score in start_points:
+        evaluated, pruned = scorer.evaluated, scorer.pruned
+        offset, score = _pattern_search(scorer, start, start_score, min_step, control)
+        if stats is not None:
+            stats.add(SmartyPassResult(
+                score=score, offset=offset,
+                evaluated=scorer.evaluated - evaluated, pruned=scorer.pruned - pruned,
+            ))
+        if score > best_score:
+            best_offset, best_score = offset, score
+        if control and control.is_out_of_time:
+            if not control.on_out_of_time:
+                control.stopped_early = True
+                break
+            control.on_out_of_time(apply_smarty_offset(search, best_offset))
+            control.deadline = None
+    return apply_smarty_offset(search, best_offset)
@@ -0,0 +1,144 @@
+"""
+Build the bundle of "smarty" terminal palettes for all the shipped presets
+combined with each of the terminal templates, with the accuracy settings of the preset.
+
+It's generated at build time (`make terminal_palettes`) and installed next to `terminal_templates/`,
+so selecting the built-in preset and template would show the palette instantly
+instead of running the search on the first launch.
+"""
+import argparse
+import gzip
+import json
+import os
+from multiprocessing.pool import Pool
+from time import time
+from typing import TYPE_CHECKING, Any
+
+from oomox_gui.config import (
+    COLORS_DIR,
+    DEFAULT_ENCODING,
+    TERMINAL_PALETTES_BUNDLE_PATH,
+    TERMINAL_TEMPLATE_DIR,
+)
+from oomox_gui.helpers import ls_r
+from oomox_gui.terminal import (
+    FULL_PALETTE_CACHE_VERSION,
+    _generate_theme_from_full_palette,
+    get_full_palette_options,
+    prepare_full_palette_inputs,
+)
+from oomox_gui.theme_file_parser import read_colorscheme_from_path
+from oomox_gui.theme_model import warm_up_plugins
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from .terminal import TerminalThemeT
+    from .theme_file import ThemeT
+
+
+def iter_full_palette_jobs() -> "Iterator[tuple[str, dict[str, Any]]]":
+    """Unique (cache id, search arguments) of each of the presets with each of the templates."""
+    seen_cache_ids = set()
+    template_names = sorted(os.listdir(TERMINAL_TEMPLATE_DIR))
+    for preset_path in sorted(ls_r(COLORS_DIR)):
+        themes: list[ThemeT] = []
+        read_colorscheme_from_path(preset_path, callback=themes.append)
+        if not themes:
+            continue
+        colorscheme = themes[0]
+        for template_name in template_names:
+            colorscheme["TERMINAL_BASE_TEMPLATE"] = template_name
+            options = get_full_palette_options(colorscheme)
+            inputs = prepare_full_palette_inputs(
+                **options, template_path=os.path.join(TERMINAL_TEMPLATE_DIR, template_name),
+            )
+            if inputs.cache_id in seen_cache_ids:
+                continue
+            seen_cache_ids.add(inputs.cache_id)
+            yield inputs.cache_id, {
+                "template": inputs.template,
+                "all_colors": inputs.all_colors,
+                "theme_bg": inputs.theme_bg,
+                "accuracy": options["accuracy"],
+                "extend_palette": options["extend_palette"],
+            }
+
+
+def generate_bundled_palette(
+        job: "tuple[str, dict[str, Any]]",
+) -> "tuple[str, TerminalThemeT]":
+    cache_id, search_kwargs = job
+    results: list[TerminalThemeT] = []
+    _generate_theme_from_full_palette(results.append, processes=1, **search_kwargs)
+    return cache_id, results[-1]
+
+
+def pack_palettes(
+        palettes: "dict[str, TerminalThemeT]",
+) -> dict[str, Any]:
+    key_sets: list[list[str]] = []
+    packed_palettes: dict[str, tuple[int, str]] = {}
+    for cache_id, palette in sorted(palettes.items()):
+        key_set = sorted(palette)
+        if key_set not in key_sets:
+            key_sets.append(key_set)
+        packed_palettes[cache_id] = (
+            key_sets.index(key_set),
+            "".join(palette[key] for key in key_set),
+        )
+    return {
+        "version": FULL_PALETTE_CACHE_VERSION,
+        "key_sets": key_sets,
+        "palettes": packed_palettes,
+    }
+
+
+def build_terminal_palettes_bundle(output_path: str, processes: int | None = None) -> int:
+    warm_up_plugins()
+    jobs = list(iter_full_palette_jobs())
+    print(f":: Generating {len(jobs)} terminal palettes...")
+    start_time = time()
+    palettes: dict[str, TerminalThemeT] = {}
+    with Pool(processes=processes, initializer=warm_up_plugins) as pool:
+        for idx, (cache_id, palette) in enumerate(
+                pool.imap_unordered(generate_bundled_palette, jobs), start=1,
+        ):
+            palettes[cache_id] = palette
+            print(f"{idx}/{len(jobs)}", end="\r")
+    print(f":: Took {time() - start_time:.2f}s")
+
+    # not storing the timestamp to have the same file if the palettes are the same:
+    with gzip.GzipFile(output_path, "wb", mtime=0) as gzip_file:
+        gzip_file.write(json.dumps(
+            pack_palettes(palettes), separators=(",", ":"),
+        ).encode(DEFAULT_ENCODING))
+    return len(palettes)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Build the bundle of Advanced terminal palettes for the built-in presets",
+    )
+    parser.add_argument(
+        "output_path",
+        nargs="?",
+        default=TERMINAL_PALETTES_BUNDLE_PATH,
+        help=f"(default: {TERMINAL_PALETTES_BUNDLE_PATH})",
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=None,
+        help=(
+            "number of worker processes"
+            f" (default: all CPU cores: {os.cpu_count()})"
+        ),
+    )
+    args = parser.parse_args()
+    num_palettes = build_terminal_palettes_bundle(args.output_path, processes=args.jobs)
+    print(f":: {num_palettes} palettes saved to {args.output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Rank terminal templates by how well "smarty" search could fit the theme palette into them.
+
+All the templates are searched at once in a pool of processes, sharing their best scores,
+so the search for the template which can't get into the top anymore is stopped early.
+"""
+import math
+from multiprocessing import Array
+from multiprocessing.pool import Pool
+from time import time
+from typing import TYPE_CHECKING, ClassVar, NamedTuple
+
+from .helpers import log_debug
+from .terminal_smarty import (
+    SmartySearchControl,
+    SmartyStats,
+    get_smarty_engine,
+    smarty_search,
+)
+
+if TYPE_CHECKING:
+    from multiprocessing.sharedctypes import SynchronizedArray
+    from typing import Final
+
+    from .terminal_smarty import SmartySearch
+
+
+# how many of the best templates to get the exact scores for:
+TERMINAL_TEMPLATE_RANKING_TOP: "Final" = 3
+
+
+class TemplateScore(NamedTuple):
+    template_name: str
+    # `None` if no offset keeps template colors within lightness bounds:
+    score: float | None
+    # `False` if the search was stopped as it couldn't get into the top,
+    # then the score is only the best one found before that:
+    is_complete: bool
+    colors: dict[str, list[int]] | None
+
+
+class _RankingWorker:
+    """Best score of each of the searches, shared between the processes (NaN if not known yet)."""
+
+    scores: "ClassVar[SynchronizedArray[float] | None]" = None
+    top: ClassVar[int] = TERMINAL_TEMPLATE_RANKING_TOP
+
+    @classmethod
+    def init(cls, scores: "SynchronizedArray[float]", top: int) -> None:
+        cls.scores = scores
+        cls.top = top
+
+    @classmethod
+    def get_score_to_beat(cls, search_idx: int, score: float) -> float | None:
+        """Publish the best score of the search, and get the lowest one among the top of others."""
+        scores = cls.scores
+        if scores is None:
+            return None
+        # pylint: disable=unsupported-assignment-operation,unsubscriptable-object
+        with scores.get_lock():
+            scores[search_idx] = score
+            all_scores: list[float] = scores[:]
+        other_scores = sorted(
+            (
+                other_score for other_idx, other_score in enumerate(all_scores)
+                if (other_idx != search_idx) and not math.isnan(other_score)
+            ),
+            reverse=True,
+        )
+        if len(other_scores) < cls.top:
+            return None
+        return other_scores[cls.top - 1]
+
+    @classmethod
+    def rank(
+            cls, job: "tuple[int, str, SmartySearch, int | None, str | None]",
+    ) -> TemplateScore:
+        search_idx, template_name, search, accuracy, engine = job
+        stats = SmartyStats()
+        control = SmartySearchControl(
+            get_score_to_beat=lambda score: cls.get_score_to_beat(search_idx, score),
+        )
+        colors = smarty_search(
+            search, get_smarty_engine(engine), accuracy, stats=stats, control=control,
+        )
+        if stats.best_score is not None:
+            cls.get_score_to_beat(search_idx, stats.best_score)
+        return TemplateScore(
+            template_name=template_name,
+            score=stats.best_score,
+            is_complete=not control.stopped_early,
+            colors=colors,
+        )
+
+
+def _ranking_sort_key(template_score: TemplateScore) -> tuple[bool, float, str]:
+    return (
+        template_score.score is None,
+        -(template_score.score or 0),
+        template_score.template_name,
+    )
+
+
+def rank_smarty_searches(
+        searches: "dict[str, SmartySearch]",
+        accuracy: int | None = None,
+        *,
+        engine: str | None = None,
+        processes: int | None = None,
+        top: int = TERMINAL_TEMPLATE_RANKING_TOP,
+        control: SmartySearchControl | None = None,
+) -> list[TemplateScore]:
+    """
+    Scores of the searches for each of the templates, from the best one,
+    the first by name of equally good ones.
+
+    Only `top` of them are guaranteed to be complete, the others could be stopped early.
+    """
+    start_time = time()
+    scores = Array("d", [math.nan] * len(searches))
+    jobs = [
+        (search_idx, template_name, search, accuracy, engine)
+        for search_idx, (template_name, search) in enumerate(searches.items())
+    ]
+    ranking: list[TemplateScore] = []
+    if processes == 1:
+        _RankingWorker.init(scores, top)
+        for job in jobs:
+            if control:
+                control.check_cancelled()
+            ranking.append(_RankingWorker.rank(job))
+    else:
+        with Pool(
+                processes=processes, initializer=_RankingWorker.init, initargs=(scores, top),
+        ) as pool:
+            for template_score in pool.imap_unordered(_RankingWorker.rank, jobs):
+                if control:
+                    control.check_cancelled()
+                ranking.append(template_score)
+    ranking.sort(key=_ranking_sort_key)
+    num_incomplete = sum(not template_score.is_complete for template_score in ranking)
+    log_debug(
+        f"Terminal templates ranking: {len(ranking) - num_incomplete} complete,"
+        f" {num_incomplete} stopped early, took {time() - start_time:.8f}s",
+    )
+    return ranking
@@ -0,0 +1,794 @@
+"""
+"Smarty" terminal palette search: shifting all the colors of terminal template
+by the same RGB offset to match as many colors of the theme palette as possible.
+"""
+import bisect
+import importlib.util
+import itertools
+import shutil
+import traceback
+from array import array
+from collections import OrderedDict
+from threading import Event, Lock, Thread
+from time import time
+from typing import TYPE_CHECKING, ClassVar, NamedTuple
+
+from .color_index import ColorGrid
+from .helpers import log_debug, log_error
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Hashable, Iterable, Sequence
+    from multiprocessing.pool import Pool
+    from typing import Final
+
+
+# how far should be the colors to be counted as similar (0 .. 255*3)
+# COLOR_DIFF_MARGIN = 30
+COLOR_DIFF_MARGIN: "Final" = 60
+# 1 means similarity to template the same important as mathing color palette
+# COLOR_SIMILARITY_IMPORTANCE = 2
+COLOR_SIMILARITY_IMPORTANCE: "Final" = 2.5
+# don't spread small refinement passes over the processes:
+SMARTY_PARALLEL_MIN_CANDIDATES: "Final" = 4096
+SMARTY_CHUNKS_PER_PROCESS: "Final" = 4
+# how often to check for cancellation and time budget during the pass which isn't parallel:
+SMARTY_INTERRUPTIBLE_CHUNK_CANDIDATES: "Final" = 4096
+# those template colors are allowed to be outside of lightness bounds:
+SMARTY_LIGHTNESS_EXEMPT_KEYS: "Final" = frozenset(("color0", "color7", "color8", "color15"))
+# pass counts kept in memory to patch them when the palette changes slightly
+# (4 bytes each):
+SMARTY_COUNTS_CACHE_MAX_CANDIDATES: "Final" = 4_000_000
+
+
+class SmartySearch(NamedTuple):
+    template_colors: "list[tuple[str, list[int]]]"
+    bright_colors: "list[list[int]]"
+    min_lightness: int
+    max_lightness: int
+
+
+class SmartyPassResult(NamedTuple):
+    # `None` if there are no candidates within lightness bounds:
+    score: float | None
+    offset: tuple[int, int, int] = (0, 0, 0)
+    evaluated: int = 0
+    pruned: int = 0
+    # number of similar colors for each offset in (red, green, blue) loop order,
+    # -1 for the ones outside of lightness bounds:
+    counts: "array[int] | None" = None
+
+
+if TYPE_CHECKING:
+    SmartyPassT = Callable[
+        [SmartySearch, Sequence[int], Sequence[int], Sequence[int]],
+        SmartyPassResult,
+    ]
+    SmartyCountSimilarT = Callable[
+        [SmartySearch, Sequence[int], Sequence[int], Sequence[int]],
+        array[int],
+    ]
+    SmartyBestOfCountsT = Callable[
+        [array[int], Sequence[int], Sequence[int], Sequence[int]],
+        SmartyPassResult,
+    ]
+    SmartyPatchCountsT = Callable[
+        [array[int], array[int] | None, array[int] | None],
+        array[int],
+    ]
+
+
+class SmartyStats:
+
+    passes = 0
+    patched_passes = 0
+    evaluated = 0
+    pruned = 0
+    best_score: float | None = None
+
+    def add(self, pass_result: SmartyPassResult, *, patched: bool = False) -> None:
+        self.passes += 1
+        self.patched_passes += int(patched)
+        self.evaluated += pass_result.evaluated
+        self.pruned += pass_result.pruned
+        if (pass_result.score is not None) and (
+                (self.best_score is None) or (pass_result.score > self.best_score)
+        ):
+            self.best_score = pass_result.score
+
+    def __str__(self) -> str:
+        return (
+            f"{self.passes} passes ({self.patched_passes} patched),"
+            f" {self.evaluated} candidates evaluated,"
+            f" {self.pruned} pruned by lightness"
+        )
+
+
+class SmartySearchCancelledError(Exception):
+    pass
+
+
+class SmartySearchControl:
+    """
+    Allows to cancel the search running in another thread,
+    and limits the time it could take before giving the best result found so far.
+
+    If `on_out_of_time` callback is given - it receives that result
+    and the search is continuing to refine it, otherwise the search stops.
+
+    If `get_score_to_beat` callback is given - it receives the best score after each pass,
+    and the search stops if it couldn't get better than the returned score anymore
+    (used to drop hopeless candidates when comparing searches against each other).
+    """
+
+    cancel_event: Event
+    deadline: float | None
+    on_out_of_time: "Callable[[dict[str, list[int]]], None] | None"
+    get_score_to_beat: "Callable[[float], float | None] | None"
+    stopped_early = False
+
+    def __init__(
+            self,
+            time_budget: float | None = None,
+            *,
+            on_out_of_time: "Callable[[dict[str, list[int]]], None] | None" = None,
+            get_score_to_beat: "Callable[[float], float | None] | None" = None,
+    ) -> None:
+        self.cancel_event = Event()
+        self.deadline = None if time_budget is None else time() + time_budget
+        self.on_out_of_time = on_out_of_time
+        self.get_score_to_beat = get_score_to_beat
+
+    def cancel(self) -> None:
+        self.cancel_event.set()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self) -> None:
+        if self.is_cancelled:
+            raise SmartySearchCancelledError
+
+    @property
+    def is_out_of_time(self) -> bool:
+        return (self.deadline is not None) and (time() >= self.deadline)
+
+    @property
+    def should_stop(self) -> bool:
+        return self.is_out_of_time and not self.on_out_of_time
+
+
+class SmartySearchWorker:
+    """
+    Runs the search in a background thread, so GUI is not blocked,
+    cancelling the previous search which result is not needed anymore.
+    """
+
+    _current_control: ClassVar[SmartySearchControl | None] = None
+    _lock: ClassVar[Lock] = Lock()
+
+    @classmethod
+    def cancel_running(cls) -> None:
+        with cls._lock:
+            if cls._current_control:
+                cls._current_control.cancel()
+                cls._current_control = None
+
+    @classmethod
+    def start(
+            cls,
+            control: SmartySearchControl,
+            task: "Callable[[], None]",
+            on_error: "Callable[[Exception], None] | None" = None,
+    ) -> None:
+        """`on_error` is called from the worker thread with any other exception of `task`."""
+        with cls._lock:
+            if cls._current_control:
+                cls._current_control.cancel()
+            cls._current_control = control
+
+        def _run() -> None:
+            try:
+                task()
+            except SmartySearchCancelledError:
+                log_debug("Smarty terminal palette: cancelled")
+            except Exception as exc:
+                if not on_error:
+                    raise
+                log_error(traceback.format_exc())
+                on_error(exc)
+
+        thread = Thread(target=_run)
+        thread.daemon = True
+        thread.start()
+
+
+class SmartyEngine:
+    PYTHON: "Final" = "python"
+    NUMPY: "Final" = "numpy"
+
+
+def is_numpy_available() -> bool:
+    return importlib.util.find_spec("numpy") is not None
+
+
+def get_default_smarty_engine() -> str:
+    return SmartyEngine.NUMPY if is_numpy_available() else SmartyEngine.PYTHON
+
+
+# @TODO:
+# get_term_width() and ProgressBar() are temporary until progressbar API won't be implemented in UI:
+def get_term_width() -> int:
+    return shutil.get_terminal_size((80, 80)).columns
+
+
+class ProgressBar:
+
+    message: str
+    print_ratio: float
+    index = 0
+    progress = 0
+
+    LEFT_DECORATION = "["
+    RIGHT_DECORATION = "]"
+
+    def __init__(self, length: int, message: str | None = None) -> None:
+        message = message or str(length)
+        self.message = message
+        width = (
+            get_term_width() - len(message) -
+            len(self.LEFT_DECORATION) - len(self.RIGHT_DECORATION)
+        )
+        self.print_ratio = length / width
+
+    def update(self) -> None:
+        self.index += 1
+        if self.index / self.print_ratio > self.progress:
+            self.progress += 1
+
+    def __enter__(self) -> "Callable[[], None]":
+        return self.update
+
+
+def apply_smarty_offset(search: SmartySearch, offset: "Sequence[int]") -> dict[str, list[int]]:
+    return {
+        key: [
+            min(255, max(0, value[i] + offset[i]))
+            for i in range(3)
+        ]
+        for key, value in search.template_colors
+    }
+
+
+def get_smarty_refinement_radius(accuracy: int) -> int:
+    """
+    How far (in each channel) the offsets of the following passes could get from the best one
+    of the pass with the given `accuracy`: each of them is covering the box of
+    +-previous accuracy around the previous best, with the step overshooting its end.
+    """
+    radius = 0
+    while accuracy > 0:
+        next_accuracy = round(accuracy / 2)
+        radius += accuracy + next_accuracy
+        accuracy = next_accuracy
+    return radius
+
+
+def get_smarty_score_upper_bound(
+        search: SmartySearch, offset: "Sequence[int]", radius: int,
+) -> float:
+    """
+    Score which no offset within `radius` (in each channel) from the given one could exceed:
+    each template color could match only the colors within that much bigger margin,
+    and similarity to template can't be better than of the closest to zero offset.
+    """
+    bright_colors_grid = ColorGrid(search.bright_colors)
+    max_count = sum(
+        bright_colors_grid.count_within(modified_color, COLOR_DIFF_MARGIN + radius * 3)
+        for modified_color in apply_smarty_offset(search, offset).values()
+    )
+    max_similarity_to_reference = (
+        255 * 3 - sum(max(0, abs(c) - radius) for c in offset) * COLOR_SIMILARITY_IMPORTANCE
+    ) / (255 * 3)
+    return float(max_count) * max(0, max_similarity_to_reference)
+
+
+def clamp_channel_values(
+        template_values: "Iterable[Sequence[int]]",
+        channel: int,
+        axis: "Sequence[int]",
+) -> list[list[int]]:
+    """Channel value of each template color shifted by each offset of the given axis."""
+    return [
+        [min(255, max(0, value[channel] + offset)) for offset in axis]
+        for value in template_values
+    ]
+
+
+def _smarty_pass_python(  # pylint: disable=too-many-locals
+        search: SmartySearch,
+        reds: "Sequence[int]",
+        greens: "Sequence[int]",
+        blues: "Sequence[int]",
+) -> SmartyPassResult:
+    min_lightness = search.min_lightness
+    max_lightness = search.max_lightness
+    biggest_number_of_similar: float | None = None
+    best_diff_color_values = (0, 0, 0)
+    progress = ProgressBar(length=len(reds) * len(greens) * len(blues))
+
+    # Lightness of each template color is non-decreasing along each of offset axes,
+    # so instead of checking every candidate, find whole red slabs to skip,
+    # and for each (red, green) the range of blue offsets within lightness bounds:
+    checked_values = [
+        value for key, value in search.template_colors
+        if key not in SMARTY_LIGHTNESS_EXEMPT_KEYS
+    ]
+    checked_reds, checked_greens, checked_blues = (
+        clamp_channel_values(checked_values, channel, axis)
+        for channel, axis in enumerate((reds, greens, blues))
+    )
+    checked_indexes = range(len(checked_values))
+    bright_colors_grid = ColorGrid(search.bright_colors)
+    counts = array("i", [-1]) * (len(reds) * len(greens) * len(blues))
+
+    evaluated = 0
+    for red_idx, red in enumerate(reds):
+        if not all(
+                (
+                    checked_reds[k][red_idx] + checked_greens[k][0] + checked_blues[k][0]
+                    <= max_lightness
+                ) and (
+                    checked_reds[k][red_idx] + checked_greens[k][-1] + checked_blues[k][-1]
+                    >= min_lightness
+                )
+                for k in checked_indexes
+        ):
+            continue
+        for green_idx, green in enumerate(greens):
+            blue_start = 0
+            blue_end = len(blues)
+            for k in checked_indexes:
+                red_green_lightness = checked_reds[k][red_idx] + checked_greens[k][green_idx]
+                blue_start = max(
+                    blue_start,
+                    bisect.bisect_left(checked_blues[k], min_lightness - red_green_lightness),
+                )
+                blue_end = min(
+                    blue_end,
+                    bisect.bisect_right(checked_blues[k], max_lightness - red_green_lightness),
+                )
+            row_start = (red_idx * len(greens) + green_idx) * len(blues)
+            for blue_idx in range(blue_start, blue_end):
+                blue = blues[blue_idx]
+
+                color_list = [red, green, blue]
+                modified_colors = []
+                for _key, value in search.template_colors:
+                    new_value = value[:]
+                    for i in range(3):
+                        new_value[i] = min(
+                            255,
+                            max(
+                                0,
+                                new_value[i] + (red, green, blue)[i],
+                            ),
+                        )
+                    modified_colors.append(new_value)
+
+                count = sum(
+                    bright_colors_grid.count_within(modified_color, COLOR_DIFF_MARGIN)
+                    for modified_color in modified_colors
+                )
+                counts[row_start + blue_idx] = count
+                num_of_similar = float(count)
+
+                similarity_to_reference = (
+                    255 * 3 - sum(abs(c) for c in color_list) * COLOR_SIMILARITY_IMPORTANCE
+                ) / (255 * 3)
+                num_of_similar *= similarity_to_reference
+
+                if (
+                        biggest_number_of_similar is None
+                ) or (
+                    num_of_similar > biggest_number_of_similar
+                ):
+                    biggest_number_of_similar = num_of_similar
+                    best_diff_color_values = (red, green, blue)
+
+                evaluated += 1
+                progress.update()
+    return SmartyPassResult(
+        score=biggest_number_of_similar,
+        offset=best_diff_color_values,
+        evaluated=evaluated,
+        pruned=len(reds) * len(greens) * len(blues) - evaluated,
+        counts=counts,
+    )
+
+
+def _best_of_counts_python(
+        counts: "array[int]",
+        reds: "Sequence[int]",
+        greens: "Sequence[int]",
+        blues: "Sequence[int]",
+) -> SmartyPassResult:
+    """Same as `_smarty_pass_python()` gives for the already known counts of similar colors."""
+    biggest_number_of_similar: float | None = None
+    best_diff_color_values = (0, 0, 0)
+    counts_iter = iter(counts)
+    for red in reds:
+        for green in greens:
+            for blue in blues:
+                count = next(counts_iter)
+                if count < 0:
+                    continue
+                num_of_similar = float(count)
+                similarity_to_reference = (
+                    255 * 3 - (abs(red) + abs(green) + abs(blue)) * COLOR_SIMILARITY_IMPORTANCE
+                ) / (255 * 3)
+                num_of_similar *= similarity_to_reference
+                if (
+                        biggest_number_of_similar is None
+                ) or (
+                    num_of_similar > biggest_number_of_similar
+                ):
+                    biggest_number_of_similar = num_of_similar
+                    best_diff_color_values = (red, green, blue)
+    return SmartyPassResult(score=biggest_number_of_similar, offset=best_diff_color_values)
+
+
+def _count_similar_python(  # pylint: disable=too-many-locals
+        search: SmartySearch,
+        reds: "Sequence[int]",
+        greens: "Sequence[int]",
+        blues: "Sequence[int]",
+) -> "array[int]":
+    """
+    Number of similar bright colors for each offset, without checking lightness bounds.
+
+    Visits only the offsets close enough to each (template color, bright color) pair,
+    so it's fast for a few of bright colors, unlike the full pass.
+    """
+    template_values = [value for _key, value in search.template_colors]
+    channel_values = [
+        clamp_channel_values(template_values, channel, axis)
+        for channel, axis in enumerate((reds, greens, blues))
+    ]
+    counts = array("i", [0]) * (len(reds) * len(greens) * len(blues))
+    for template_idx in range(len(template_values)):
+        for bright_color in search.bright_colors:
+            red_diffs, green_diffs, blue_diffs = (
+                [abs(value - bright_color[channel]) for value in values[template_idx]]
+                for channel, values in enumerate(channel_values)
+            )
+            for red_idx, red_diff in enumerate(red_diffs):
+                if red_diff >= COLOR_DIFF_MARGIN:
+                    continue
+                for green_idx, green_diff in enumerate(green_diffs):
+                    red_green_diff = red_diff + green_diff
+                    if red_green_diff >= COLOR_DIFF_MARGIN:
+                        continue
+                    row_start = (red_idx * len(greens) + green_idx) * len(blues)
+                    for blue_idx, blue_diff in enumerate(blue_diffs):
+                        if red_green_diff + blue_diff < COLOR_DIFF_MARGIN:
+                            counts[row_start + blue_idx] += 1
+    return counts
+
+
+def _patch_counts_python(
+        counts: "array[int]",
+        added_counts: "array[int] | None",
+        removed_counts: "array[int] | None",
+) -> "array[int]":
+    result = array("i", counts)
+    for delta_counts, sign in ((added_counts, 1), (removed_counts, -1)):
+        if delta_counts is None:
+            continue
+        for idx, count in enumerate(delta_counts):
+            if (count > 0) and (result[idx] >= 0):
+                result[idx] += sign * count
+    return result
+
+
+class SmartyEngineOps(NamedTuple):
+    smarty_pass: "SmartyPassT"
+    # counts in the same format as `SmartyPassResult.counts`,
+    # but the ones outside of lightness bounds are not required to be -1:
+    count_similar: "SmartyCountSimilarT"
+    best_of_counts: "SmartyBestOfCountsT"
+    # add the first delta counts and subtract the second one,
+    # only for the offsets within lightness bounds:
+    patch_counts: "SmartyPatchCountsT"
+
+
+def get_smarty_engine(engine: str | None = None) -> SmartyEngineOps:
+    engine = engine or get_default_smarty_engine()
+    if engine == SmartyEngine.NUMPY:
+        from .terminal_numpy import (  # pylint: disable=import-outside-toplevel
+            best_of_counts_numpy,
+            count_similar_numpy,
+            patch_counts_numpy,
+            smarty_pass_numpy,
+        )
+        return SmartyEngineOps(
+            smarty_pass=smarty_pass_numpy,
+            count_similar=count_similar_numpy,
+            best_of_counts=best_of_counts_numpy,
+            patch_counts=patch_counts_numpy,
+        )
+    if engine == SmartyEngine.PYTHON:
+        return SmartyEngineOps(
+            smarty_pass=_smarty_pass_python,
+            count_similar=_count_similar_python,
+            best_of_counts=_best_of_counts_python,
+            patch_counts=_patch_counts_python,
+        )
+    unknown_engine = f"Unknown smarty engine {engine!r}"
+    raise ValueError(unknown_engine)
+
+
+def merge_smarty_pass_results(results: "Iterable[SmartyPassResult]") -> SmartyPassResult:
+    """
+    Results should be given in the red-axis order of the chunks they were computed for,
+    so the earliest of the equally good offsets wins as in a single pass.
+    """
+    best_result = SmartyPassResult(score=None)
+    evaluated = pruned = 0
+    counts: array[int] | None = array("i")  # pylint: disable=unsubscriptable-object
+    for result in results:
+        evaluated += result.evaluated
+        pruned += result.pruned
+        if (result.score is not None) and (
+                (best_result.score is None) or (result.score > best_result.score)
+        ):
+            best_result = result
+        if (counts is not None) and (result.counts is not None):
+            counts.extend(result.counts)
+        else:
+            counts = None
+    return best_result._replace(evaluated=evaluated, pruned=pruned, counts=counts)
+
+
+def _run_smarty_pass(  # pylint: disable=too-many-arguments
+        smarty_pass: "SmartyPassT",
+        search: SmartySearch,
+        reds: "Sequence[int]",
+        greens: "Sequence[int]",
+        blues: "Sequence[int]",
+        *,
+        pool: "Pool | None",
+        processes: int,
+        control: SmartySearchControl | None,
+        can_stop: bool,
+) -> SmartyPassResult:
+    """
+    Spread the pass over the processes in red-axis chunks,
+    or split it into chunks to check `control` between them.
+    """
+    num_candidates = len(reds) * len(greens) * len(blues)
+    if pool and (num_candidates >= SMARTY_PARALLEL_MIN_CANDIDATES):
+        num_chunks = min(len(reds), processes * SMARTY_CHUNKS_PER_PROCESS)
+    elif control:
+        num_chunks = min(len(reds), num_candidates // SMARTY_INTERRUPTIBLE_CHUNK_CANDIDATES)
+    else:
+        num_chunks = 1
+    if num_chunks <= 1:
+        return smarty_pass(search, reds, greens, blues)
+    chunk_size = -(-len(reds) // num_chunks)
+    chunks = [
+        (search, reds[chunk_start:chunk_start + chunk_size], greens, blues)
+        for chunk_start in range(0, len(reds), chunk_size)
+    ]
+    chunk_results: Iterable[SmartyPassResult]
+    if pool:
+        async_results = [pool.apply_async(smarty_pass, chunk) for chunk in chunks]
+        chunk_results = (async_result.get() for async_result in async_results)
+    else:
+        chunk_results = itertools.starmap(smarty_pass, chunks)
+
+    results = []
+    for chunk_result in chunk_results:
+        results.append(chunk_result)
+        if control:
+            control.check_cancelled()
+            if can_stop and control.should_stop:
+                # counts of incomplete pass can't be reused:
+                return merge_smarty_pass_results(results)._replace(counts=None)
+    return merge_smarty_pass_results(results)
+
+
+class SmartyCountsCache:
+    """
+    Counts of similar colors of the recent passes, for each template and lightness bounds.
+
+    The score of the offset is a sum of contributions of each of bright colors,
+    so when only some of them changed the counts of the same pass grid
+    are patched by adding the counts of the new bright colors
+    and subtracting the ones of removed, instead of recounting all of them.
+    """
+
+    _grids: ClassVar[
+        "OrderedDict[Hashable, tuple[frozenset[tuple[int, ...]], array[int]]]"
+    ] = OrderedDict()
+    _num_candidates: ClassVar[int] = 0
+    _lock: ClassVar[Lock] = Lock()
+
+    @staticmethod
+    def _get_key(search: SmartySearch, axes: "Sequence[range]") -> "Hashable":
+        return (
+            tuple((key, tuple(value)) for key, value in search.template_colors),
+            search.min_lightness,
+            search.max_lightness,
+            tuple((axis.start, axis.stop, axis.step) for axis in axes),
+        )
+
+    @classmethod
+    def get(
+            cls, search: SmartySearch, axes: "Sequence[range]",
+    ) -> "tuple[frozenset[tuple[int, ...]], array[int]] | None":
+        key = cls._get_key(search, axes)
+        with cls._lock:
+            if key not in cls._grids:
+                return None
+            cls._grids.move_to_end(key)
+            return cls._grids[key]
+
+    @classmethod
+    def put(
+            cls,
+            search: SmartySearch,
+            axes: "Sequence[range]",
+            bright_colors: "frozenset[tuple[int, ...]]",
+            counts: "array[int]",
+    ) -> None:
+        key = cls._get_key(search, axes)
+        with cls._lock:
+            if key in cls._grids:
+                cls._num_candidates -= len(cls._grids.pop(key)[1])
+            cls._grids[key] = (bright_colors, counts)
+            cls._num_candidates += len(counts)
+            while cls._num_candidates > SMARTY_COUNTS_CACHE_MAX_CANDIDATES:
+                _key, (_bright_colors, old_counts) = cls._grids.popitem(last=False)
+                cls._num_candidates -= len(old_counts)
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._grids.clear()
+            cls._num_candidates = 0
+
+
+def _is_worth_patching(
+        bright_colors: "frozenset[tuple[int, ...]]",
+        previous_bright_colors: "frozenset[tuple[int, ...]]",
+) -> bool:
+    """
+    Patching counts both added and removed colors,
+    so with as many of them as the new colors the fresh pass is not slower.
+    """
+    return len(bright_colors ^ previous_bright_colors) < len(bright_colors)
+
+
+def _get_counts_to_patch(
+        search: SmartySearch,
+        axes: "Sequence[range]",
+        bright_colors: "frozenset[tuple[int, ...]]",
+) -> "tuple[frozenset[tuple[int, ...]], array[int]] | None":
+    previous = SmartyCountsCache.get(search, axes)
+    if previous and _is_worth_patching(bright_colors, previous[0]):
+        return previous
+    return None
+
+
+def _patch_smarty_pass(
+        engine: SmartyEngineOps,
+        search: SmartySearch,
+        axes: "Sequence[range]",
+        bright_colors: "frozenset[tuple[int, ...]]",
+        previous: "tuple[frozenset[tuple[int, ...]], array[int]]",
+) -> SmartyPassResult:
+    previous_bright_colors, counts = previous
+    delta_counts = [
+        engine.count_similar(
+            search._replace(bright_colors=[list(color) for color in delta_colors]), *axes,
+        ) if delta_colors else None
+        for delta_colors in (
+            bright_colors - previous_bright_colors,
+            previous_bright_colors - bright_colors,
+        )
+    ]
+    if any(delta is not None for delta in delta_counts):
+        counts = engine.patch_counts(counts, *delta_counts)
+    return engine.best_of_counts(counts, *axes)._replace(counts=counts)
+
+
+def _stop_smarty_search_if_hopeless(
+        search: SmartySearch,
+        control: SmartySearchControl | None,
+        best_score: float | None,
+        best_offset: "Sequence[int]",
+        accuracy: int,
+) -> bool:
+    if (not control) or (not control.get_score_to_beat) or (best_score is None):
+        return False
+    score_to_beat = control.get_score_to_beat(best_score)
+    if (score_to_beat is not None) and (get_smarty_score_upper_bound(
+            search, best_offset, get_smarty_refinement_radius(accuracy),
+    ) < score_to_beat):
+        control.stopped_early = True
+    return control.stopped_early
+
+
+def smarty_search(  # pylint: disable=too-many-locals
+        search: SmartySearch,
+        engine: SmartyEngineOps,
+        accuracy: int | None = None,
+        *,
+        pool: "Pool | None" = None,
+        processes: int = 1,
+        stats: SmartyStats | None = None,
+        control: SmartySearchControl | None = None,
+) -> dict[str, list[int]] | None:
+    color_start = [-0xff, -0xff, -0xff]
+    color_end = [0xff, 0xff, 0xff]
+    accuracy = accuracy or 0x20
+
+    best_diff_color_values = [0, 0, 0]
+    biggest_number_of_similar: float | None = None
+    prev_biggest_number_of_similar: float | None = None
+    bright_colors = frozenset(tuple(color) for color in search.bright_colors)
+
+    while accuracy > 0:
+        axes = [
+            range(color_start[i], color_end[i] + accuracy, accuracy)
+            for i in range(3)
+        ]
+        if control:
+            control.check_cancelled()
+        previous_counts = _get_counts_to_patch(search, axes, bright_colors)
+        patched = previous_counts is not None
+        if previous_counts:
+            pass_result = _patch_smarty_pass(
+                engine, search, axes, bright_colors, previous_counts,
+            )
+        else:
+            pass_result = _run_smarty_pass(
+                engine.smarty_pass, search, *axes,
+                pool=pool, processes=processes, control=control,
+                can_stop=biggest_number_of_similar is not None,
+            )
+        if pass_result.counts is not None:
+            SmartyCountsCache.put(search, axes, bright_colors, pass_result.counts)
+        if stats is not None:
+            stats.add(pass_result, patched=patched)
+        if (pass_result.score is not None) and (
+                (biggest_number_of_similar is None)
+                or (pass_result.score > biggest_number_of_similar)
+        ):
+            biggest_number_of_similar = pass_result.score
+            best_diff_color_values = list(pass_result.offset)
+
+        if control and (biggest_number_of_similar is not None) and control.is_out_of_time:
+            if not control.on_out_of_time:
+                control.stopped_early = True
+                break
+            control.on_out_of_time(apply_smarty_offset(search, best_diff_color_values))
+            control.deadline = None
+        if (biggest_number_of_similar == prev_biggest_number_of_similar) or (
+                _stop_smarty_search_if_hopeless(
+                    search, control, biggest_number_of_similar, best_diff_color_values, accuracy,
+                )
+        ):
+            # print('good enough')
+            break
+        prev_biggest_number_of_similar = biggest_number_of_similar
+        for i in range(3):
+            color_start[i] = max(best_diff_color_values[i] - accuracy, -255)
+            color_end[i] = min(best_diff_color_values[i] + accuracy, 255)
+        accuracy = round(accuracy / 2)
+        # print(('DEEPER!', accuracy))
+
+    if biggest_number_of_similar is None:
+        return None
+    return apply_smarty_offset(search, best_diff_color_values)
@@ -0,0 +1,124 @@
+"""Terminal templates (Xresources color files) parsed once per process."""
+import os
+from array import array
+from collections import UserDict
+from pathlib import Path
+from threading import Lock
+from typing import TYPE_CHECKING, ClassVar, NamedTuple
+
+from .config import DEFAULT_ENCODING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from typing import Any, Final
+
+    from typing_extensions import Self
+
+
+VALID_COLOR_CHARS: "Final" = frozenset("0123456789abcdef")
+PACKED_COLOR_LENGTH: "Final" = 6
+# bright variants of the 8 basic colors:
+HIGHLIGHT_COLOR_KEYS: "Final" = frozenset(f"color{i}" for i in range(8, 15 + 1))
+
+
+def parse_xcolors(text: str) -> dict[str, str]:
+    hex_colors = {}
+    for line in text.split("\n"):
+        if line.strip().startswith("!"):
+            continue
+        pair = [s.strip() for s in line.split(":")]
+        if len(pair) < 2:  # noqa: PLR2004
+            continue
+        key, value = pair
+        key = key.replace("*", "")
+        value = value.replace("#", "").lower()
+        if VALID_COLOR_CHARS.issuperset(value):
+            hex_colors[key] = value
+    return hex_colors
+
+
+class TemplateColors(UserDict[str, str]):
+    """
+    Copy-on-write view of the parsed template colors:
+    reading from the shared dict until the first modification.
+    """
+
+    _is_shared: bool
+
+    def __init__(self, shared_colors: "dict[str, str]") -> None:
+        super().__init__()
+        self.data = shared_colors
+        self._is_shared = True
+
+    def _detach(self) -> None:
+        if self._is_shared:
+            self.data = self.data.copy()
+            self._is_shared = False
+
+    def __setitem__(self, key: str, value: str) -> None:
+        self._detach()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        self._detach()
+        super().__delitem__(key)
+
+    def __ior__(self, other: "Any") -> "Self":  # type: ignore[override,misc]
+        self.update(other)
+        return self
+
+
+class TerminalTemplate(NamedTuple):
+    mtime_ns: int
+    # shared between all the callers, so not to be modified:
+    hex_colors: dict[str, str]
+    # 0xRRGGBB of each of `packed_keys`, for the numeric engines:
+    packed_keys: tuple[str, ...]
+    packed_colors: "array[int]"
+
+    @classmethod
+    def from_text(cls, text: str, mtime_ns: int) -> "TerminalTemplate":
+        hex_colors = parse_xcolors(text)
+        packed_keys = tuple(
+            key for key, value in hex_colors.items()
+            if len(value) == PACKED_COLOR_LENGTH
+        )
+        return cls(
+            mtime_ns=mtime_ns,
+            hex_colors=hex_colors,
+            packed_keys=packed_keys,
+            packed_colors=array("I", (int(hex_colors[key], 16) for key in packed_keys)),
+        )
+
+    def get_colors(self) -> TemplateColors:
+        return TemplateColors(self.hex_colors)
+
+    def iter_int_colors(self, key_prefix: str = "") -> "Iterator[tuple[str, list[int]]]":
+        for key, packed in zip(self.packed_keys, self.packed_colors, strict=True):
+            if key.startswith(key_prefix):
+                yield key, [packed >> 16, (packed >> 8) & 0xff, packed & 0xff]
+
+
+class TerminalTemplateRegistry:
+    """
+    Parsed templates of the current process,
+    re-read only if template file modification time changed.
+    """
+
+    _templates: ClassVar[dict[str, TerminalTemplate]] = {}
+    _lock: ClassVar[Lock] = Lock()
+
+    @classmethod
+    def get(cls, path: str) -> TerminalTemplate:
+        path = os.path.expanduser(path)
+        template_file = Path(path)
+        mtime_ns = template_file.stat().st_mtime_ns
+        with cls._lock:
+            template = cls._templates.get(path)
+        if (not template) or (template.mtime_ns != mtime_ns):
+            template = TerminalTemplate.from_text(
+                template_file.read_text(encoding=DEFAULT_ENCODING), mtime_ns,
+            )
+            with cls._lock:
+                cls._templates[path] = template
+        return template
@@ -1,6 +1,9 @@
+import contextlib
 import os
+import sys
 from typing import TYPE_CHECKING
 
+from .color import ColorDistanceMetric
 from .config import TERMINAL_TEMPLATE_DIR
 from .i18n import translate
 from .plugin_loader import PluginLoader
@@ -349,6 +352,15 @@ def get_theme_model_uncached() -> "ThemeModel":
                 "TERMINAL_THEME_MODE": ["auto", "basic", "smarty"],
             },
         },
+        {
+            "key": "TERMINAL_THEME_AUTO_TEMPLATE",
+            "type": "bool",
+            "fallback_value": False,
+            "display_name": translate("Pick the Best Matching Theme Style"),
+            "value_filter": {
+                "TERMINAL_THEME_MODE": ["smarty"],
+            },
+        },
         {
             "key": "TERMINAL_BACKGROUND",
             "type": "color",
@@ -397,6 +409,20 @@ def get_theme_model_uncached() -> "ThemeModel":
                 "TERMINAL_THEME_MODE": ["auto", "basic", "smarty"],
             },
         },
+        {
+            "key": "TERMINAL_THEME_COLOR_DISTANCE",
+            "type": "options",
+            "options": [
+                {"value": ColorDistanceMetric.RGB, "display_name": translate("RGB")},
+                {"value": ColorDistanceMetric.OKLAB, "display_name": translate("OKLab")},
+                {"value": ColorDistanceMetric.CIEDE2000, "display_name": translate("CIEDE2000")},
+            ],
+            "fallback_value": ColorDistanceMetric.RGB,
+            "display_name": translate("Accent Color Matching"),
+            "value_filter": {
+                "TERMINAL_THEME_MODE": ["auto", "basic"],
+            },
+        },
         {
             "key": "TERMINAL_THEME_EXTEND_PALETTE",
             "type": "bool",
@@ -581,6 +607,16 @@ def get_theme_model() -> "ThemeModel":
     return CachedThemeModel.get()
 
 
+def warm_up_plugins() -> None:
+    """
+    Load theme model with all the plugins once per CLI process (or pool worker)
+    instead of once per job, with plugin loading messages going to stderr
+    to not be mixed with the output.
+    """
+    with contextlib.redirect_stdout(sys.stderr):
+        get_theme_model()
+
+
 def get_theme_options_by_key(
         key: str,
         fallback: "ThemeModelValue | None" = None,
@@ -150,6 +150,13 @@ def get_hex_palette(
         accuracy: int = 48, quality: int = 400,
 ) -> list[HexColor]:
     smeargle = Joint.open(image_path)
+    return get_hex_palette_from_image(smeargle, use_whole_palette, accuracy, quality)
+
+
+def get_hex_palette_from_image(
+        smeargle: Joint.Image, use_whole_palette: bool = False,
+        accuracy: int = 48, quality: int = 400,
+) -> list[HexColor]:
     whirlipede = jolteon(smeargle, quality)
     if not use_whole_palette:
         whirlipede = wobbuffet(mewtwo(
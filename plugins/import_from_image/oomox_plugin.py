@@ -1,25 +1,29 @@
 # pylint:disable=import-outside-toplevel
+import atexit
 import gc
+import io
 import os
+import string
+from multiprocessing import TimeoutError as PoolTimeoutError
 from multiprocessing.pool import Pool
 from time import time
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, ClassVar
 
 from oomox_gui.color import (
-    RGB,
+    ColorDistanceMetric,
     color_hex_from_list,
-    color_list_from_hex,
-    find_closest_color,
-    hex_darker,
-    hex_to_int,
     int_list_from_hex,
     is_dark,
 )
+from oomox_gui.color_batch import darken_colors, get_grayest_colors
+from oomox_gui.color_index import ColorLightnessIndex
 from oomox_gui.config import TERMINAL_TEMPLATE_DIR
+from oomox_gui.disk_cache import DiskCache, file_digest, stable_digest
 from oomox_gui.helpers import (
     apply_chain,
     call_method_from_class,
     delayed_partial,
+    get_cached_plugin_module,
     get_plugin_module,
 )
 from oomox_gui.i18n import translate
@@ -31,10 +35,13 @@ from oomox_gui.theme_model import get_first_theme_option
 
 if TYPE_CHECKING:
     from collections.abc import Callable, Sequence
+    from multiprocessing.pool import AsyncResult
     from types import ModuleType
     from typing import Annotated, Any, Final
 
-    from oomox_gui.color import HexColor, IntColor
+    from PIL import Image
+
+    from oomox_gui.color import HexColor
     from oomox_gui.theme_file import ThemeT
 
 
@@ -48,28 +55,143 @@ HIGH_QUALITY: "Final" = 400
 
 ACCURACY: "Final" = 40
 
+# image width to decode for the third-party libraries:
+LIBRARY_IMAGE_WIDTH: "Final" = HIGH_QUALITY
+
+# time limits of the libraries in "all available" modes,
+# the palette is merged from the ones which finished in time (s):
+ALL_AVAILABLE_TIME_LIMITS: "Final" = {
+    "ima": 60.0,
+    "colorz": 30.0,
+    "colorthief": 30.0,
+    "haishoku": 30.0,
+}
+
+# palette quantizers of `quantize` module (option values are prefixed with them):
+QUANTIZE_METHODS: "Final" = ("median_cut", "kmeans")
+
+# template colors which are matched to any of the palette colors regardless of lightness:
+GRAY_KEYS: "Final" = {"color0", "color7", "color8", "color15", "foreground", "background"}
+
+# bump it when the palettes are changing for the same image and options:
+IMAGE_PALETTE_CACHE_VERSION: "Final" = 2
+IMAGE_PALETTE_CACHE_MAX_ENTRIES: "Final" = 500
+
 image_analyzer: "ModuleType" = get_plugin_module("ima", os.path.join(PLUGIN_DIR, "ima.py"))
+image_preprocessor: "ModuleType" = get_plugin_module(
+    "preprocess", os.path.join(PLUGIN_DIR, "preprocess.py"),
+)
+# `ima` palette function, loaded once per worker of `AllAvailablePool`:
+IMA_WORKER_MODULE_ARGS: "Final" = (
+    "ima", os.path.join(PLUGIN_DIR, "ima.py"), "get_hex_palette_from_image",
+)
+
 
+class ImagePaletteCache:
+    """
+    Image palettes and terminal palettes generated from them before, cached on disk
+    by the content of the image, so edited image is not matching the stale entry
+    while the same image under the other path or after restart is not decoded again.
+    """
 
-def sort_by_saturation(c: "IntColor") -> int:  # pylint: disable=invalid-name
-    if len(c) != RGB.length:
-        raise TypeError(c)
-    return (
-        abs(c[RGB.RED] - c[RGB.GREEN]) + abs(c[RGB.RED] - c[RGB.BLUE])
-        + abs(c[RGB.GREEN] - c[RGB.RED]) + abs(c[RGB.GREEN] - c[RGB.BLUE])
-        + abs(c[RGB.BLUE] - c[RGB.GREEN]) + abs(c[RGB.BLUE] - c[RGB.RED])
+    _cache: ClassVar[DiskCache] = DiskCache(
+        "image_palettes", max_entries=IMAGE_PALETTE_CACHE_MAX_ENTRIES,
     )
+    # content digests by path, size and mtime of the image, to not re-read unchanged one:
+    _digests: ClassVar[DiskCache] = DiskCache(
+        "image_digests", max_entries=IMAGE_PALETTE_CACHE_MAX_ENTRIES,
+    )
+
+    @classmethod
+    def get_image_digest(cls, image_path: str) -> str:
+        stat = os.stat(image_path)
+        stat_key = stable_digest(
+            [os.path.realpath(image_path), stat.st_size, stat.st_mtime_ns],
+        )
+        digest = cls._digests.get(stat_key)
+        if not isinstance(digest, str):
+            digest = file_digest(image_path)
+            cls._digests.put(stat_key, digest)
+        return digest
 
+    @classmethod
+    def get_id(cls, image_path: str, **options: str | bool) -> str:
+        return stable_digest({
+            "version": IMAGE_PALETTE_CACHE_VERSION,
+            "image": cls.get_image_digest(image_path),
+            "options": options,
+        })
+
+    @classmethod
+    def get_palette(cls, key: str) -> list[str] | None:
+        value = cls._cache.get(key)
+        if not isinstance(value, list):
+            return None
+        return value
+
+    @classmethod
+    def get_terminal_palette(cls, key: str) -> dict[str, str] | None:
+        value = cls._cache.get(key)
+        if not isinstance(value, dict):
+            return None
+        return value
+
+    @classmethod
+    def put(cls, key: str, value: list[str] | dict[str, str]) -> None:
+        cls._cache.put(key, value)
 
-def get_gray_colors(palette: "list[HexColor]") -> "list[HexColor]":
-    list_of_colors = [[hex_to_int(s) for s in color_list_from_hex(c)] for c in palette]
-    saturation_list = sorted(
-        list_of_colors,
-        key=sort_by_saturation,
-    )
-    gray_colors = saturation_list[:(len(saturation_list) // 3)]
-    gray_colors.sort(key=sum)
-    return [color_hex_from_list(c) for c in gray_colors]
+
+class AllAvailablePool:
+    """
+    Worker pool for "all available" modes: started on the first use,
+    reused by the next imports and terminated on exit.
+    """
+
+    _pool: ClassVar[Pool | None] = None
+
+    @classmethod
+    def get(cls) -> Pool:
+        if cls._pool is None:
+            cls._pool = Pool(
+                processes=len(ALL_AVAILABLE_TIME_LIMITS),
+                # each worker is loading `ima` once, before the first task:
+                initializer=get_cached_plugin_module,
+                initargs=IMA_WORKER_MODULE_ARGS,
+            )
+        return cls._pool
+
+    @classmethod
+    def shutdown(cls) -> None:
+        if cls._pool is None:
+            return
+        cls._pool.terminate()
+        cls._pool.join()
+        cls._pool = None
+
+    @classmethod
+    def get_results(cls, async_results: "dict[str, AsyncResult[Any]]") -> "dict[str, Any]":
+        """Results of the backends which finished successfully within their time limits."""
+        start_time = time()
+        results = {}
+        timed_out = False
+        for backend, async_result in async_results.items():
+            time_limit = ALL_AVAILABLE_TIME_LIMITS[backend]
+            try:
+                results[backend] = async_result.get(
+                    timeout=max(0, start_time + time_limit - time()),
+                )
+            except PoolTimeoutError:
+                print(f"{backend} didn't finish in {time_limit}s, skipping it")
+                timed_out = True
+            except Exception as exc:
+                print(f"{backend}: {exc}")
+        if timed_out:
+            # otherwise stuck workers would be occupying the pool for the next imports:
+            cls.shutdown()
+        return results
+
+
+atexit.register(AllAvailablePool.shutdown)
 
 
 class Plugin(OomoxImportPluginAsync):
@@ -280,7 +402,15 @@ class Plugin(OomoxImportPluginAsync):
             "display_name": translate("Stronger Follow Palette Template"),
             "reload_theme": True,
             "value_filter": {
-                "_PIL_PALETTE_QUALITY": [LOW_QUALITY, MEDIUM_QUALITY, HIGH_QUALITY],
+                "_PIL_PALETTE_QUALITY": [
+                    LOW_QUALITY, MEDIUM_QUALITY, HIGH_QUALITY,
+                    # `quantize` also can use the whole palette:
+                    *(
+                        f"{method}{quality}"
+                        for method in QUANTIZE_METHODS
+                        for quality in (LOW_QUALITY, MEDIUM_QUALITY, HIGH_QUALITY)
+                    ),
+                ],
             },
         },
         {
@@ -290,6 +420,23 @@ class Plugin(OomoxImportPluginAsync):
             "display_name": translate("Dark/Light Colors"),
             "reload_theme": True,
         },
+        {
+            "key": "_PIL_COLOR_DISTANCE",
+            "type": "options",
+            "options": [{
+                "value": ColorDistanceMetric.RGB,
+                "display_name": translate("RGB"),
+            }, {
+                "value": ColorDistanceMetric.OKLAB,
+                "display_name": translate("OKLab"),
+            }, {
+                "value": ColorDistanceMetric.CIEDE2000,
+                "display_name": translate("CIEDE2000"),
+            }],
+            "fallback_value": ColorDistanceMetric.RGB,
+            "display_name": translate("Color Matching"),
+            "reload_theme": True,
+        },
         {
             "key": "_PIL_THEME_TEMPLATE",
             "type": "options",
@@ -315,6 +462,34 @@ class Plugin(OomoxImportPluginAsync):
         },
     ]
 
+    try:
+        import numpy as np  # pylint: disable=import-error,useless-suppression
+        theme_model_import[1]["options"] += [
+            {
+                "value": f"{method}{quality}",
+                "display_name": translate("{method}: {quality} quality").format(
+                    method=method_name, quality=quality_name,
+                ),
+            }
+            for method, method_name in zip(
+                QUANTIZE_METHODS,
+                (translate("NumPy median cut"), translate("NumPy k-means")),
+                strict=True,
+            )
+            for quality, quality_name in (
+                (LOW_QUALITY, translate("low")),
+                (MEDIUM_QUALITY, translate("medium")),
+                (HIGH_QUALITY, translate("high")),
+            )
+        ]
+    except:  # noqa: E722  pylint: disable=bare-except
+        print(
+            translate(
+                "Import Colors From Image plugin:"
+                " `{}` library is not installed - less color-import options are available.",
+            ).format("numpy"),
+        )
+
     try:
         import colorz  # pylint: disable=import-error,useless-suppression
         theme_model_import[1]["options"] += [{
@@ -387,92 +562,93 @@ class Plugin(OomoxImportPluginAsync):
             ),
         )
 
-    _terminal_palette_cache: dict[str, dict[str, str]] = {}
-    _palette_cache: dict[str, list[str]] = {}
+    @staticmethod
+    def _get_preprocessed_width(quality: str) -> int:
+        if quality.isdigit():
+            return int(quality)
+        if quality.startswith(QUANTIZE_METHODS):
+            return int(quality.lstrip(string.ascii_letters + "_"))
+        # the libraries are downscaling the image themselves (if at all), but not that much:
+        return LIBRARY_IMAGE_WIDTH
 
     @classmethod
-    def _get_haishoku_palette(cls, image_path: str) -> "list[HexColor]":
+    def _get_haishoku_palette(cls, encoded_image: bytes) -> "list[HexColor]":
         from haishoku.haishoku import Haishoku  # pylint: disable=import-error,useless-suppression
-        palette = Haishoku.getPalette(image_path)
+        palette = Haishoku.getPalette(io.BytesIO(encoded_image))
         return [color_hex_from_list(color) for _percentage, color in palette]
 
     @classmethod
-    def _get_colorthief_palette(cls, image_path: str, color_count: int) -> "list[HexColor]":
+    def _get_colorthief_palette(cls, encoded_image: bytes, color_count: int) -> "list[HexColor]":
         from colorthief import ColorThief  # pylint: disable=import-error,useless-suppression
-        color_thief = ColorThief(image_path)
+        color_thief = ColorThief(io.BytesIO(encoded_image))
         palette = color_thief.get_palette(color_count=color_count)
         return [color_hex_from_list(color) for color in palette]
 
     @classmethod
-    def _get_colorz_lib_palette(cls, image_path: str, color_count: int) -> "list[HexColor]":
+    def _get_quantized_palette(
+            cls, image: "Image.Image", quality: str, *, use_whole_palette: bool,
+    ) -> "list[HexColor]":
+        quantizer = get_plugin_module("quantize", os.path.join(PLUGIN_DIR, "quantize.py"))
+        return quantizer.get_hex_palette(  # type: ignore[no-any-return]
+            image, method=quality.rstrip(string.digits), use_whole_palette=use_whole_palette,
+        )
+
+    @classmethod
+    def _get_colorz_lib_palette(cls, encoded_image: bytes, color_count: int) -> "list[HexColor]":
         from colorz import colorz  # pylint: disable=import-error,useless-suppression
-        with open(image_path, "rb") as fobj:
-            palette = colorz(fobj, color_count, 50, 200)
+        palette = colorz(io.BytesIO(encoded_image), color_count, 50, 200)
         return [color_hex_from_list(color) for pair in palette for color in pair]
 
     @classmethod
-    def _get_all_available_palettes(  # pylint: disable=too-many-locals
+    def _get_all_available_palettes(
             cls,
-            image_path: str,
+            image: "Image.Image",
             *,
             use_whole_palette: bool,
             quality_per_plugin: "Annotated[Sequence[int], 3]",
     ) -> "list[HexColor]":
-        hex_palette = []
+        encoded_image = image_preprocessor.encode_image(image)
         from colorthief import ColorThief  # pylint: disable=import-error,useless-suppression
         from colorz import colorz  # pylint: disable=import-error,useless-suppression
         from haishoku.haishoku import Haishoku  # pylint: disable=import-error,useless-suppression
-        with Pool() as pool:
-            oomox_future = pool.apply_async(apply_chain, (
-                get_plugin_module,
-                ("ima", os.path.join(PLUGIN_DIR, "ima.py"), "get_hex_palette"),
-                (image_path, use_whole_palette, 48, quality_per_plugin[0]),
-            ))
-            from functools import partial
-            opener = partial(open, image_path, "rb")
-            colorz_future = pool.apply_async(delayed_partial, (
+        pool = AllAvailablePool.get()
+        results = AllAvailablePool.get_results({
+            "ima": pool.apply_async(apply_chain, (
+                get_cached_plugin_module,
+                IMA_WORKER_MODULE_ARGS,
+                (image, use_whole_palette, 48, quality_per_plugin[0]),
+            )),
+            "colorz": pool.apply_async(delayed_partial, (
                 colorz,
                 (
-                    (opener, ()),
+                    (io.BytesIO, (encoded_image, )),
                 ),
                 (quality_per_plugin[1], 50, 200),
-            ))
-            colorthief_future = pool.apply_async(call_method_from_class, (
+            )),
+            "colorthief": pool.apply_async(call_method_from_class, (
                 ColorThief,
-                (image_path, ),
+                (io.BytesIO(encoded_image), ),
                 "get_palette",
                 (quality_per_plugin[2], ),
-            ))
-            haishoku_future = pool.apply_async(
-                Haishoku.getPalette, (image_path, ),
-            )
-            pool.close()
-            hex_palette += oomox_future.get()
-            try:
-                colorz_result: list[
-                    tuple[tuple[int, int, int], tuple[int, int, int]]
-                ] = colorz_future.get()  # type: ignore[assignment]
-                hex_palette += [
-                    color_hex_from_list(color) for pair in colorz_result for color in pair
-                ]
-            except Exception as exc:
-                print(exc)
-            try:
-                colorthief_result: list[tuple[int, int, int]] = (
-                    colorthief_future.get(),  # type: ignore[assignment]
-                )
-                hex_palette += [
-                    color_hex_from_list(color) for color in colorthief_result
-                ]
-            except Exception as exc:
-                print(exc)
-            try:
-                hex_palette += [
-                    color_hex_from_list(color) for _percentage, color in haishoku_future.get()
-                ]
-            except Exception as exc:
-                print(exc)
-            pool.join()
+            )),
+            "haishoku": pool.apply_async(
+                Haishoku.getPalette, (io.BytesIO(encoded_image), ),
+            ),
+        })
+        colorz_result: list[tuple[tuple[int, int, int], tuple[int, int, int]]] = results.get(
+            "colorz", [],
+        )
+        colorthief_result: list[tuple[int, int, int]] = results.get("colorthief", [])
+        haishoku_result: list[tuple[float, tuple[int, int, int]]] = results.get("haishoku", [])
+        hex_palette: list[HexColor] = [
+            *results.get("ima", []),
+            *(color_hex_from_list(color) for pair in colorz_result for color in pair),
+            *(color_hex_from_list(color) for color in colorthief_result),
+            *(color_hex_from_list(color) for _percentage, color in haishoku_result),
+        ]
+        if not hex_palette:
+            msg = "none of the libraries extracted the palette in time"
+            raise RuntimeError(msg)
         return hex_palette
 
     def read_colorscheme_from_path(  # type: ignore[override]
@@ -517,32 +693,32 @@ class Plugin(OomoxImportPluginAsync):
                 oomox_theme[oomox_key] = image_palette[image_palette_key]
         callback(oomox_theme)
 
-    @staticmethod
-    def _generate_palette_id(image_path: str, quality: str, *, use_whole_palette: bool) -> str:
-        return image_path + quality + str(use_whole_palette)
-
     @classmethod
     def _generate_terminal_palette(
             cls, template_path: str, image_path: str, quality: str,
             *,
-            use_whole_palette: bool, inverse_palette: bool,
+            use_whole_palette: bool, inverse_palette: bool, color_distance: str,
             result_callback: "Callable[[dict[str, str]], None]",
     ) -> None:
         start_time = time()
-        id_ = cls._generate_palette_id(image_path, quality, use_whole_palette=use_whole_palette)
-        hex_palette = cls._palette_cache.get(id_)
+        id_ = ImagePaletteCache.get_id(
+            image_path, quality=quality, use_whole_palette=use_whole_palette,
+        )
+        hex_palette = ImagePaletteCache.get_palette(id_)
         if hex_palette:
             cls._generate_terminal_palette_callback(
                 hex_palette, template_path,
                 inverse_palette=inverse_palette,
+                color_distance=color_distance,
                 result_callback=result_callback,
             )
         else:
             def generate_terminal_palette_task() -> None:
                 cls._generate_terminal_palette_task(
-                    template_path, image_path, quality,
+                    template_path, image_path, quality, id_,
                     use_whole_palette=use_whole_palette,
                     inverse_palette=inverse_palette,
+                    color_distance=color_distance,
                     start_time=start_time,
                     result_callback=result_callback,
                 )
@@ -556,22 +732,30 @@ class Plugin(OomoxImportPluginAsync):
 
     @classmethod
     def _generate_terminal_palette_task(
-            cls, template_path: str, image_path: str, quality: str,
+            cls, template_path: str, image_path: str, quality: str, id_: str,
             *,
-            use_whole_palette: bool, inverse_palette: bool,
+            use_whole_palette: bool, inverse_palette: bool, color_distance: str,
             start_time: float,
             result_callback: "Callable[[dict[str, str]], None]",
     ) -> None:
+        # decoded only once, and only as big as needed for the chosen backend:
+        image = image_preprocessor.load_image(image_path, cls._get_preprocessed_width(quality))
         if quality.startswith("colorz"):
             hex_palette = cls._get_colorz_lib_palette(
-                image_path, color_count=int(quality.split("colorz")[1]),
+                image_preprocessor.encode_image(image),
+                color_count=int(quality.split("colorz")[1]),
             )
         elif quality.startswith("colorthief"):
             hex_palette = cls._get_colorthief_palette(
-                image_path, color_count=int(quality.split("colorthief")[1]) + 1,
+                image_preprocessor.encode_image(image),
+                color_count=int(quality.split("colorthief")[1]) + 1,
             )
         elif quality == "haishoku":
-            hex_palette = cls._get_haishoku_palette(image_path)
+            hex_palette = cls._get_haishoku_palette(image_preprocessor.encode_image(image))
+        elif quality.startswith(QUANTIZE_METHODS):
+            hex_palette = cls._get_quantized_palette(
+                image, quality, use_whole_palette=use_whole_palette,
+            )
         elif quality.startswith("all_"):
             quality_ = quality.split("_")[1]
             if quality_ == "low":
@@ -581,21 +765,21 @@ class Plugin(OomoxImportPluginAsync):
             else:
                 raise NotImplementedError
             hex_palette = cls._get_all_available_palettes(
-                image_path=image_path, use_whole_palette=use_whole_palette,
+                image=image, use_whole_palette=use_whole_palette,
                 quality_per_plugin=quality_per_plugin,
             )
         else:
-            hex_palette = image_analyzer.get_hex_palette(
-                image_path, quality=int(quality), use_whole_palette=use_whole_palette,
+            hex_palette = image_analyzer.get_hex_palette_from_image(
+                image, quality=int(quality), use_whole_palette=use_whole_palette,
             )[:]
         print(
             f"{quality} quality, {len(hex_palette)} colors found, took {time() - start_time:.8f}s",
         )
-        id_ = cls._generate_palette_id(image_path, quality, use_whole_palette=use_whole_palette)
-        cls._palette_cache[id_] = hex_palette
+        ImagePaletteCache.put(id_, hex_palette)
         cls._generate_terminal_palette_callback(
             hex_palette, template_path,
             inverse_palette=inverse_palette,
+            color_distance=color_distance,
             result_callback=result_callback,
         )
 
@@ -606,14 +790,19 @@ class Plugin(OomoxImportPluginAsync):
             template_path: str,
             *,
             inverse_palette: bool,
+            color_distance: str,
             result_callback: "Callable[[dict[str, str]], None]",
     ) -> None:
-        gray_colors = get_gray_colors(hex_palette)
+        gray_colors = get_grayest_colors(hex_palette)
         bright_colors = set(hex_palette)
         bright_colors.difference_update(gray_colors)
         bright_colors_list = list(bright_colors)
-        hex_palette += [hex_darker(c, ACCURACY) for c in gray_colors]
-        hex_palette += [hex_darker(c, -ACCURACY) for c in gray_colors]
+        # not extending the list in place, as it's the one remembered by `ImagePaletteCache`:
+        hex_palette = [
+            *hex_palette,
+            *darken_colors(gray_colors, ACCURACY),
+            *darken_colors(gray_colors, -ACCURACY),
+        ]
         reference_palette = import_xcolors(os.path.join(TERMINAL_TEMPLATE_DIR, template_path))
         result_palette = {}
         if inverse_palette:
@@ -621,8 +810,19 @@ class Plugin(OomoxImportPluginAsync):
                 reference_palette["background"], reference_palette["foreground"]
         is_dark_bg = is_dark(reference_palette["background"])
 
+        gray_keys = [key for key in reference_palette if key in GRAY_KEYS]
+        bright_keys = [key for key in reference_palette if key not in GRAY_KEYS]
+        # each of the palettes is indexed once for all the template colors:
+        closest_colors = dict(zip(
+            gray_keys,
+            ColorLightnessIndex(hex_palette, metric=color_distance).nearest_many(
+                [reference_palette[key] for key in gray_keys],
+            ),
+            strict=True,
+        ))
+
         max_possible_lightness = 255 * 3
-        new_bg_color, _diff = find_closest_color(reference_palette["background"], hex_palette)
+        new_bg_color = closest_colors.get("background")
         if not new_bg_color:
             cant_find_color = "No color detected"
             raise RuntimeError(cant_find_color)
@@ -637,14 +837,19 @@ class Plugin(OomoxImportPluginAsync):
         else:
             max_lightness = max_possible_lightness - lightness_delta
 
-        for key, value in reference_palette.items():
-            if key not in {"color0", "color7", "color8", "color15", "foreground", "background"}:
-                closest_color, _diff = find_closest_color(
-                    value, bright_colors_list,
+        bright_colors_index = ColorLightnessIndex(bright_colors_list, metric=color_distance)
+        closest_colors.update(zip(
+            bright_keys,
+            (
+                closest_color for closest_color, _diff in bright_colors_index.closest_many(
+                    [reference_palette[key] for key in bright_keys],
                     min_lightness=min_lightness, max_lightness=max_lightness,
                 )
-            else:
-                closest_color, _diff = find_closest_color(value, hex_palette)
+            ),
+            strict=True,
+        ))
+        for key, value in reference_palette.items():
+            closest_color = closest_colors[key]
             if not closest_color:
                 no_similar_color = f"No similar color found for {key} {value}."
                 raise RuntimeError(no_similar_color)
@@ -667,15 +872,27 @@ class Plugin(OomoxImportPluginAsync):
         inverse_palette = bool(
             get_first_theme_option("_PIL_PALETTE_INVERSE", {}).get("fallback_value"),
         )
-        id_ = template_path + image_path + str(quality) + str(use_whole_palette) + str(inverse_palette)
+        color_distance: str = get_first_theme_option(
+            "_PIL_COLOR_DISTANCE", {},
+        ).get("fallback_value") or ColorDistanceMetric.RGB
+        id_ = ImagePaletteCache.get_id(
+            image_path,
+            template_path=template_path, quality=str(quality),
+            use_whole_palette=use_whole_palette, inverse_palette=inverse_palette,
+            color_distance=color_distance,
+        )
 
-        def _result_callback(generated_palette: dict[str, str]) -> None:
-            cls._terminal_palette_cache[id_] = generated_palette
+        def _send_result(terminal_palette: dict[str, str]) -> None:
             palette: ThemeT = {}
-            palette.update(cls._terminal_palette_cache[id_])
+            palette.update(terminal_palette)
             result_callback(palette)
 
-        if not cls._terminal_palette_cache.get(id_):
+        def _result_callback(generated_palette: dict[str, str]) -> None:
+            ImagePaletteCache.put(id_, generated_palette)
+            _send_result(generated_palette)
+
+        cached_palette = ImagePaletteCache.get_terminal_palette(id_)
+        if not cached_palette:
             def generate_terminal_palette_task() -> None:
                 cls._generate_terminal_palette(
                     template_path=template_path,
@@ -683,6 +900,7 @@ class Plugin(OomoxImportPluginAsync):
                     quality=str(quality),
                     use_whole_palette=use_whole_palette,
                     inverse_palette=inverse_palette,
+                    color_distance=color_distance,
                     result_callback=_result_callback,
                 )
             try:
@@ -693,4 +911,4 @@ class Plugin(OomoxImportPluginAsync):
             except NoWindowError:
                 generate_terminal_palette_task()
         else:
-            _result_callback(cls._terminal_palette_cache[id_])
+            _send_result(cached_palette)
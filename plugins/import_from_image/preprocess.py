@@ -0,0 +1,49 @@
+"""
+Image decoding shared by all the palette backends.
+
+Instead of decoding the image at full resolution and only then resizing it,
+JPEG decoder is asked to decode it already reduced (by 1/2, 1/4 or 1/8 scale)
+and the rest of downscaling is done in stages: first by integer factor with `reduce()`
+and only then resampled to the exact size.
+"""
+import io
+from typing import TYPE_CHECKING
+
+from PIL import Image
+
+if TYPE_CHECKING:
+    from typing import Final
+
+
+# downscale by integer factor while the image is more than that many times bigger
+# than the target size, and resample only the rest:
+REDUCING_GAP: "Final" = 2.0
+PREPROCESSED_IMAGE_FORMAT: "Final" = "PNG"
+
+
+def get_target_size(image_size: tuple[int, int], width: int) -> tuple[int, int]:
+    """`width` pixels wide (unless the image is narrower), keeping the aspect ratio."""
+    target_width = min(width, image_size[0])
+    return target_width, round(image_size[1] / (image_size[0] / target_width))
+
+
+def load_image(image_path: str, width: int) -> Image.Image:
+    """RGB image decoded to `width` pixels wide, see `get_target_size()`."""
+    with Image.open(image_path) as image:
+        target_size = get_target_size(image.size, width)
+        # no-op for the other formats:
+        image.draft("RGB", target_size)
+        rgb_image = image.convert("RGB")
+    if rgb_image.size != target_size:
+        rgb_image = rgb_image.resize(target_size, reducing_gap=REDUCING_GAP)
+    return rgb_image
+
+
+def encode_image(image: Image.Image) -> bytes:
+    """
+    Losslessly encoded image, for the libraries which are opening the image themselves
+    (and to be passed to the other processes).
+    """
+    with io.BytesIO() as fobj:
+        image.save(fobj, format=PREPROCESSED_IMAGE_FORMAT)
+        return fobj.getvalue()
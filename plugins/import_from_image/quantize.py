@@ -0,0 +1,159 @@
+"""
+Vectorized palette quantizers: median cut, and k-means refining the median cut palette.
+
+Unlike merging the colors one by one in `ima`, they're working on the arrays
+of the unique colors of the image and their pixel counts,
+so the time is growing about linearly with the image size and the palette size.
+"""
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from typing import Final
+
+    from numpy.typing import NDArray
+    from PIL import Image
+
+
+DEFAULT_PALETTE_SIZE: "Final" = 48
+KMEANS_MAX_ITERATIONS: "Final" = 16
+# stop k-means when none of the palette colors moved further than that (in channel values):
+KMEANS_MIN_SHIFT: "Final" = 0.5
+RGB_LENGTH: "Final" = 3
+
+
+class QuantizeMethod:
+    MEDIAN_CUT: "Final" = "median_cut"
+    KMEANS: "Final" = "kmeans"
+
+
+def get_image_colors(
+        image: "Image.Image",
+) -> "tuple[NDArray[np.int64], NDArray[np.int64]]":
+    """Unique colors of RGB image and their pixel counts."""
+    pixels = np.asarray(image, dtype=np.int64).reshape(-1, RGB_LENGTH)
+    packed_colors, counts = np.unique(
+        (pixels[:, 0] << 16) | (pixels[:, 1] << 8) | pixels[:, 2], return_counts=True,
+    )
+    colors = np.stack(
+        [packed_colors >> 16, (packed_colors >> 8) & 0xff, packed_colors & 0xff], axis=1,
+    )
+    return colors, counts
+
+
+class _Box:
+    """Colors of median cut box, and the widest of their channels."""
+
+    indices: "NDArray[np.intp]"
+    channel: int
+    score: int
+
+    def __init__(
+            self,
+            colors: "NDArray[np.int64]",
+            counts: "NDArray[np.int64]",
+            indices: "NDArray[np.intp]",
+    ) -> None:
+        self.indices = indices
+        ranges = np.ptp(colors[indices], axis=0)
+        self.channel = int(ranges.argmax())
+        # the most populated of the widest boxes is split first:
+        self.score = (
+            int(ranges[self.channel]) * int(counts[indices].sum())
+            if len(indices) > 1 else -1
+        )
+
+
+def median_cut(
+        colors: "NDArray[np.int64]",
+        counts: "NDArray[np.int64]",
+        palette_size: int = DEFAULT_PALETTE_SIZE,
+) -> "tuple[NDArray[np.float64], NDArray[np.int64]]":
+    """Palette colors (mean color of each box) and their pixel counts."""
+    boxes = [_Box(colors, counts, np.arange(len(colors)))]
+    while len(boxes) < palette_size:
+        box = max(boxes, key=lambda box: box.score)
+        if box.score < 0:
+            # each of the boxes is a single color already:
+            break
+        boxes.remove(box)
+        order = box.indices[np.argsort(colors[box.indices, box.channel], kind="stable")]
+        cumulative_counts = np.cumsum(counts[order])
+        split_idx = int(np.clip(
+            np.searchsorted(cumulative_counts, cumulative_counts[-1] / 2) + 1, 1, len(order) - 1,
+        ))
+        boxes += [
+            _Box(colors, counts, order[:split_idx]),
+            _Box(colors, counts, order[split_idx:]),
+        ]
+    populations = np.array([counts[box.indices].sum() for box in boxes], dtype=np.int64)
+    centers = np.stack([
+        (colors[box.indices] * counts[box.indices, None]).sum(axis=0) / population
+        for box, population in zip(boxes, populations, strict=True)
+    ])
+    return centers, populations
+
+
+def kmeans(
+        colors: "NDArray[np.int64]",
+        counts: "NDArray[np.int64]",
+        centers: "NDArray[np.float64]",
+        max_iterations: int = KMEANS_MAX_ITERATIONS,
+) -> "tuple[NDArray[np.float64], NDArray[np.int64]]":
+    """Lloyd iterations from the initial `centers`, weighted by pixel counts of the colors."""
+    float_colors = colors.astype(np.float64)
+    weights = counts.astype(np.float64)
+    squared_norms = (float_colors ** 2).sum(axis=1)
+    num_centers = len(centers)
+    populations = np.zeros(num_centers, dtype=np.float64)
+    for _iteration in range(max_iterations):
+        # squared euclidean distances without (colors, centers, channels) array:
+        distances = (
+            squared_norms[:, None] - 2 * float_colors @ centers.T + (centers ** 2).sum(axis=1)[None, :]
+        )
+        labels = distances.argmin(axis=1)
+        populations = np.asarray(
+            np.bincount(labels, weights=weights, minlength=num_centers), dtype=np.float64,
+        )
+        sums = np.stack([
+            np.bincount(labels, weights=weights * float_colors[:, channel], minlength=num_centers)
+            for channel in range(RGB_LENGTH)
+        ], axis=1)
+        # empty clusters are staying where they were:
+        new_centers = np.where(
+            populations[:, None] > 0, sums / np.maximum(populations, 1)[:, None], centers,
+        )
+        shift = np.abs(new_centers - centers).max(initial=0)
+        centers = new_centers
+        if shift < KMEANS_MIN_SHIFT:
+            break
+    return centers, populations.astype(np.int64)
+
+
+def get_hex_palette(
+        image: "Image.Image",
+        method: str,
+        palette_size: int = DEFAULT_PALETTE_SIZE,
+        *,
+        use_whole_palette: bool = False,
+) -> list[str]:
+    """
+    Palette colors of RGB image (already resized to the quality width, see `preprocess` module)
+    from the most common one, or all the image colors like `ima` does.
+    """
+    if method not in {QuantizeMethod.MEDIAN_CUT, QuantizeMethod.KMEANS}:
+        msg = f"Unknown quantize method {method!r}"
+        raise ValueError(msg)
+    colors, counts = get_image_colors(image)
+    if use_whole_palette:
+        centers, populations = colors.astype(np.float64), counts
+    else:
+        centers, populations = median_cut(colors, counts, palette_size)
+        if method == QuantizeMethod.KMEANS:
+            centers, populations = kmeans(colors, counts, centers)
+    order = np.argsort(-populations, kind="stable")
+    palette = np.clip(np.rint(centers[order[populations[order] > 0]]), 0, 0xff).astype(np.int64)
+    return [
+        f"{red:02x}{green:02x}{blue:02x}" for red, green, blue in palette.tolist()
+    ]